@@ -35,7 +35,8 @@ interface PredictionResponse {
     reconstruction_errors: number[];
   };
   reconstruction_error: number;
-  plot_data: string;
+  plot_data: string | null;
+  forecast_id: string;
   timestamp: string;
   metadata: {
     location: { latitude: number; longitude: number; };
@@ -72,7 +73,8 @@ const AdvancedForecast = () => {
             latitude: 21.90,
             longitude: 89.51,
             start_date: startDate.toISOString().split('T')[0],
-            end_date: endDate.toISOString().split('T')[0]
+            end_date: endDate.toISOString().split('T')[0],
+            include_plot: true
           })
         });
         
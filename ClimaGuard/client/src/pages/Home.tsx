@@ -42,7 +42,7 @@ interface PredictionResponse {
     reconstruction_errors: number[];
   };
   reconstruction_error: number;
-  plot_data: string;
+  plot_data: string | null;
   timestamp: string;
   metadata: {
     location: {
@@ -91,7 +91,8 @@ const Home: React.FC = () => {
           latitude: 21.90,
           longitude: 89.51,
           start_date: startDate.toISOString().split('T')[0],
-          end_date: endDate.toISOString().split('T')[0]
+          end_date: endDate.toISOString().split('T')[0],
+          include_plot: true
         });
         
         console.log("Prediction data received:", res.data);
@@ -4,6 +4,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import pandas as pd
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import torch
 import matplotlib.pyplot as plt
 from sklearn.preprocessing import StandardScaler
@@ -118,8 +119,8 @@ class WeatherAutoencoder:
         
         return autoencoder
     
-    def prepare_data(self, data, train_ratio=0.8, max_samples=None):
-        """Prepare time series data for training with optional sampling"""
+    def prepare_sequences(self, data, max_samples=None):
+        """Normalize data and return its sliding windows as a strided view (no copy)"""
         # Normalize data
         scaled_data = self.scaler.fit_transform(data)
         
@@ -128,14 +129,14 @@ class WeatherAutoencoder:
             indices = np.random.choice(len(scaled_data), max_samples, replace=False)
             scaled_data = scaled_data[indices]
         
-        # Create sequences
-        sequences = []
-        for i in range(len(scaled_data) - self.time_steps + 1):
-            sequences.append(scaled_data[i:i + self.time_steps])
+        # (windows, time_steps, features) view over scaled_data
+        return sliding_window_view(scaled_data, self.time_steps, axis=0).transpose(0, 2, 1)
         
-        sequences = np.array(sequences)
+    def prepare_data(self, data, train_ratio=0.8, max_samples=None):
+        """Prepare time series data for training with optional sampling"""
+        sequences = self.prepare_sequences(data, max_samples)
         
-        # Split into train/test
+        # Split into train/test (views as well)
         train_size = int(len(sequences) * train_ratio)
         X_train = sequences[:train_size]
         X_test = sequences[train_size:]
@@ -163,7 +164,7 @@ class WeatherAutoencoder:
     def detect_anomalies(self, data, threshold_std=2.0):
         """Detect anomalies based on reconstruction error"""
         # Prepare data
-        sequences = self.prepare_data(data)[2]
+        sequences = self.prepare_sequences(data)
         
         # Get reconstructions
         reconstructions = self.model.predict(sequences)
@@ -480,7 +481,7 @@ def detect_anomalies_with_autoencoder(autoencoder, data):
     """Detect anomalies using autoencoder"""
     try:
         # Prepare data for autoencoder
-        sequences = autoencoder.prepare_data(data)[2]
+        sequences = autoencoder.prepare_sequences(data)
         
         # Get reconstructions
         reconstructions = autoencoder.model.predict(sequences)
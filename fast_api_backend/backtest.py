@@ -0,0 +1,223 @@
+"""Rolling-origin backtest of the served forecast checkpoint
+
+    python backtest.py --latitude 21.0 --longitude 89.5 --start 2022-01-01 --end 2022-12-31
+    python backtest.py --history ../model_training/weather_store --station sundarban --output sundarban_backtest.parquet
+
+Every hour with 128 hours of history before it and 24 hours after it
+becomes a forecast origin. The origins are sliding-window views over one
+feature array. They are pushed through the model in large batches with
+load_forecast_model_simple and predict_with_loaded_model from offline.py,
+so the backtest scores exactly what the API serves.
+
+Errors are accumulated per calendar month, lead hour and feature. Each row
+also has the error of a persistence forecast (the last observed hour held
+for 24 hours). skill = 1 - MAE / persistence MAE, so a positive value means
+the model beats persistence. Rows are written to a Parquet file, and the
+month "all" covers the whole range.
+
+History comes from the archive tile cache that offline.py fills
+(TILE_CACHE_PATH), or from a weather store directory or training CSV under
+model_training. No network access is needed. Origins whose input or target
+hours are missing from the history are skipped.
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+import offline
+from offline import (ARCHIVE_HOURLY_VARIABLES, build_feature_frame, load_forecast_model_simple,
+                     predict_with_loaded_model)
+from weather_cache import ArchiveTileCache
+
+SEQ_LEN = 128
+PRED_LEN = 24
+
+
+def history_from_tile_cache(path, latitude, longitude, start_date, end_date, precision=offline.tile_cache_precision):
+    """Hourly feature frame of one cached cell plus a mask of the hours that were really cached"""
+    cache = ArchiveTileCache(path, ARCHIVE_HOURLY_VARIABLES, precision=precision)
+    raw = cache.load(*cache.cell_of(latitude, longitude), start_date, end_date)
+    if not len(raw):
+        raise SystemExit(f"❌ No cached hours for ({latitude}, {longitude}) in {path}")
+
+    # A regular hourly index keeps row k exactly k hours after row 0
+    raw = raw[~raw.index.duplicated(keep='last')].asfreq('h')
+    observed = raw.notna().all(axis=1).to_numpy()
+    return build_feature_frame(raw), observed
+
+
+def history_from_store(path, station=None, start_date=None, end_date=None):
+    """Hourly feature frame from a weather store directory or training CSV"""
+    if os.path.isdir(path):
+        if station is None:
+            station = sorted(name.split("=", 1)[1] for name in os.listdir(path) if name.startswith("station="))[0]
+        df = pd.read_parquet(os.path.join(path, f"station={station}"))
+        df = df.drop(columns=[column for column in ('year',) if column in df.columns])
+    else:
+        df = pd.read_csv(path, parse_dates=['date'])
+
+    df = df.sort_values('date').drop_duplicates('date', keep='last').set_index('date')
+    if start_date is not None:
+        df = df[df.index >= pd.Timestamp(start_date)]
+    if end_date is not None:
+        df = df[df.index < pd.Timestamp(end_date) + pd.Timedelta(days=1)]
+
+    df = df.asfreq('h')
+    observed = df[[f for f in offline.TARGET_FEATURES if f in df.columns]].notna().all(axis=1).to_numpy()
+    return df.ffill().bfill(), observed
+
+
+def origin_windows(values, observed, stride=1):
+    """(inputs, targets, origin rows) as views: inputs (origins, 128, F), targets (origins, 24, F)
+
+    The origin row is the last observed hour of each input window.
+    """
+    inputs = sliding_window_view(values[:-PRED_LEN], SEQ_LEN, axis=0).transpose(0, 2, 1)
+    targets = sliding_window_view(values[SEQ_LEN:], PRED_LEN, axis=0).transpose(0, 2, 1)
+    complete = sliding_window_view(observed, SEQ_LEN + PRED_LEN).all(axis=1)
+
+    origins = np.flatnonzero(complete)[::stride]
+    return inputs, targets, origins + SEQ_LEN - 1
+
+
+class SkillAccumulator:
+    """Running error sums per period, lead hour and feature"""
+
+    def __init__(self, num_features):
+        self.shape = (PRED_LEN, num_features)
+        self.sums = {}
+
+    def add(self, period, error, persistence_error):
+        sums = self.sums.setdefault(period, {
+            "origins": 0,
+            "abs": np.zeros(self.shape), "sq": np.zeros(self.shape), "err": np.zeros(self.shape),
+            "persistence_abs": np.zeros(self.shape)
+        })
+        sums["origins"] += len(error)
+        sums["abs"] += np.abs(error).sum(axis=0)
+        sums["sq"] += np.square(error).sum(axis=0)
+        sums["err"] += error.sum(axis=0)
+        sums["persistence_abs"] += np.abs(persistence_error).sum(axis=0)
+
+    def to_frame(self, target_names):
+        """Long table: one row per (month, lead_hour, feature), plus month 'all'"""
+        periods = dict(self.sums)
+        if periods:
+            periods["all"] = {key: sum(sums[key] for sums in self.sums.values()) for key in next(iter(periods.values()))}
+
+        frames = []
+        lead_hour, feature = np.meshgrid(np.arange(1, PRED_LEN + 1), target_names, indexing='ij')
+        for period, sums in periods.items():
+            count = sums["origins"]
+            mae = sums["abs"] / count
+            persistence_mae = sums["persistence_abs"] / count
+            frames.append(pd.DataFrame({
+                "month": period,
+                "lead_hour": lead_hour.ravel().astype(np.int16),
+                "feature": feature.ravel(),
+                "origins": count,
+                "mae": mae.ravel().astype(np.float32),
+                "rmse": np.sqrt(sums["sq"] / count).ravel().astype(np.float32),
+                "bias": (sums["err"] / count).ravel().astype(np.float32),
+                "persistence_mae": persistence_mae.ravel().astype(np.float32),
+                "skill": (1 - mae / np.where(persistence_mae > 0, persistence_mae, np.nan)).ravel().astype(np.float32)
+            }))
+        return pd.concat(frames, ignore_index=True)
+
+
+def run_backtest(model, scaler, target_names, frame, observed, station_id=None, batch_size=2048, stride=1):
+    """Forecast every origin in batches and return the per month / lead / feature skill table"""
+    values = np.ascontiguousarray(frame[target_names].to_numpy(dtype=np.float32))
+    inputs, targets, origin_rows = origin_windows(values, observed, stride)
+    if not len(origin_rows):
+        raise SystemExit(f"❌ Need at least {SEQ_LEN + PRED_LEN} consecutive hours of history")
+
+    months = frame.index[origin_rows].strftime("%Y-%m").to_numpy()
+    window_ids = origin_rows - (SEQ_LEN - 1)
+    accumulator = SkillAccumulator(len(target_names))
+
+    started = time.perf_counter()
+    for batch_start in range(0, len(window_ids), batch_size):
+        ids = window_ids[batch_start:batch_start + batch_size]
+        batch_inputs = inputs[ids]
+        batch_targets = targets[ids]
+
+        forecast = predict_with_loaded_model(model, scaler, target_names, batch_inputs, station_id)
+        error = forecast - batch_targets
+        persistence_error = batch_inputs[:, -1:, :] - batch_targets
+
+        # Origins are in time order, so a batch spans one or two months
+        batch_months = months[batch_start:batch_start + batch_size]
+        for month in np.unique(batch_months):
+            rows = batch_months == month
+            accumulator.add(month, error[rows], persistence_error[rows])
+
+    elapsed = time.perf_counter() - started
+    print(f"⏱️ {len(window_ids)} origins in {elapsed:.1f} s ({len(window_ids) / elapsed:.0f} origins/s)")
+    return accumulator.to_frame(target_names)
+
+
+def print_summary(results):
+    overall = results[results["month"] == "all"]
+    by_lead = overall.pivot(index="lead_hour", columns="feature", values="mae")
+    print("\n📊 MAE by lead hour (original units)")
+    print(by_lead.loc[[hour for hour in (1, 3, 6, 12, 24) if hour in by_lead.index]].round(3).T.to_string())
+
+    by_month = (results[results["month"] != "all"]
+                .groupby("month")[["mae", "persistence_mae"]].mean())
+    by_month["skill"] = 1 - by_month["mae"] / by_month["persistence_mae"]
+    print("\n📅 Mean over leads and features by month")
+    print(by_month.round(3).to_string())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checkpoint", default="./cust_train1/sundarban.pth")
+    parser.add_argument("--tile-cache", default=offline.tile_cache_path, help="archive tile cache filled by offline.py")
+    parser.add_argument("--latitude", type=float, default=21.0)
+    parser.add_argument("--longitude", type=float, default=89.5)
+    parser.add_argument("--history", help="weather store directory or training CSV instead of the tile cache")
+    parser.add_argument("--station", default=None, help="weather store station (defaults to the first one)")
+    parser.add_argument("--start", default=None)
+    parser.add_argument("--end", default=None)
+    parser.add_argument("--stride", type=int, default=1, help="hours between forecast origins")
+    parser.add_argument("--batch-size", type=int, default=2048, help="origins per forward pass")
+    parser.add_argument("--output", default="backtest.parquet")
+    args = parser.parse_args()
+
+    model, scaler, target_names, stations = load_forecast_model_simple(args.checkpoint)
+
+    if args.history:
+        frame, observed = history_from_store(args.history, args.station, args.start, args.end)
+    else:
+        if args.start is None or args.end is None:
+            parser.error("--start and --end are required with the tile cache")
+        frame, observed = history_from_tile_cache(args.tile_cache, args.latitude, args.longitude, args.start, args.end)
+
+    missing_features = [f for f in target_names if f not in frame.columns]
+    if missing_features:
+        raise SystemExit(f"❌ History is missing features: {missing_features}")
+
+    # A shared checkpoint forecasts with the station nearest to the location
+    station_id = None
+    if stations is not None:
+        latitude, longitude = args.latitude, args.longitude
+        coordinates_path = os.path.join(args.history or "", "_stations.json")
+        if args.station is not None and os.path.exists(coordinates_path):
+            with open(coordinates_path) as f:
+                latitude, longitude = json.load(f).get(args.station, (latitude, longitude))
+        station_id = stations.names.index(args.station) if args.station in stations.names \
+            else stations.nearest(latitude, longitude)
+        print(f"📍 Station {stations.names[station_id]}")
+
+    print(f"🔁 Backtesting {args.checkpoint} on {frame.index[0]} .. {frame.index[-1]}")
+    results = run_backtest(model, scaler, target_names, frame, observed,
+                           station_id=station_id, batch_size=args.batch_size, stride=args.stride)
+    results.to_parquet(args.output, index=False)
+    print_summary(results)
+    print(f"\n💾 {len(results)} rows saved to {args.output}")
@@ -0,0 +1,178 @@
+"""Concurrency benchmark for the /forecast endpoint
+
+Measures p50/p99 latency and throughput at several client concurrency levels
+against a running server:
+
+    python bench_concurrency.py run --url http://127.0.0.1:9000 --levels 1,8,64 --output after.json
+    python bench_concurrency.py run --compare before.json
+
+For repeatable numbers without hitting Open-Meteo, start the stand-in archive
+server and point the API at it with OPEN_METEO_ARCHIVE_URL:
+
+    python bench_concurrency.py stub-archive --port 9100 --latency-ms 200
+    OPEN_METEO_ARCHIVE_URL=http://127.0.0.1:9100/v1/archive python offline.py
+
+--lag-hours N makes the stub answer like the real archive does for recent
+hours: everything later than N hours before now comes back as nulls.
+"""
+import argparse
+import asyncio
+import json
+import math
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import httpx
+import numpy as np
+
+HOURLY_VARIABLES = [
+    "temperature_2m", "relative_humidity_2m", "dew_point_2m",
+    "surface_pressure", "precipitation", "rain", "snowfall",
+    "cloud_cover", "wind_speed_10m", "wind_speed_100m",
+    "wind_direction_10m", "wind_gusts_10m",
+]
+
+
+def build_payload(i, same_payload):
+    """10-day window like test.py; nudge the latitude so caches don't hide the work"""
+    latitude = 21.0 if same_payload else 21.0 + (i % 1000) * 0.01
+    return {
+        "latitude": latitude,
+        "longitude": 89.5,
+        "start_date": (datetime.now() - timedelta(days=10)).strftime("%Y-%m-%d"),
+        "end_date": (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+    }
+
+
+async def run_level(client, url, concurrency, num_requests, same_payload):
+    """Fire num_requests /forecast calls with at most `concurrency` in flight"""
+    latencies = []
+    errors = 0
+    next_request = iter(range(num_requests))
+
+    async def worker():
+        nonlocal errors
+        for i in next_request:
+            started = time.perf_counter()
+            try:
+                response = await client.post(f"{url}/forecast", json=build_payload(i, same_payload))
+                if response.status_code != 200:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append((time.perf_counter() - started) * 1000.0)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies = np.array(latencies)
+    return {
+        "concurrency": concurrency,
+        "requests": num_requests,
+        "errors": errors,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "throughput_rps": num_requests / elapsed
+    }
+
+
+async def run_benchmark(args):
+    levels = [int(level) for level in args.levels.split(",")]
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    results = []
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        for concurrency in levels:
+            num_requests = max(args.requests_per_level, concurrency * 2)
+            result = await run_level(client, args.url, concurrency, num_requests, args.same_payload)
+            results.append(result)
+            print(f"concurrency={concurrency:3d}  p50={result['p50_ms']:9.1f} ms  "
+                  f"p99={result['p99_ms']:9.1f} ms  {result['throughput_rps']:7.2f} req/s  "
+                  f"errors={result['errors']}")
+    return results
+
+
+def print_comparison(before, after):
+    print(f"\n{'clients':>8} | {'p50 before':>11} {'p50 after':>10} | {'p99 before':>11} {'p99 after':>10}")
+    print("-" * 60)
+    before_by_level = {result["concurrency"]: result for result in before}
+    for result in after:
+        previous = before_by_level.get(result["concurrency"])
+        if previous is None:
+            continue
+        print(f"{result['concurrency']:>8} | {previous['p50_ms']:>11.1f} {result['p50_ms']:>10.1f} | "
+              f"{previous['p99_ms']:>11.1f} {result['p99_ms']:>10.1f}")
+
+
+def serve_stub_archive(port, latency_ms, lag_hours=None):
+    """Stand-in for the Open-Meteo archive: synthetic hourly data after a fixed delay
+
+    With lag_hours, hours newer than now - lag_hours are null (not yet in the archive).
+    """
+
+    class StubArchiveHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            start = datetime.strptime(query["start_date"][0], "%Y-%m-%d")
+            end = datetime.strptime(query["end_date"][0], "%Y-%m-%d") + timedelta(hours=23)
+            hours = int((end - start).total_seconds() // 3600) + 1
+            phase = np.arange(hours) * 2 * math.pi / 24
+
+            hourly = {"time": [(start + timedelta(hours=h)).strftime("%Y-%m-%dT%H:%M") for h in range(hours)]}
+            for i, variable in enumerate(HOURLY_VARIABLES):
+                base = 1005.0 if variable == "surface_pressure" else 10.0 + i
+                hourly[variable] = (base + 3.0 * np.sin(phase + i)).round(2).tolist()
+            if lag_hours is not None:
+                available = int((datetime.now() - timedelta(hours=lag_hours) - start).total_seconds() // 3600) + 1
+                for variable in HOURLY_VARIABLES:
+                    values = hourly[variable]
+                    values[max(available, 0):] = [None] * (hours - max(available, 0))
+
+            time.sleep(latency_ms / 1000.0)
+            body = json.dumps({"hourly": hourly}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubArchiveHandler)
+    print(f"🛰️ Stub archive on http://127.0.0.1:{port}/v1/archive ({latency_ms} ms latency)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="benchmark a running API server")
+    run_parser.add_argument("--url", default="http://127.0.0.1:9000")
+    run_parser.add_argument("--levels", default="1,8,64", help="comma-separated client concurrency levels")
+    run_parser.add_argument("--requests-per-level", type=int, default=64)
+    run_parser.add_argument("--timeout", type=float, default=120.0)
+    run_parser.add_argument("--same-payload", action="store_true",
+                            help="send byte-identical requests instead of distinct locations")
+    run_parser.add_argument("--output", help="write results as JSON (e.g. before.json)")
+    run_parser.add_argument("--compare", help="JSON results of a previous run to compare against")
+
+    stub_parser = subparsers.add_parser("stub-archive", help="serve a local stand-in for the archive API")
+    stub_parser.add_argument("--port", type=int, default=9100)
+    stub_parser.add_argument("--latency-ms", type=float, default=200.0)
+    stub_parser.add_argument("--lag-hours", type=float, help="serve hours newer than this as nulls")
+
+    args = parser.parse_args()
+    if args.command == "stub-archive":
+        serve_stub_archive(args.port, args.latency_ms, args.lag_hours)
+    else:
+        results = asyncio.run(run_benchmark(args))
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(results, f, indent=2)
+        if args.compare:
+            with open(args.compare) as f:
+                print_comparison(json.load(f), results)
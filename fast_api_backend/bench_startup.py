@@ -0,0 +1,137 @@
+"""Startup benchmark for offline.py: import time, time to healthy and first-request latency
+
+    python bench_startup.py --runs 3 --output after.json
+    python bench_startup.py --runs 3 --compare before.json
+    SERVING_BUNDLE_PATH= python bench_startup.py     # load the separate checkpoints instead of the bundle
+
+import_s is how long `import offline` takes in a fresh interpreter.
+
+For ready_s, every run starts `python offline.py` as a new process and
+polls /health until both models report loaded. ready_s is the time from
+spawning the process to that point.
+
+The first and second /forecast calls are then timed, followed by the first
+on-demand plot. The archive is a local stub from bench_concurrency.py, and
+the tile cache points at a temporary file, so network latency and cached
+rows don't skew the numbers.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+
+from bench_concurrency import build_payload, serve_stub_archive
+
+IMPORT_SNIPPET = (
+    "import sys, time; started = time.perf_counter(); import offline; "
+    "print(time.perf_counter() - started, 'matplotlib' in sys.modules)"
+)
+
+
+def measure_import():
+    output = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], capture_output=True, text=True, check=True)
+    seconds, matplotlib_loaded = output.stdout.split()[-2:]
+    return float(seconds), matplotlib_loaded == "True"
+
+
+def wait_until_ready(client, url, process, timeout_s):
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout_s:
+        if process.poll() is not None:
+            raise RuntimeError(f"offline.py exited with code {process.returncode}")
+        try:
+            health = client.get(f"{url}/health").json()
+            if health["forecast_model_loaded"] and health["autoencoder_loaded"]:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.02)
+    raise TimeoutError(f"offline.py not ready after {timeout_s} s")
+
+
+def timed(call):
+    started = time.perf_counter()
+    response = call()
+    response.raise_for_status()
+    return (time.perf_counter() - started) * 1000.0, response
+
+
+def measure_server(port, archive_url, timeout_s):
+    url = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env = dict(os.environ, PORT=str(port), OPEN_METEO_ARCHIVE_URL=archive_url,
+                   TILE_CACHE_PATH=os.path.join(cache_dir, "tiles.sqlite"))
+        spawned = time.perf_counter()
+        process = subprocess.Popen([sys.executable, "offline.py"], env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            with httpx.Client(timeout=timeout_s) as client:
+                wait_until_ready(client, url, process, timeout_s)
+                ready_s = time.perf_counter() - spawned
+
+                first_ms, response = timed(lambda: client.post(f"{url}/forecast", json=build_payload(0, False)))
+                second_ms, _ = timed(lambda: client.post(f"{url}/forecast", json=build_payload(1, False)))
+                forecast_id = response.json()["forecast_id"]
+                plot_ms, _ = timed(lambda: client.get(f"{url}/forecast/{forecast_id}/plot"))
+        finally:
+            process.terminate()
+            process.wait()
+
+    return {"ready_s": ready_s, "first_request_ms": first_ms, "second_request_ms": second_ms,
+            "first_plot_ms": plot_ms}
+
+
+def run_benchmark(args):
+    archive = threading.Thread(target=serve_stub_archive, args=(args.archive_port, 0.0), daemon=True)
+    archive.start()
+    archive_url = f"http://127.0.0.1:{args.archive_port}/v1/archive"
+
+    runs = []
+    for i in range(args.runs):
+        import_s, matplotlib_loaded = measure_import()
+        result = {"import_s": import_s, "matplotlib_on_import": matplotlib_loaded}
+        result.update(measure_server(args.port, archive_url, args.timeout))
+        runs.append(result)
+        print(f"run {i + 1}: import={result['import_s']:.2f} s  ready={result['ready_s']:.2f} s  "
+              f"first request={result['first_request_ms']:.0f} ms  second={result['second_request_ms']:.0f} ms  "
+              f"first plot={result['first_plot_ms']:.0f} ms")
+
+    summary = {key: statistics.median(run[key] for run in runs)
+               for key in ("import_s", "ready_s", "first_request_ms", "second_request_ms", "first_plot_ms")}
+    summary["serving_bundle"] = os.environ.get("SERVING_BUNDLE_PATH", "./cust_train1/serving_bundle.pt")
+    summary["runs"] = runs
+    return summary
+
+
+def print_comparison(before, after):
+    print(f"\n{'median':>18} | {'before':>9} {'after':>9}")
+    print("-" * 42)
+    for key in ("import_s", "ready_s", "first_request_ms", "second_request_ms", "first_plot_ms"):
+        if key in before:
+            print(f"{key:>18} | {before[key]:>9.2f} {after[key]:>9.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, default=9011, help="port for the offline.py under test")
+    parser.add_argument("--archive-port", type=int, default=9101, help="port for the stub archive")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--output", help="write results as JSON (e.g. before.json)")
+    parser.add_argument("--compare", help="JSON results of a previous run to compare against")
+    args = parser.parse_args()
+
+    results = run_benchmark(args)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(json.load(f), results)
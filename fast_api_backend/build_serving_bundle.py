@@ -0,0 +1,121 @@
+"""Build the single-file serving bundle that offline.py loads at startup
+
+    python build_serving_bundle.py --checkpoint ./cust_train1/sundarban.pth \
+        --autoencoder ./cust_train1/weather_autoencoder --output ./cust_train1/serving_bundle.pt
+
+The forecaster checkpoint and the PyTorch autoencoder port (written by
+model_training/autoencoder_converter.py) are loaded once through the normal
+offline.py loaders. They are re-saved as state dicts, flat float32
+mean/scale vectors and plain config values, so the server can read the
+bundle with torch.load(weights_only=True). Before writing, the bundle is
+loaded back and checked against the source models on a random window.
+
+The bundle records a content hash of every source checkpoint. offline.py
+falls back to the separate checkpoints (with a warning) when one of them no
+longer matches, so a retrained model is never shadowed by an old bundle.
+The bundle and the converted autoencoder are build outputs, not committed
+files. Build them at deploy time:
+
+    python ../model_training/autoencoder_converter.py --model ./cust_train1/weather_autoencoder
+    python build_serving_bundle.py
+"""
+import argparse
+import os
+
+import numpy as np
+import torch
+
+from metrics import file_version
+from offline import (LSTMAutoencoder, checkpoint_sources, load_autoencoder_model, load_forecast_model_simple,
+                     load_serving_bundle, predict_with_loaded_model)
+
+
+def forecast_config(model):
+    """Constructor arguments of a WindPressurePatchTST, read back from its layers"""
+    first_layer = model.transformer.layers[0]
+    return {
+        "num_features": model.num_features,
+        "seq_len": model.seq_len,
+        "pred_len": model.pred_len,
+        "patch_len": model.patch_len,
+        "stride": model.stride,
+        "d_model": model.patch_embed.out_features,
+        "n_layers": len(model.transformer.layers),
+        "n_heads": first_layer.self_attn.num_heads,
+        "dropout": model.dropout.p,
+        "num_stations": model.num_stations
+    }
+
+
+def build_serving_bundle(checkpoint, autoencoder_prefix):
+    model, scaler, target_names, stations = load_forecast_model_simple(checkpoint)
+    autoencoder = load_autoencoder_model(autoencoder_prefix)
+    if not isinstance(autoencoder.model, LSTMAutoencoder):
+        raise SystemExit(f"❌ {autoencoder_prefix}_torch.pth not found; run model_training/autoencoder_converter.py first")
+
+    forecast = {
+        "config": forecast_config(model),
+        "state_dict": {name: tensor.cpu() for name, tensor in model.state_dict().items()},
+        "target_names": list(target_names),
+        "mean": torch.from_numpy(scaler.mean),
+        "scale": torch.from_numpy(scaler.scale)
+    }
+    if stations is not None:
+        forecast["station_names"] = list(stations.names)
+        forecast["station_coords"] = torch.from_numpy(stations.coords)
+
+    bundle = {
+        "sources": {
+            role: file_version(path) for role, path in checkpoint_sources(checkpoint, autoencoder_prefix).items()
+        },
+        "forecast": forecast,
+        "autoencoder": {
+            "state_dict": autoencoder.model.state_dict(),
+            "time_steps": autoencoder.time_steps,
+            "features": autoencoder.features,
+            "latent_dim": autoencoder.latent_dim,
+            "threshold": autoencoder.threshold,
+            "mean": torch.from_numpy(autoencoder.scaler.mean),
+            "scale": torch.from_numpy(autoencoder.scaler.scale)
+        }
+    }
+    return bundle, (model, scaler, target_names, autoencoder)
+
+
+def check_bundle(path, model, scaler, target_names, autoencoder):
+    """Reload the bundle and compare both models' outputs with the source models"""
+    bundle_model, bundle_scaler, bundle_names, _, bundle_autoencoder = load_serving_bundle(path, check_sources=False)
+    assert bundle_names == list(target_names)
+
+    # Station 0 for a shared model; ignored otherwise
+    station_ids = np.zeros(4, dtype=np.int64) if scaler.mean.ndim == 2 else None
+    window = scaler.inverse_transform(np.random.default_rng(0).standard_normal((4, 128, len(target_names))), station_ids)
+    forecast_error = np.abs(
+        predict_with_loaded_model(bundle_model, bundle_scaler, bundle_names, window, station_ids)
+        - predict_with_loaded_model(model, scaler, target_names, window, station_ids)
+    ).max()
+
+    sequences = torch.from_numpy(np.ascontiguousarray(
+        autoencoder.prepare_sequences(window[0, :, :autoencoder.features].astype(np.float32))
+    ))
+    with torch.no_grad():
+        reconstruction_error = (bundle_autoencoder.model(sequences) - autoencoder.model(sequences)).abs().max().item()
+
+    print(f"🔍 Max difference vs source models: forecast {forecast_error:.2e}, autoencoder {reconstruction_error:.2e}")
+    if forecast_error > 0 or reconstruction_error > 0:
+        raise AssertionError("Serving bundle does not reproduce the source models")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checkpoint", default="./cust_train1/sundarban.pth")
+    parser.add_argument("--autoencoder", default="./cust_train1/weather_autoencoder", help="autoencoder file prefix")
+    parser.add_argument("--output", default="./cust_train1/serving_bundle.pt")
+    args = parser.parse_args()
+
+    bundle, sources = build_serving_bundle(args.checkpoint, args.autoencoder)
+    tmp_path = f"{args.output}.tmp"
+    torch.save(bundle, tmp_path)
+    check_bundle(tmp_path, *sources)
+    os.replace(tmp_path, args.output)
+    print(f"✅ Serving bundle saved to {args.output} ({os.path.getsize(args.output) / 1024:.0f} KiB)")
@@ -0,0 +1,184 @@
+import asyncio
+import os
+import time
+import traceback
+
+import numpy as np
+
+from spatial_index import SpatialIndex
+
+
+def load_grid_points(spec):
+    """(latitudes, longitudes) from a 'lat_min,lat_max,lon_min,lon_max,step' spec or a CSV with latitude,longitude columns"""
+    if os.path.exists(spec):
+        data = np.genfromtxt(spec, delimiter=",", names=True, dtype=None, encoding="utf-8")
+        return (np.atleast_1d(data["latitude"]).astype(np.float64),
+                np.atleast_1d(data["longitude"]).astype(np.float64))
+
+    lat_min, lat_max, lon_min, lon_max, step = (float(value) for value in spec.split(","))
+    latitudes = np.arange(lat_min, lat_max + step / 2, step)
+    longitudes = np.arange(lon_min, lon_max + step / 2, step)
+    grid_lat, grid_lon = np.meshgrid(latitudes, longitudes, indexing="ij")
+    return np.round(grid_lat.ravel(), 6), np.round(grid_lon.ravel(), 6)
+
+
+class GridSnapshot:
+    """Forecasts and anomaly scores for every grid point from one scheduled run
+
+    Everything is array-backed: forecast is (points, 24, features) float32 and
+    the per-point anomaly fields are flat vectors. valid marks the points
+    whose fetch succeeded; only those are indexed for lookups. A snapshot is
+    never modified after it is built, so readers can use the current one
+    without locking.
+    """
+
+    def __init__(self, latitudes, longitudes, forecast, reconstruction_error, has_anomaly, valid,
+                 target_names, anomaly_threshold, created_at, start_date, end_date):
+        self.latitudes = np.asarray(latitudes, dtype=np.float64)
+        self.longitudes = np.asarray(longitudes, dtype=np.float64)
+        self.forecast = np.ascontiguousarray(forecast, dtype=np.float32)
+        self.reconstruction_error = np.asarray(reconstruction_error, dtype=np.float32)
+        self.has_anomaly = np.asarray(has_anomaly, dtype=bool)
+        self.valid = np.asarray(valid, dtype=bool)
+        self.target_names = list(target_names)
+        self.anomaly_threshold = float(anomaly_threshold)
+        self.created_at = float(created_at)
+        self.start_date = start_date
+        self.end_date = end_date
+        self._valid_indices = np.flatnonzero(self.valid)
+        self.index = SpatialIndex(self.latitudes[self._valid_indices], self.longitudes[self._valid_indices])
+
+    def __len__(self):
+        return len(self.latitudes)
+
+    def nearest(self, latitude, longitude):
+        """(index, distance_km) of the closest grid point with a forecast"""
+        indices, distances_km = self.index.nearest(latitude, longitude)
+        return int(self._valid_indices[indices[0]]), float(distances_km[0])
+
+    def within_bbox(self, lat_min, lat_max, lon_min, lon_max):
+        """Indices of grid points with a forecast inside a lat/lon box"""
+        return self._valid_indices[self.index.within_bbox(lat_min, lat_max, lon_min, lon_max)]
+
+    def interpolate(self, latitude, longitude, k=4, power=2.0):
+        """Inverse-distance weighted forecast (24, features) and reconstruction error at any coordinate
+
+        Also returns the grid point indices and weights that were used.
+        """
+        indices, weights = self.index.idw_weights(latitude, longitude, k, power)
+        indices = self._valid_indices[indices]
+        forecast = np.tensordot(weights, self.forecast[indices], axes=1).astype(np.float32)
+        reconstruction_error = float(weights @ self.reconstruction_error[indices])
+        return forecast, reconstruction_error, indices, weights
+
+    def save(self, path):
+        """Write the arrays as one .npz file (atomically)"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path, latitudes=self.latitudes, longitudes=self.longitudes, forecast=self.forecast,
+            reconstruction_error=self.reconstruction_error, has_anomaly=self.has_anomaly, valid=self.valid,
+            target_names=np.array(self.target_names), anomaly_threshold=self.anomaly_threshold,
+            created_at=self.created_at, start_date=self.start_date, end_date=self.end_date
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(
+                data["latitudes"], data["longitudes"], data["forecast"], data["reconstruction_error"],
+                data["has_anomaly"], data["valid"], data["target_names"].tolist(),
+                float(data["anomaly_threshold"]), float(data["created_at"]),
+                str(data["start_date"]), str(data["end_date"])
+            )
+
+
+class SnapshotScheduler:
+    """Rebuild the grid snapshot on a fixed wall-clock interval in the background
+
+    build_snapshot is an async callable returning a GridSnapshot. The first
+    build starts right away, then one runs every interval_s seconds, offset_s
+    after the interval boundary (e.g. five past every hour). A failed build
+    keeps serving the previous snapshot.
+    """
+
+    def __init__(self, build_snapshot, interval_s=3600, offset_s=0, path=None):
+        self.build_snapshot = build_snapshot
+        self.interval_s = interval_s
+        self.offset_s = offset_s
+        self.path = path
+        self.snapshot = None
+        self._task = None
+
+        # Metrics
+        self.builds = 0
+        self.failed_builds = 0
+        self.last_build_s = 0.0
+
+        if path and os.path.exists(path):
+            try:
+                self.snapshot = GridSnapshot.load(path)
+                print(f"✅ Grid snapshot of {len(self.snapshot)} points restored from {path}")
+            except Exception as e:
+                print(f"❌ Could not restore grid snapshot from {path}: {e}")
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def seconds_until_next_run(self, now=None):
+        now = time.time() if now is None else now
+        next_run = (now - self.offset_s) // self.interval_s * self.interval_s + self.interval_s + self.offset_s
+        return next_run - now
+
+    async def refresh(self):
+        """Build a new snapshot and swap it in"""
+        started = time.perf_counter()
+        try:
+            snapshot = await self.build_snapshot()
+        except Exception as e:
+            self.failed_builds += 1
+            print(f"❌ Grid snapshot build failed: {e}")
+            print(traceback.format_exc())
+            return None
+
+        self.snapshot = snapshot
+        self.builds += 1
+        self.last_build_s = time.perf_counter() - started
+        print(f"✅ Grid snapshot of {len(snapshot)} points ({int(snapshot.valid.sum())} valid) "
+              f"built in {self.last_build_s:.1f} s")
+        if self.path:
+            await asyncio.to_thread(snapshot.save, self.path)
+        return snapshot
+
+    async def _run(self):
+        await self.refresh()
+        while True:
+            await asyncio.sleep(self.seconds_until_next_run())
+            await self.refresh()
+
+    def stats(self):
+        snapshot = self.snapshot
+        return {
+            "points": len(snapshot) if snapshot is not None else 0,
+            "valid_points": int(snapshot.valid.sum()) if snapshot is not None else 0,
+            "created_at": snapshot.created_at if snapshot is not None else None,
+            "age_s": time.time() - snapshot.created_at if snapshot is not None else None,
+            "interval_s": self.interval_s,
+            "builds": self.builds,
+            "failed_builds": self.failed_builds,
+            "last_build_s": self.last_build_s
+        }
@@ -0,0 +1,154 @@
+import asyncio
+import time
+import traceback
+import numpy as np
+
+# Upper edges of the histogram buckets (batch sizes and queue wait in ms)
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+WAIT_MS_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 250, 500, 1000]
+
+
+class MicroBatcher:
+    """Dynamic micro-batching queue in front of a batched predict function
+
+    Callers submit one (hours, features) window and await their own slice of
+    the result. A background task collects everything that arrives within
+    max_wait_ms of the first queued window (up to max_batch_size windows),
+    stacks it into one (batch, hours, features) array and makes a single
+    predict_batch call. Extra per-window inputs passed to submit (e.g. a
+    station id) are stacked the same way and passed as further arguments.
+    """
+
+    def __init__(self, predict_batch, max_batch_size=32, max_wait_ms=10, executor=None):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.executor = executor
+
+        self._queue = None
+        self._worker = None
+        self._current_batch = []  # dequeued by the worker, not yet answered
+
+        # Metrics
+        self.total_requests = 0
+        self.total_batches = 0
+        self.total_errors = 0
+        self.batch_size_counts = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+        self.wait_ms_counts = [0] * (len(WAIT_MS_BUCKETS) + 1)
+        self.wait_ms_sum = 0.0
+        self.wait_ms_max = 0.0
+
+    async def start(self):
+        """Start the background batching task on the running event loop"""
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background task and fail the batch it was on plus anything still queued"""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+        pending = self._current_batch
+        self._current_batch = []
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        for _, future, _ in pending:
+            if not future.done():
+                future.set_exception(RuntimeError("Inference batcher stopped"))
+
+    async def submit(self, window, *extra):
+        """Queue one window (plus any per-window extra inputs) and wait for its prediction"""
+        if self._worker is None:
+            raise RuntimeError("Inference batcher is not running")
+
+        future = asyncio.get_running_loop().create_future()
+        self.total_requests += 1
+        await self._queue.put(((window, *extra), future, time.perf_counter()))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            self._current_batch = batch
+            deadline = loop.time() + self.max_wait
+
+            # Keep collecting until the window closes or the batch is full
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._execute(batch, loop)
+            self._current_batch = []
+
+    async def _execute(self, batch, loop):
+        started = time.perf_counter()
+        for _, _, enqueued in batch:
+            self._record_wait((started - enqueued) * 1000.0)
+        self._record_batch_size(len(batch))
+
+        # Callers that gave up while queued don't need a slot in the batch
+        batch = [item for item in batch if not item[1].done()]
+        if not batch:
+            return
+
+        try:
+            # One stacked array per input: windows first, then any extra per-window inputs
+            inputs = [np.stack(column) for column in zip(*(item_inputs for item_inputs, _, _ in batch))]
+            predictions = await loop.run_in_executor(self.executor, self.predict_batch, *inputs)
+        except Exception as e:
+            self.total_errors += 1
+            print(f"❌ Batched inference error: {e}")
+            print(traceback.format_exc())
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future, _), prediction in zip(batch, predictions):
+            if not future.done():
+                future.set_result(prediction)
+
+    def _record_batch_size(self, size):
+        self.total_batches += 1
+        self.batch_size_counts[np.searchsorted(BATCH_SIZE_BUCKETS, size)] += 1
+
+    def _record_wait(self, wait_ms):
+        self.wait_ms_counts[np.searchsorted(WAIT_MS_BUCKETS, wait_ms)] += 1
+        self.wait_ms_sum += wait_ms
+        self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+
+    def stats(self):
+        """Queue depth, batch-size histogram and queue wait-time metrics"""
+        waited = sum(self.wait_ms_counts)
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "total_requests": self.total_requests,
+            "total_batches": self.total_batches,
+            "total_errors": self.total_errors,
+            "mean_batch_size": waited / self.total_batches if self.total_batches else 0.0,
+            "batch_size_histogram": _histogram(BATCH_SIZE_BUCKETS, self.batch_size_counts),
+            "wait_ms_histogram": _histogram(WAIT_MS_BUCKETS, self.wait_ms_counts),
+            "mean_wait_ms": self.wait_ms_sum / waited if waited else 0.0,
+            "max_wait_ms_observed": self.wait_ms_max
+        }
+
+
+def _histogram(buckets, counts):
+    """Label each bucket by its upper edge ("<=8"), with a final "+Inf" overflow bucket"""
+    labels = [f"<={edge}" for edge in buckets] + ["+Inf"]
+    return dict(zip(labels, counts))
@@ -0,0 +1,186 @@
+import contextvars
+import hashlib
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Upper edges of the latency histogram buckets in seconds
+SECONDS_BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """One metric family: a value per distinct set of label values"""
+    type_name = "untyped"
+
+    def __init__(self, name, help_text, registry=None):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    @staticmethod
+    def _key(labels):
+        return tuple(sorted(labels.items()))
+
+    def remove_matching(self, **labels):
+        """Drop every series carrying these label values"""
+        wanted = set(labels.items())
+        with self._lock:
+            self._values = {key: value for key, value in self._values.items() if not wanted <= set(key)}
+
+    def samples(self):
+        """(suffix, labels, value) triples for the text exposition"""
+        with self._lock:
+            return [("", key, value) for key, value in self._values.items()]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.type_name}"]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set_total(self, value, **labels):
+        """Mirror a running total that another component already counts"""
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram; buckets are upper edges, +Inf is implied"""
+    type_name = "histogram"
+
+    def __init__(self, name, help_text, buckets=SECONDS_BUCKETS, registry=None):
+        self.buckets = list(buckets)
+        super().__init__(name, help_text, registry)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    def set_counts(self, counts, total, **labels):
+        """Mirror per-bucket (non-cumulative) counts kept elsewhere, e.g. by the micro-batcher"""
+        with self._lock:
+            self._values[self._key(labels)] = (list(counts), total)
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            items = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        for key, counts, total in items:
+            cumulative = 0
+            for edge, count in zip(self.buckets + [float("inf")], counts):
+                cumulative += count
+                samples.append(("_bucket", key + (("le", _format_value(float(edge))),), cumulative))
+            samples.append(("_sum", key, total))
+            samples.append(("_count", key, cumulative))
+        return samples
+
+
+class Registry:
+    """Metric families plus callbacks that refresh mirrored values right before a scrape"""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+
+    def add_collector(self, collect):
+        self._collectors.append(collect)
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        for collect in self._collectors:
+            collect()
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Stage durations for the current request, reported back in the Server-Timing header
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+def start_request_timing():
+    """Begin collecting stage timings for the request running in this context"""
+    timings = {}
+    _request_timings.set(timings)
+    return timings
+
+
+@contextmanager
+def stage(histogram, name, **labels):
+    """Time a block into histogram{stage=name} and, inside a request, into its Server-Timing
+
+    A stage that runs several times in one request (e.g. one upstream call
+    per missing range) is summed. Executor threads have no request context,
+    so work timed there only lands in the histogram.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        histogram.observe(elapsed, stage=name, **labels)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + elapsed
+
+
+def server_timing_header(timings, total_seconds):
+    """'fetch;dur=12.3, predict;dur=4.1, total;dur=20.5' with durations in milliseconds"""
+    entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items()]
+    entries.append(f"total;dur={total_seconds * 1000:.1f}")
+    return ", ".join(entries)
+
+
+def file_version(path):
+    """Short content hash identifying a model artifact"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()[:12]
@@ -1,33 +1,90 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import pandas as pd
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import torch
-import matplotlib.pyplot as plt
-from sklearn.preprocessing import StandardScaler
 from datetime import datetime, timedelta
 import io
 import base64
 import json
 from typing import List, Dict, Any, Optional
-import requests
+from concurrent.futures import ThreadPoolExecutor
+import httpx
 import warnings
 from torch import nn
 import traceback
+import asyncio
+import threading
+import time
+import uuid
+from collections import OrderedDict
 import os
+from inference_batcher import MicroBatcher
+from weather_cache import ArchiveTileCache
+from window_state import WindowStore, ONE_HOUR
+from metrics import (REGISTRY, CONTENT_TYPE, Counter, Gauge, Histogram, stage, start_request_timing,
+                     server_timing_header, file_version)
+from inference_batcher import BATCH_SIZE_BUCKETS, WAIT_MS_BUCKETS
+from grid_snapshot import GridSnapshot, SnapshotScheduler, load_grid_points
+from result_cache import ResultCache
+from response_encoding import Representations, MSGPACK, OCTET_STREAM
 port = os.environ.get("PORT", 9000)
 threshold_bias = 0.3
+# Upper bounds for /forecast/batch (locations per call, concurrent archive fetches)
+max_batch_locations = int(os.environ.get("MAX_BATCH_LOCATIONS", 500))
+batch_fetch_concurrency = int(os.environ.get("BATCH_FETCH_CONCURRENCY", 8))
+# Open-Meteo archive endpoint and pooled HTTP client limits
+archive_url = os.environ.get("OPEN_METEO_ARCHIVE_URL", "https://archive-api.open-meteo.com/v1/archive")
+http_max_connections = int(os.environ.get("HTTP_MAX_CONNECTIONS", 32))
+http_timeout_s = float(os.environ.get("HTTP_TIMEOUT_S", 30))
+# Forecaster runtime: "eager" (PyTorch module), "torchscript" or "onnx" (exported artifacts)
+forecast_runtime = os.environ.get("FORECAST_RUNTIME", "eager")
+forecast_export_prefix = os.environ.get("FORECAST_EXPORT_PREFIX", "./cust_train1/sundarban")
+# Prebuilt by build_serving_bundle.py; without it the checkpoints below are loaded one by one
+serving_bundle_path = os.environ.get("SERVING_BUNDLE_PATH", "./cust_train1/serving_bundle.pt")
+# On-disk archive tile cache (empty TILE_CACHE_PATH disables it)
+tile_cache_path = os.environ.get("TILE_CACHE_PATH", "./cache/archive_tiles.sqlite")
+tile_cache_precision = int(os.environ.get("TILE_CACHE_PRECISION", 2))
+tile_cache_max_rows = int(os.environ.get("TILE_CACHE_MAX_ROWS", 2_000_000))
+# Per-location ring buffers of recent feature hours (refreshes only ingest new hours)
+window_state_hours = int(os.environ.get("WINDOW_STATE_HOURS", 192))
+window_state_max_locations = int(os.environ.get("WINDOW_STATE_MAX_LOCATIONS", 10000))
+# Bounded executors for CPU-bound stages (torch/keras inference, matplotlib rendering)
+inference_workers = int(os.environ.get("INFERENCE_WORKERS", 2))
+plot_workers = int(os.environ.get("PLOT_WORKERS", 1))
+# Forecasts kept for on-demand plots, and how many rendered PNGs to keep
+forecast_store_size = int(os.environ.get("FORECAST_STORE_SIZE", 2000))
+plot_cache_size = int(os.environ.get("PLOT_CACHE_SIZE", 128))
+# Micro-batching of concurrent /forecast calls (collection window and batch cap)
+micro_batch_max_size = int(os.environ.get("MICRO_BATCH_MAX_SIZE", 32))
+micro_batch_max_wait_ms = float(os.environ.get("MICRO_BATCH_MAX_WAIT_MS", 10))
+# Finished /forecast bodies reused for identical requests (RESULT_CACHE_SIZE=0 disables it);
+# coordinates are rounded to RESULT_CACHE_PRECISION decimals for the key
+result_cache_size = int(os.environ.get("RESULT_CACHE_SIZE", 1000))
+result_cache_ttl_s = float(os.environ.get("RESULT_CACHE_TTL_S", 600))
+result_cache_precision = int(os.environ.get("RESULT_CACHE_PRECISION", 4))
+
+# Hourly precomputed grid for GET /snapshot: "lat_min,lat_max,lon_min,lon_max,step" or a CSV
+# with latitude,longitude columns (empty disables it)
+snapshot_grid = os.environ.get("SNAPSHOT_GRID", "")
+snapshot_interval_s = float(os.environ.get("SNAPSHOT_INTERVAL_S", 3600))
+snapshot_offset_s = float(os.environ.get("SNAPSHOT_OFFSET_S", 300))
+snapshot_history_days = int(os.environ.get("SNAPSHOT_HISTORY_DAYS", 10))
+snapshot_batch_size = int(os.environ.get("SNAPSHOT_BATCH_SIZE", 256))
+snapshot_path = os.environ.get("SNAPSHOT_PATH", "./cache/grid_snapshot.npz")
 warnings.filterwarnings('ignore')
 
 # Define the model architectures
 class WindPressurePatchTST(nn.Module):
     def __init__(self, num_features=12, seq_len=128, pred_len=24, patch_len=16, stride=8,
-                 d_model=64, n_layers=2, n_heads=4, dropout=0.1):
+                 d_model=64, n_layers=2, n_heads=4, dropout=0.1, num_stations=0):
         super().__init__()
 
         self.num_features = num_features
+        self.num_stations = num_stations
         self.seq_len = seq_len
         self.pred_len = pred_len
         self.patch_len = patch_len
@@ -42,6 +99,9 @@ class WindPressurePatchTST(nn.Module):
         # Positional encoding
         self.pos_embed = nn.Parameter(torch.randn(1, self.num_patches, d_model))
 
+        # Learned location embedding for a model shared across stations (0 = single-site model)
+        self.station_embed = nn.Embedding(num_stations, d_model) if num_stations else None
+
         # Transformer encoder
         encoder_layer = nn.TransformerEncoderLayer(
             d_model=d_model,
@@ -62,22 +122,18 @@ class WindPressurePatchTST(nn.Module):
 
         self.dropout = nn.Dropout(dropout)
 
-    def forward(self, x):
-        # x shape: (batch_size, seq_len, num_features)
-        batch_size = x.size(0)
+    def forward(self, x, station_ids=None):
+        # x shape: (batch_size, seq_len, num_features); station_ids: (batch_size,) int64
 
-        # Create patches
-        patches = []
-        for i in range(0, self.seq_len - self.patch_len + 1, self.stride):
-            patch = x[:, i:i+self.patch_len, :]  # (batch_size, patch_len, num_features)
-            patch = patch.reshape(batch_size, -1)  # (batch_size, patch_len * num_features)
-            patches.append(patch)
-
-        patches = torch.stack(patches, dim=1)  # (batch_size, num_patches, patch_len * num_features)
+        # Create patches as strided views: (batch_size, num_patches, num_features, patch_len)
+        patches = x.unfold(1, self.patch_len, self.stride)
+        patches = patches.transpose(2, 3).flatten(2)  # (batch_size, num_patches, patch_len * num_features)
 
         # Embed patches
         x_emb = self.patch_embed(patches)  # (batch_size, num_patches, d_model)
         x_emb = x_emb + self.pos_embed
+        if self.station_embed is not None and station_ids is not None:
+            x_emb = x_emb + self.station_embed(station_ids).unsqueeze(1)
 
         # Transformer encoding
         x_emb = self.dropout(x_emb)
@@ -88,10 +144,67 @@ class WindPressurePatchTST(nn.Module):
 
         # Forecasting
         forecast = self.forecast_head(global_rep)  # (batch_size, pred_len * num_features)
-        forecast = forecast.view(batch_size, self.pred_len, self.num_features)  # (batch_size, pred_len, num_features)
+        forecast = forecast.view(-1, self.pred_len, self.num_features)  # (batch_size, pred_len, num_features)
 
         return forecast
 
+class KerasStyleLSTM(nn.Module):
+    """LSTM layer with Keras gate order (i, f, c, o) and ReLU cell activation, as trained in Keras"""
+    def __init__(self, input_size, units, return_sequences=True):
+        super().__init__()
+        self.units = units
+        self.return_sequences = return_sequences
+        self.kernel = nn.Parameter(torch.zeros(input_size, 4 * units))
+        self.recurrent_kernel = nn.Parameter(torch.zeros(units, 4 * units))
+        self.bias = nn.Parameter(torch.zeros(4 * units))
+
+    def forward(self, x):
+        # x shape: (batch_size, time_steps, input_size)
+        batch_size, time_steps, _ = x.shape
+
+        # Input projection for every time step at once
+        projected = x @ self.kernel + self.bias
+        h = x.new_zeros(batch_size, self.units)
+        c = x.new_zeros(batch_size, self.units)
+
+        outputs = []
+        for t in range(time_steps):
+            z = projected[:, t] + h @ self.recurrent_kernel
+            i, f, g, o = z.chunk(4, dim=1)
+            c = torch.sigmoid(f) * c + torch.sigmoid(i) * torch.relu(g)
+            h = torch.sigmoid(o) * torch.relu(c)
+            if self.return_sequences:
+                outputs.append(h)
+
+        return torch.stack(outputs, dim=1) if self.return_sequences else h
+
+class LSTMAutoencoder(nn.Module):
+    """PyTorch port of the Keras LSTM weather autoencoder (see model_training/autoencoder_converter.py)"""
+    def __init__(self, time_steps=24, features=12, latent_dim=8):
+        super().__init__()
+        self.time_steps = time_steps
+
+        # Encoder
+        self.encoder_lstm1 = KerasStyleLSTM(features, 32, return_sequences=True)
+        self.encoder_lstm2 = KerasStyleLSTM(32, 16, return_sequences=False)
+        self.latent = nn.Linear(16, latent_dim)
+
+        # Decoder
+        self.decoder_lstm1 = KerasStyleLSTM(latent_dim, 16, return_sequences=True)
+        self.decoder_lstm2 = KerasStyleLSTM(16, 32, return_sequences=True)
+        self.output_layer = nn.Linear(32, features)
+
+    def forward(self, x):
+        encoded = torch.relu(self.latent(self.encoder_lstm2(self.encoder_lstm1(x))))
+        repeated = encoded.unsqueeze(1).expand(-1, self.time_steps, -1)
+        return self.output_layer(self.decoder_lstm2(self.decoder_lstm1(repeated)))
+
+    def predict(self, sequences):
+        """Keras-style predict: NumPy windows in, NumPy reconstructions out"""
+        with torch.no_grad():
+            x = torch.from_numpy(np.ascontiguousarray(sequences, dtype=np.float32))
+            return self(x).numpy()
+
 # Initialize FastAPI app
 app = FastAPI(title="Weather Forecasting & Anomaly Detection API")
 
@@ -102,28 +215,165 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "ETag", "X-Cache", "Content-Encoding"],
 )
 
+@app.middleware("http")
+async def record_request_timing(request, call_next):
+    """Latency histogram per route plus a Server-Timing header with the stages this request went through"""
+    timings = start_request_timing()
+    started = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - started
+    
+    # Route templates (/forecast/{forecast_id}/plot) keep the label set small
+    route = request.scope.get("route")
+    HTTP_SECONDS.observe(elapsed, method=request.method, route=getattr(route, "path", "unmatched"),
+                         status=str(response.status_code))
+    response.headers["Server-Timing"] = server_timing_header(timings, elapsed)
+    return response
+
 # Pydantic models
 class ForecastRequest(BaseModel):
     latitude: float
     longitude: float
     start_date: str  # Format: "YYYY-MM-DD"
     end_date: str    # Format: "YYYY-MM-DD"
+    include_plot: bool = False  # otherwise fetch it later from /forecast/{forecast_id}/plot
 
 class ForecastResponse(BaseModel):
+    forecast_id: str
     forecast: Dict[str, List[float]]
     anomaly_detection: Dict[str, Any]
     reconstruction_error: float
-    plot_data: str  # base64 encoded plot
+    plot_data: Optional[str] = None  # base64 encoded plot, only when include_plot was set
+    timestamp: str
+    metadata: Dict[str, Any]
+
+class BatchForecastRequest(BaseModel):
+    locations: List[ForecastRequest]
+
+class BatchForecastItem(BaseModel):
+    forecast_id: Optional[str] = None
+    forecast: Dict[str, List[float]] = {}
+    anomaly_detection: Dict[str, Any] = {}
+    reconstruction_error: Optional[float] = None
+    metadata: Dict[str, Any]
+    error: Optional[str] = None  # set when this location failed, the rest of the batch still runs
+
+class BatchForecastResponse(BaseModel):
+    results: List[BatchForecastItem]
     timestamp: str
     metadata: Dict[str, Any]
 
+# Endpoints returning Representations also answer in these formats (picked by the Accept header)
+BINARY_RESPONSES = {200: {"content": {MSGPACK: {}, OCTET_STREAM: {}}}}
+
 # Global variables for models
 forecast_model = None
-forecast_scalers = None
+forecast_scaler = None
 forecast_target_names = None
+forecast_stations = None
 autoencoder_model = None
+http_client = None
+tile_cache = None
+window_store = None
+snapshot_scheduler = None
+# model -> content hash of the artifact being served (part of the result cache key)
+model_versions = {}
+
+# forecast_id -> (historical_data, forecast, anomaly_results) for on-demand plots,
+# and forecast_id -> rendered PNG bytes. Both are bounded LRU maps.
+forecast_store = OrderedDict()
+plot_cache = OrderedDict()
+
+# Blocking work runs here so the event loop keeps serving other requests.
+# pyplot keeps global state, so plotting stays on its own (single-thread by default) pool.
+inference_executor = ThreadPoolExecutor(max_workers=inference_workers, thread_name_prefix="inference")
+plot_executor = ThreadPoolExecutor(max_workers=plot_workers, thread_name_prefix="plot")
+
+# Metrics served at /metrics (Prometheus text format)
+STAGE_SECONDS = Histogram("forecast_stage_seconds", "Time spent in each stage of the forecast pipeline")
+HTTP_SECONDS = Histogram("http_request_duration_seconds", "Request latency by route and status")
+ARCHIVE_REQUESTS = Counter("archive_fetch_requests_total", "Upstream archive API calls by status")
+ARCHIVE_BYTES = Counter("archive_fetch_bytes_total", "Response bytes received from the archive API")
+MODEL_INFO = Gauge("model_info", "Loaded model artifacts and their content hash (value is always 1)")
+TILE_CACHE_HOURS = Counter("archive_tile_cache_hours_total", "Archive hours served from the tile cache (hit) or fetched (miss)")
+TILE_CACHE_REQUESTS = Counter("archive_tile_cache_requests_total", "Tile cache lookups by outcome")
+TILE_CACHE_ROWS = Gauge("archive_tile_cache_rows", "Hours currently held in the tile cache")
+WINDOW_REFRESHES = Counter("location_window_refreshes_total", "Forecast windows by how they were built")
+RESULT_CACHE_REQUESTS = Counter("forecast_result_cache_requests_total",
+                                "/forecast calls answered from the result cache (hit), by joining an identical "
+                                "in-flight call (coalesced) or by running the pipeline (miss)")
+RESULT_CACHE_ENTRIES = Gauge("forecast_result_cache_entries", "Forecast bodies currently held in the result cache")
+BATCH_SIZE = Histogram("inference_batch_size", "Windows per micro-batched model call", buckets=BATCH_SIZE_BUCKETS)
+BATCH_WAIT_MS = Histogram("inference_queue_wait_milliseconds", "Time windows waited in the micro-batch queue",
+                          buckets=WAIT_MS_BUCKETS)
+
+def record_model_version(model, path, runtime="eager"):
+    """Replace the model_info series for one model with the artifact now being served"""
+    model_versions[model] = file_version(path)
+    MODEL_INFO.remove_matching(model=model)
+    MODEL_INFO.set(1, model=model, path=path, runtime=runtime, version=model_versions[model])
+
+def collect_component_metrics():
+    """Copy the counters the cache, window store and batcher keep themselves into the registry"""
+    if tile_cache is not None:
+        cache = tile_cache.stats()
+        TILE_CACHE_HOURS.set_total(cache["hit_hours"], result="hit")
+        TILE_CACHE_HOURS.set_total(cache["miss_hours"], result="miss")
+        for outcome in ("full_hits", "partial_hits", "full_misses"):
+            TILE_CACHE_REQUESTS.set_total(cache[outcome], outcome=outcome)
+        TILE_CACHE_ROWS.set(cache["rows"])
+    if window_store is not None:
+        WINDOW_REFRESHES.set_total(window_store.incremental_refreshes, kind="incremental")
+        WINDOW_REFRESHES.set_total(window_store.full_rebuilds, kind="full_rebuild")
+    if forecast_result_cache is not None:
+        RESULT_CACHE_REQUESTS.set_total(forecast_result_cache.hits, outcome="hit")
+        RESULT_CACHE_REQUESTS.set_total(forecast_result_cache.coalesced, outcome="coalesced")
+        RESULT_CACHE_REQUESTS.set_total(forecast_result_cache.misses, outcome="miss")
+        RESULT_CACHE_ENTRIES.set(len(forecast_result_cache))
+    # Every queued window records one wait, so their count is also the sum of batch sizes
+    BATCH_SIZE.set_counts(forecast_batcher.batch_size_counts, sum(forecast_batcher.wait_ms_counts))
+    BATCH_WAIT_MS.set_counts(forecast_batcher.wait_ms_counts, forecast_batcher.wait_ms_sum)
+
+REGISTRY.add_collector(collect_component_metrics)
+
+SNAPSHOT_AGE = Gauge("grid_snapshot_age_seconds", "Age of the grid snapshot served by /snapshot")
+SNAPSHOT_BUILDS = Counter("grid_snapshot_builds_total", "Scheduled grid snapshot builds by outcome")
+
+def collect_snapshot_metrics():
+    if snapshot_scheduler is None:
+        return
+    stats = snapshot_scheduler.stats()
+    if stats["age_s"] is not None:
+        SNAPSHOT_AGE.set(stats["age_s"])
+    SNAPSHOT_BUILDS.set_total(stats["builds"], outcome="ok")
+    SNAPSHOT_BUILDS.set_total(stats["failed_builds"], outcome="failed")
+
+REGISTRY.add_collector(collect_snapshot_metrics)
+
+def predict_batch(windows, station_ids):
+    """One stacked model call for the micro-batcher"""
+    with stage(STAGE_SECONDS, "model_batch"):
+        return predict_with_loaded_model(forecast_model, forecast_scaler, forecast_target_names, windows, station_ids)
+
+# Single /forecast windows are funnelled through this into batched model calls
+forecast_batcher = MicroBatcher(
+    predict_batch,
+    max_batch_size=micro_batch_max_size,
+    max_wait_ms=micro_batch_max_wait_ms,
+    executor=inference_executor
+)
+
+# Identical /forecast requests share one computation and its response body
+forecast_result_cache = (
+    ResultCache(max_entries=result_cache_size, ttl_s=result_cache_ttl_s) if result_cache_size > 0 else None
+)
+
+async def run_blocking(executor, func, *args):
+    """Run a blocking function on one of the bounded executors"""
+    return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
 
 # Target features in the correct order
 TARGET_FEATURES = [
@@ -133,56 +383,148 @@ TARGET_FEATURES = [
     'precipitation', 'cloud_cover', 'wind_direction_10m'
 ]
 
-# Fetch historical data from Open-Meteo API
-def fetch_historical_weather(latitude: float, longitude: float, start_date: str, end_date: str):
-    """Fetch historical weather data from Open-Meteo API"""
-    url = "https://archive-api.open-meteo.com/v1/archive"
-    
+# Hourly variables requested from the archive API
+ARCHIVE_HOURLY_VARIABLES = [
+    "temperature_2m", "relative_humidity_2m", "dew_point_2m",
+    "surface_pressure", "precipitation", "rain", "snowfall",
+    "cloud_cover", "wind_speed_10m", "wind_speed_100m",
+    "wind_direction_10m", "wind_gusts_10m",
+]
+
+async def fetch_archive_hourly(latitude: float, longitude: float, start_date: str, end_date: str):
+    """Fetch raw hourly rows from the Open-Meteo archive as a time-indexed DataFrame"""
     params = {
         "latitude": latitude,
         "longitude": longitude,
         "start_date": start_date,
         "end_date": end_date,
-        "hourly": [
-            "temperature_2m", "relative_humidity_2m", "dew_point_2m",
-            "surface_pressure", "precipitation", "rain", "snowfall",
-            "cloud_cover", "wind_speed_10m", "wind_speed_100m",
-            "wind_direction_10m", "wind_gusts_10m",
-        ],
+        "hourly": ARCHIVE_HOURLY_VARIABLES,
         "timezone": "auto"
     }
+    
+    with stage(STAGE_SECONDS, "upstream"):
+        try:
+            response = await http_client.get(archive_url, params=params)
+        except httpx.HTTPError:
+            ARCHIVE_REQUESTS.inc(status="error")
+            raise
+    ARCHIVE_REQUESTS.inc(status=str(response.status_code))
+    ARCHIVE_BYTES.inc(len(response.content))
+    response.raise_for_status()
+    data = response.json()
+    
+    # Convert to DataFrame. Hours not yet in the archive come back as nulls; a range that is
+    # all null would otherwise give object columns that poison the merge with cached rows
+    df = pd.DataFrame(data['hourly'])
+    df['time'] = pd.to_datetime(df['time'])
+    df.set_index('time', inplace=True)
+    return df.apply(pd.to_numeric, errors="coerce").astype(np.float64)
+
+async def fetch_archive_hourly_cached(latitude: float, longitude: float, start_date: str, end_date: str):
+    """Serve archive rows from the tile cache, fetching only the days it is missing"""
+    if tile_cache is None:
+        return await fetch_archive_hourly(latitude, longitude, start_date, end_date)
+    
+    # Requests are snapped to the tile centre so every caller in a cell shares rows
+    cell_latitude, cell_longitude = tile_cache.cell_of(latitude, longitude)
+    cached = await asyncio.to_thread(tile_cache.load, cell_latitude, cell_longitude, start_date, end_date)
+    missing = tile_cache.missing_ranges(cached, start_date, end_date)
+    
+    fetched = await asyncio.gather(*(
+        fetch_archive_hourly(cell_latitude, cell_longitude, range_start, range_end)
+        for range_start, range_end in missing
+    ))
+    for df in fetched:
+        await asyncio.to_thread(tile_cache.store, cell_latitude, cell_longitude, df)
+    
+    # Freshly fetched rows win over partially cached days
+    frames = [df[tile_cache.variables] for df in fetched if len(df)]
+    fetched_index = pd.DatetimeIndex([]) if not frames else pd.concat(frames).index
+    cached = cached[~cached.index.isin(fetched_index)]
+    tile_cache.record(len(cached), len(fetched_index), len(missing))
+    
+    if len(cached):
+        frames.insert(0, cached)
+    if not frames:
+        return cached
+    return pd.concat(frames).sort_index()
 
+async def fetch_raw_weather(latitude: float, longitude: float, start_date: str, end_date: str):
+    """Raw archive rows (tile cache first), with upstream failures surfaced as HTTP 500"""
     try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
-        
-        # Convert to DataFrame
-        df = pd.DataFrame(data['hourly'])
-        df['time'] = pd.to_datetime(df['time'])
-        df.set_index('time', inplace=True)
-        
-        # Calculate derived features
-        df['pressure_tendency'] = df['surface_pressure'].diff(3)   # 3-hour pressure change
-        df['wind_shear'] = df['wind_speed_100m'] - df['wind_speed_10m']
-        
-        # Select and reorder the features we need
-        available_features = [f for f in TARGET_FEATURES if f in df.columns]
-        df = df[available_features]
-        
-        # Fill NaN values
-        df = df.ffill().bfill()
-        
-        print(f"✅ Fetched {len(df)} records with features: {list(df.columns)}")
-        return df
-        
+        return await fetch_archive_hourly_cached(latitude, longitude, start_date, end_date)
     except Exception as e:
         print(f"❌ Error fetching data: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch weather data: {str(e)}")
 
+def build_feature_frame(df):
+    """Derive model features from raw archive rows and fill gaps"""
+    # Calculate derived features
+    df['pressure_tendency'] = df['surface_pressure'].diff(3)   # 3-hour pressure change
+    df['wind_shear'] = df['wind_speed_100m'] - df['wind_speed_10m']
+    
+    # Select and reorder the features we need
+    available_features = [f for f in TARGET_FEATURES if f in df.columns]
+    df = df[available_features]
+    
+    # Fill NaN values
+    return df.ffill().bfill()
+
+# Fetch historical data from Open-Meteo API
+async def fetch_historical_weather(latitude: float, longitude: float, start_date: str, end_date: str):
+    """Fetch historical weather data from Open-Meteo API"""
+    df = build_feature_frame(await fetch_raw_weather(latitude, longitude, start_date, end_date))
+    print(f"✅ Fetched {len(df)} records with features: {list(df.columns)}")
+    return df
+
+class FeatureScaler:
+    """Per-feature standardization with contiguous float32 mean/scale vectors
+
+    Works on any (..., num_features) array with one broadcast op, replacing
+    a StandardScaler per feature on the inference path. A shared multi-station
+    model has (stations, features) stats; station_ids then picks each
+    window's row.
+    """
+    def __init__(self, mean, scale):
+        self.mean = np.ascontiguousarray(mean, dtype=np.float32)
+        self.scale = np.ascontiguousarray(scale, dtype=np.float32)
+    
+    def _params(self, station_ids):
+        if self.mean.ndim == 1 or station_ids is None:
+            return self.mean, self.scale
+        # (batch, 1, features) so every window in the batch uses its own station's stats
+        return self.mean[station_ids][:, np.newaxis], self.scale[station_ids][:, np.newaxis]
+    
+    def transform(self, data, station_ids=None):
+        mean, scale = self._params(station_ids)
+        return (data - mean) / scale
+    
+    def inverse_transform(self, data, station_ids=None):
+        mean, scale = self._params(station_ids)
+        return data * scale + mean
+
+class StationIndex:
+    """Stations a shared forecaster was trained on, looked up by nearest great-circle distance"""
+    def __init__(self, names, coords):
+        self.names = list(names)
+        self.coords = np.asarray(coords, dtype=np.float64)
+        self._lat = np.radians(self.coords[:, 0])
+        self._lon = np.radians(self.coords[:, 1])
+    
+    def nearest(self, latitude, longitude):
+        """Index of the closest station (haversine over all stations at once)"""
+        lat, lon = np.radians(latitude), np.radians(longitude)
+        a = (np.sin((self._lat - lat) / 2) ** 2
+             + np.cos(lat) * np.cos(self._lat) * np.sin((self._lon - lon) / 2) ** 2)
+        return int(np.nanargmin(a))
+
 # Model loading functions
 def load_forecast_model_simple(filepath="./cust_train1/sundarban.pth"):
-    """Load forecasting model with fixed architecture"""
+    """Load forecasting model with fixed architecture
+
+    Returns (model, scaler, target_names, stations); stations is a
+    StationIndex for a shared multi-station checkpoint and None otherwise.
+    """
     device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
     
     try:
@@ -201,47 +543,111 @@ def load_forecast_model_simple(filepath="./cust_train1/sundarban.pth"):
             d_model=64,
             n_layers=2,
             n_heads=4,
-            dropout=0.1
+            dropout=0.1,
+            num_stations=checkpoint.get('num_stations', 0)
         )
         
         model.load_state_dict(checkpoint['model_state_dict'])
         model.to(device)
         model.eval()
         
-        # Recreate scalers
-        loaded_scalers = {}
-        scaler_params = checkpoint.get('dataset_scalers', {})
+        # One model for many sites: (stations, features) stats and the station locations
+        if checkpoint.get('num_stations', 0):
+            loaded_scaler = FeatureScaler(checkpoint['station_mean'], checkpoint['station_scale'])
+            stations = StationIndex(checkpoint['station_names'], checkpoint['station_coords'])
+            return model, loaded_scaler, target_names, stations
         
-        for name in target_names:
-            if name in scaler_params:
-                scaler = StandardScaler()
-                scaler.mean_ = np.array([scaler_params[name]['mean_']])
-                scaler.scale_ = np.array([scaler_params[name]['scale_']])
-                scaler.var_ = np.array([scaler_params[name]['var_']])
-                scaler.n_samples_seen_ = scaler_params[name]['n_samples_seen_']
-                loaded_scalers[name] = scaler
-            else:
-                # Create a default scaler if not found
-                scaler = StandardScaler()
-                scaler.mean_ = np.array([0.0])
-                scaler.scale_ = np.array([1.0])
-                scaler.var_ = np.array([1.0])
-                scaler.n_samples_seen_ = 1
-                loaded_scalers[name] = scaler
+        # Collapse the per-feature scaler params into flat mean/scale vectors
+        # (features missing from the checkpoint get an identity scaling)
+        scaler_params = checkpoint.get('dataset_scalers', {})
+        mean = [np.ravel(scaler_params[name]['mean_'])[0] if name in scaler_params else 0.0
+                for name in target_names]
+        scale = [np.ravel(scaler_params[name]['scale_'])[0] if name in scaler_params else 1.0
+                 for name in target_names]
+        loaded_scaler = FeatureScaler(mean, scale)
         
-        return model, loaded_scalers, target_names
+        return model, loaded_scaler, target_names, None
         
     except Exception as e:
         print(f"Error loading forecast model: {e}")
         print(traceback.format_exc())
         raise
 
+class CompiledForecastModel:
+    """Exported forecaster (TorchScript or ONNX Runtime) behind the eager model's call interface"""
+    device = torch.device('cpu')
+    
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.scripted = None
+        self.session = None
+        
+        if filepath.endswith(".onnx"):
+            import onnxruntime as ort
+            self.session = ort.InferenceSession(filepath, providers=["CPUExecutionProvider"])
+            self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+            takes_station_ids = len(self.input_names) > 1
+        else:
+            self.scripted = torch.jit.load(filepath, map_location='cpu').eval()
+            takes_station_ids = len(self.scripted.forward.schema.arguments) > 2  # self, x[, station_ids]
+        # Only the truthiness matters to callers: exported with a station input or not
+        self.num_stations = int(takes_station_ids)
+    
+    def __call__(self, x, station_ids=None):
+        inputs = (x,) if station_ids is None else (x, station_ids)
+        if self.scripted is not None:
+            return self.scripted(*inputs)
+        return torch.from_numpy(self.session.run(
+            None, {name: value.cpu().numpy() for name, value in zip(self.input_names, inputs)}
+        )[0])
+    
+    def eval(self):
+        return self
+
+def load_compiled_forecast_model(runtime=forecast_runtime, filepath_prefix=forecast_export_prefix):
+    """Load the artifact written by export_forecast_model for the requested runtime"""
+    extensions = {"torchscript": ".ts", "onnx": ".onnx"}
+    if runtime not in extensions:
+        raise ValueError(f"Unknown FORECAST_RUNTIME {runtime!r}, expected eager, torchscript or onnx")
+    return CompiledForecastModel(f"{filepath_prefix}{extensions[runtime]}")
+
+class AutoencoderWrapper:
+    """Autoencoder model plus the scaler and window config it was trained with"""
+    def __init__(self, model, scaler, time_steps, features, latent_dim, threshold):
+        self.model = model
+        self.scaler = scaler
+        self.time_steps = time_steps
+        self.features = features
+        self.latent_dim = latent_dim
+        self.threshold = threshold
+        
+    def prepare_sequences(self, data, max_samples=None):
+        """Normalize data and return its sliding windows as a strided view (no copy)"""
+        # Normalize data
+        scaled_data = self.scaler.transform(data)
+        
+        # Limit number of samples if specified
+        if max_samples and len(scaled_data) > max_samples:
+            indices = np.random.choice(len(scaled_data), max_samples, replace=False)
+            scaled_data = scaled_data[indices]
+        
+        # (windows, time_steps, features) view over scaled_data
+        return sliding_window_view(scaled_data, self.time_steps, axis=0).transpose(0, 2, 1)
+        
+    def prepare_data(self, data, train_ratio=0.8, max_samples=None):
+        """Prepare time series data for training with optional sampling"""
+        sequences = self.prepare_sequences(data, max_samples)
+        
+        # Split into train/test (views as well)
+        train_size = int(len(sequences) * train_ratio)
+        X_train = sequences[:train_size]
+        X_test = sequences[train_size:]
+        
+        return X_train, X_test, sequences
+
 def load_autoencoder_model(filepath="./cust_train1/weather_autoencoder"):
     """Load autoencoder model"""
     try:
-        # Import tensorflow only when needed
-        from tensorflow.keras.models import load_model
-        
         # Load configuration
         config_data = np.load(f"./{filepath}_config.npz")
         time_steps = int(config_data['time_steps'])
@@ -249,52 +655,24 @@ def load_autoencoder_model(filepath="./cust_train1/weather_autoencoder"):
         latent_dim = int(config_data['latent_dim'])
         threshold = float(config_data['threshold'])
         
-        # Load Keras model
-        keras_model = load_model(f"{filepath}_model.h5", compile=False)
+        # Prefer the PyTorch port written by autoencoder_converter.py; Keras is the fallback
+        torch_path = f"{filepath}_torch.pth"
+        if os.path.exists(torch_path):
+            checkpoint = torch.load(torch_path, map_location='cpu', weights_only=True)
+            reconstruction_model = LSTMAutoencoder(time_steps, features, latent_dim)
+            reconstruction_model.load_state_dict(checkpoint['model_state_dict'])
+            reconstruction_model.eval()
+            print(f"✅ Autoencoder served by PyTorch from {torch_path}")
+        else:
+            # Import tensorflow only when needed
+            from tensorflow.keras.models import load_model
+            reconstruction_model = load_model(f"{filepath}_model.h5", compile=False)
         
         # Load scaler parameters
         scaler_data = np.load(f"{filepath}_scaler.npz")
-        scaler = StandardScaler()
-        scaler.mean_ = scaler_data['mean']
-        scaler.scale_ = scaler_data['scale']
-        scaler.var_ = scaler_data['var']
-        scaler.n_samples_seen_ = scaler_data['n_samples_seen']
-        
-        # Create a simple class to hold the model and scaler
-        class AutoencoderWrapper:
-            def __init__(self, model, scaler, time_steps, features, latent_dim, threshold):
-                self.model = model
-                self.scaler = scaler
-                self.time_steps = time_steps
-                self.features = features
-                self.latent_dim = latent_dim
-                self.threshold = threshold
-                
-            def prepare_data(self, data, train_ratio=0.8, max_samples=None):
-                """Prepare time series data for training with optional sampling"""
-                # Normalize data
-                scaled_data = self.scaler.transform(data)
-                
-                # Limit number of samples if specified
-                if max_samples and len(scaled_data) > max_samples:
-                    indices = np.random.choice(len(scaled_data), max_samples, replace=False)
-                    scaled_data = scaled_data[indices]
-                
-                # Create sequences
-                sequences = []
-                for i in range(len(scaled_data) - self.time_steps + 1):
-                    sequences.append(scaled_data[i:i + self.time_steps])
-                
-                sequences = np.array(sequences)
-                
-                # Split into train/test
-                train_size = int(len(sequences) * train_ratio)
-                X_train = sequences[:train_size]
-                X_test = sequences[train_size:]
-                
-                return X_train, X_test, sequences
+        scaler = FeatureScaler(scaler_data['mean'], scaler_data['scale'])
         
-        autoencoder = AutoencoderWrapper(keras_model, scaler, time_steps, features, latent_dim, threshold)
+        autoencoder = AutoencoderWrapper(reconstruction_model, scaler, time_steps, features, latent_dim, threshold)
         return autoencoder
         
     except Exception as e:
@@ -302,125 +680,692 @@ def load_autoencoder_model(filepath="./cust_train1/weather_autoencoder"):
         print(traceback.format_exc())
         raise
 
+def checkpoint_sources(checkpoint="./cust_train1/sundarban.pth", autoencoder_prefix="./cust_train1/weather_autoencoder"):
+    """role -> path of the separate checkpoint files a serving bundle is built from"""
+    return {
+        "forecast": checkpoint,
+        "autoencoder_weights": f"{autoencoder_prefix}_torch.pth",
+        "autoencoder_config": f"{autoencoder_prefix}_config.npz",
+        "autoencoder_scaler": f"{autoencoder_prefix}_scaler.npz"
+    }
+
+def stale_bundle_sources(bundle_sources):
+    """Roles whose checkpoint on disk differs from the one the bundle was built from
+
+    Checkpoints that aren't deployed next to the bundle can't be stale.
+    """
+    return [
+        role for role, path in checkpoint_sources().items()
+        if os.path.exists(path) and bundle_sources.get(role) != file_version(path)
+    ]
+
+def load_serving_bundle(filepath=serving_bundle_path, check_sources=True):
+    """Load both models from the bundle written by build_serving_bundle.py
+
+    The bundle holds only tensors, numbers and strings (weights, flat
+    mean/scale vectors and architecture config), so it loads with
+    weights_only=True and nothing from training has to be unpickled.
+    Returns (model, scaler, target_names, stations, autoencoder) like the
+    separate loaders, or None when check_sources is set and a checkpoint
+    has changed since the bundle was built (e.g. a retrained sundarban.pth).
+    """
+    bundle = torch.load(filepath, map_location='cpu', weights_only=True)
+    if check_sources:
+        stale = stale_bundle_sources(bundle.get('sources', {}))
+        if stale:
+            print(f"⚠️ Serving bundle {filepath} is older than its checkpoints ({', '.join(stale)}); "
+                  f"rebuild it with build_serving_bundle.py")
+            return None
+    
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    
+    forecast = bundle['forecast']
+    model = WindPressurePatchTST(**forecast['config'])
+    model.load_state_dict(forecast['state_dict'])
+    model.to(device)
+    model.eval()
+    target_names = list(forecast['target_names'])
+    scaler = FeatureScaler(forecast['mean'].numpy(), forecast['scale'].numpy())
+    stations = None
+    if forecast['config']['num_stations']:
+        stations = StationIndex(forecast['station_names'], forecast['station_coords'].numpy())
+    
+    config = bundle['autoencoder']
+    reconstruction_model = LSTMAutoencoder(config['time_steps'], config['features'], config['latent_dim'])
+    reconstruction_model.load_state_dict(config['state_dict'])
+    reconstruction_model.eval()
+    autoencoder = AutoencoderWrapper(
+        reconstruction_model, FeatureScaler(config['mean'].numpy(), config['scale'].numpy()),
+        config['time_steps'], config['features'], config['latent_dim'], config['threshold']
+    )
+    
+    return model, scaler, target_names, stations, autoencoder
+
 # Load models at startup
 @app.on_event("startup")
 async def load_models():
-    global forecast_model, forecast_scalers, forecast_target_names, autoencoder_model
+    global forecast_model, forecast_scaler, forecast_target_names, autoencoder_model, http_client, tile_cache
+    global window_store, forecast_stations, snapshot_scheduler
+    
+    # One pooled client for all archive calls (keep-alive connections are reused)
+    http_client = httpx.AsyncClient(
+        timeout=http_timeout_s,
+        limits=httpx.Limits(max_connections=http_max_connections,
+                            max_keepalive_connections=http_max_connections)
+    )
+    
+    if tile_cache_path:
+        tile_cache = ArchiveTileCache(
+            tile_cache_path, ARCHIVE_HOURLY_VARIABLES,
+            precision=tile_cache_precision, max_rows=tile_cache_max_rows
+        )
+        print(f"✅ Archive tile cache at {tile_cache_path}")
     
     try:
-        # Load forecasting model
-        forecast_model, forecast_scalers, forecast_target_names = load_forecast_model_simple()
-        print("✅ Forecast model loaded successfully")
+        started = time.perf_counter()
+        # One weights-only file for both models, unless its checkpoints changed since it was built
+        bundle = None
+        if serving_bundle_path and os.path.exists(serving_bundle_path):
+            bundle = load_serving_bundle(serving_bundle_path)
+        if bundle is not None:
+            (forecast_model, forecast_scaler, forecast_target_names, forecast_stations,
+             autoencoder_model) = bundle
+            print(f"✅ Models loaded from serving bundle {serving_bundle_path}")
+            record_model_version("forecast", serving_bundle_path)
+            record_model_version("autoencoder", serving_bundle_path)
+        else:
+            forecast_model, forecast_scaler, forecast_target_names, forecast_stations = load_forecast_model_simple()
+            print("✅ Forecast model loaded successfully")
+            record_model_version("forecast", "./cust_train1/sundarban.pth")
+        if forecast_stations is not None:
+            print(f"✅ Shared forecaster covers {len(forecast_stations.names)} stations")
         
-        # Load autoencoder model
-        autoencoder_model = load_autoencoder_model()
-        print("✅ Autoencoder model loaded successfully")
+        # Swap in the exported runtime when one is configured (scalers still come from the checkpoint)
+        if forecast_runtime != "eager":
+            try:
+                forecast_model = load_compiled_forecast_model()
+                print(f"✅ Serving forecaster from {forecast_model.filepath} ({forecast_runtime})")
+                record_model_version("forecast", forecast_model.filepath, forecast_runtime)
+            except Exception as e:
+                print(f"❌ Could not load {forecast_runtime} forecaster, staying on eager PyTorch: {e}")
+        
+        window_store = WindowStore(
+            forecast_target_names, capacity=window_state_hours,
+            precision=tile_cache_precision, max_locations=window_state_max_locations
+        )
+        
+        if autoencoder_model is None:
+            autoencoder_model = load_autoencoder_model()
+            print("✅ Autoencoder model loaded successfully")
+            torch_path = "./cust_train1/weather_autoencoder_torch.pth"
+            record_model_version("autoencoder", torch_path if os.path.exists(torch_path)
+                                 else "./cust_train1/weather_autoencoder_model.h5")
+        print(f"⏱️ Models ready in {(time.perf_counter() - started) * 1000:.0f} ms")
         
     except Exception as e:
         print(f"❌ Error loading models: {e}")
         print(traceback.format_exc())
+    
+    await forecast_batcher.start()
+    print(f"✅ Inference batcher started (max batch {micro_batch_max_size}, window {micro_batch_max_wait_ms} ms)")
+    
+    if snapshot_grid and forecast_model is not None and autoencoder_model is not None:
+        snapshot_scheduler = SnapshotScheduler(
+            build_grid_snapshot, interval_s=snapshot_interval_s, offset_s=snapshot_offset_s, path=snapshot_path
+        )
+        await snapshot_scheduler.start()
+        print(f"✅ Grid snapshot scheduler started ({len(load_grid_points(snapshot_grid)[0])} points "
+              f"every {snapshot_interval_s:.0f} s)")
 
-# Forecasting endpoint
-@app.post("/forecast", response_model=ForecastResponse)
-async def make_forecast(request: ForecastRequest):
-    try:
-        # Fetch historical data from Open-Meteo
-        historical_df = fetch_historical_weather(
-            request.latitude, 
-            request.longitude, 
-            request.start_date, 
-            request.end_date
+@app.on_event("shutdown")
+async def shutdown():
+    if snapshot_scheduler is not None:
+        await snapshot_scheduler.stop()
+    await forecast_batcher.stop()
+    if http_client is not None:
+        await http_client.aclose()
+
+def prepare_forecast_window(historical_df):
+    """Validate fetched history and return the most recent 128 hours as (128, num_features)"""
+    if len(historical_df) < 128:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Need at least 128 hours of data. Got only {len(historical_df)} hours."
+        )
+    
+    # Ensure we have all the required features
+    missing_features = [f for f in forecast_target_names if f not in historical_df.columns]
+    if missing_features:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Missing required features: {missing_features}"
         )
+    
+    # Take the most recent 128 hours for forecasting
+    return historical_df[forecast_target_names].tail(128).values.astype(np.float32)
+
+def station_for(latitude, longitude):
+    """(station id, station name) of the nearest training station; (0, None) for a single-site model"""
+    if forecast_stations is None:
+        return 0, None
+    station_id = forecast_stations.nearest(latitude, longitude)
+    return station_id, forecast_stations.names[station_id]
+
+async def load_forecast_window(latitude, longitude, start_date, end_date):
+    """Most recent 128 hours of features for a request as (128, num_features)
+
+    A location seen before keeps its recent hours in a ring buffer, so a
+    refresh only fetches and derives the hours after the last complete one.
+    Anything else (first request, a gap, an older end date) rebuilds the
+    window from the full date range. Also returns the number of hours in the
+    requested range, which is the same whichever way the window was built.
+    """
+    key = window_store.key(latitude, longitude)
+    window = window_store.get(key)
+    start_time = np.datetime64(start_date, 'h')
+    end_time = np.datetime64(end_date, 'h') + 23 * ONE_HOUR
+    history_hours = int((end_time - start_time) // ONE_HOUR) + 1
+    
+    if (window is not None and window.last_time is not None
+            and end_time - start_time >= 127 * ONE_HOUR
+            and window.last_time <= end_time
+            and end_time - window.last_time <= window.capacity * ONE_HOUR
+            and window.size + (end_time - window.last_time) // ONE_HOUR >= 128):
+        provisional = np.empty((0, len(forecast_target_names)), dtype=np.float32)
+        last_time = window.last_time
         
-        if len(historical_df) < 128:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Need at least 128 hours of data. Got only {len(historical_df)} hours."
-            )
+        if last_time < end_time:
+            raw_df = await fetch_raw_weather(latitude, longitude, str(last_time.astype('datetime64[D]')), end_date)
+            raw_df = raw_df[raw_df.index > pd.Timestamp(last_time)]
+            times = raw_df.index.values.astype('datetime64[h]')
+            expected = last_time + np.arange(1, len(times) + 1) * ONE_HOUR
+            
+            if window.last_time == last_time and np.array_equal(times, expected):
+                provisional = window.extend(
+                    times, {name: raw_df[name].to_numpy(dtype=np.float64) for name in ARCHIVE_HOURLY_VARIABLES}
+                )
+            else:
+                window = None
         
-        # Ensure we have all the required features
-        missing_features = [f for f in forecast_target_names if f not in historical_df.columns]
-        if missing_features:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Missing required features: {missing_features}"
+        if window is not None:
+            window_store.incremental_refreshes += 1
+            committed = window.latest(128 - len(provisional))
+            historical_data = np.vstack([committed, provisional])[-128:].astype(np.float32)
+            return historical_data, history_hours
+    
+    # Full rebuild over the requested range
+    window_store.full_rebuilds += 1
+    raw_df = await fetch_raw_weather(latitude, longitude, start_date, end_date)
+    complete_index = raw_df[ARCHIVE_HOURLY_VARIABLES].dropna().index
+    historical_df = build_feature_frame(raw_df)
+    historical_data = prepare_forecast_window(historical_df)
+    
+    # Seed the ring buffer, but never rewind state that is already newer
+    if len(complete_index):
+        last_complete_time = np.datetime64(complete_index[-1], 'h')
+        window = window_store.get(key)
+        if window is None or window.last_time is None or window.last_time <= last_complete_time:
+            window = window or window_store.create(key)
+            window.seed(
+                historical_df.index.values.astype('datetime64[h]'),
+                historical_df[forecast_target_names].values.astype(np.float32),
+                last_complete_time
             )
-        
-        # Take the most recent 128 hours for forecasting
-        historical_data = historical_df[forecast_target_names].tail(128).values.astype(np.float32)
-        
-        # Make forecast using PatchTST
-        forecast_results = predict_with_loaded_model(
-            forecast_model, forecast_scalers, forecast_target_names, historical_data
+    
+    return historical_data, history_hours
+
+def normalize_date(value):
+    """'YYYY-MM-DD' for anything numpy reads as a date, otherwise the value unchanged"""
+    try:
+        return str(np.datetime64(value.strip(), 'D'))
+    except ValueError:
+        return value
+
+def forecast_cache_key(request):
+    """Requests that produce the same forecast body share a key
+
+    The model versions are part of it, so a redeployed checkpoint never
+    serves results computed by the previous one.
+    """
+    return (
+        round(request.latitude, result_cache_precision) + 0.0,  # + 0.0 folds -0.0 into 0.0
+        round(request.longitude, result_cache_precision) + 0.0,
+        normalize_date(request.start_date),
+        normalize_date(request.end_date),
+        request.include_plot,
+        model_versions.get("forecast"),
+        model_versions.get("autoencoder")
+    )
+
+def batch_item(metadata, error=None):
+    """One /forecast/batch result with the BatchForecastItem defaults"""
+    return {
+        "forecast_id": None,
+        "forecast": {},
+        "anomaly_detection": {},
+        "reconstruction_error": None,
+        "metadata": metadata,
+        "error": error
+    }
+
+def feature_columns(forecast):
+    """{feature: (24,) view} of a (24, features) forecast, for the response payload"""
+    return {feature_name: forecast[:, i] for i, feature_name in enumerate(forecast_target_names)}
+
+# Forecasting endpoint
+@app.post("/forecast", response_model=ForecastResponse, responses=BINARY_RESPONSES)
+async def make_forecast(request: ForecastRequest, http_request: Request):
+    """Cached and coalesced front of run_forecast, with content negotiation and ETags
+
+    Accept picks JSON (the default, gzip/brotli compressed when accepted),
+    application/msgpack (forecast arrays as little-endian float32 bytes) or
+    application/octet-stream (see response_encoding.encode_frame). The
+    metadata location of a cached body is that of the request that computed
+    it (equal up to RESULT_CACHE_PRECISION decimals).
+    """
+    async def compute():
+        payload, forecast_results = await run_forecast(request)
+        frame_header = {key: value for key, value in payload.items() if key != "forecast"}
+        return Representations(payload, forecast_results, frame_header, forecast_target_names)
+    
+    if forecast_result_cache is None:
+        representations, max_age, outcome = await compute(), 0, "disabled"
+    else:
+        representations, max_age, outcome = await forecast_result_cache.get_or_compute(
+            forecast_cache_key(request), compute
         )
+    
+    return representations.response(
+        http_request.headers, {"Cache-Control": f"private, max-age={int(max_age)}", "X-Cache": outcome}
+    )
+
+async def run_forecast(request: ForecastRequest):
+    """Fetch, predict and score one location (the full /forecast pipeline)
+
+    Returns the ForecastResponse fields as a dict, with the forecast as
+    per-feature array views, and the (24, features) forecast itself.
+    """
+    try:
+        # Latest 128 hours for this location (only new hours are fetched on refresh)
+        with stage(STAGE_SECONDS, "fetch"):
+            historical_data, history_hours = await load_forecast_window(
+                request.latitude, 
+                request.longitude, 
+                request.start_date, 
+                request.end_date
+            )
         
-        # Prepare forecast results
-        forecast_dict = {}
-        for i, feature_name in enumerate(forecast_target_names):
-            forecast_dict[feature_name] = forecast_results[:, i].tolist()
+        # Make forecast using PatchTST (batched with concurrent requests; includes the queue wait)
+        station_id, station_name = station_for(request.latitude, request.longitude)
+        with stage(STAGE_SECONDS, "predict"):
+            forecast_results = await forecast_batcher.submit(historical_data, station_id)
         
         # Detect anomalies using autoencoder
-        anomaly_results = detect_anomalies_with_autoencoder(autoencoder_model, forecast_results)
-        
-        # Generate plot
-        plot_base64 = generate_comprehensive_plot(historical_data, forecast_results, forecast_target_names, anomaly_results)
-        
-        response = ForecastResponse(
-            forecast=forecast_dict,
-            anomaly_detection=anomaly_results,
-            reconstruction_error=anomaly_results['latest_reconstruction_error'],
-            plot_data=plot_base64,
-            timestamp=datetime.now().isoformat(),
-            metadata={
+        with stage(STAGE_SECONDS, "anomaly"):
+            anomaly_results = await run_blocking(
+                inference_executor, detect_anomalies_with_autoencoder, autoencoder_model, forecast_results
+            )
+        
+        # Keep what the plot needs; it's only rendered when asked for
+        forecast_id = remember_forecast(historical_data, forecast_results, anomaly_results)
+        plot_base64 = None
+        if request.include_plot:
+            plot_base64 = base64.b64encode(await get_forecast_plot_png(forecast_id)).decode('utf-8')
+        
+        payload = {
+            "forecast_id": forecast_id,
+            "forecast": feature_columns(forecast_results),
+            "anomaly_detection": anomaly_results,
+            "reconstruction_error": anomaly_results['latest_reconstruction_error'],
+            "plot_data": plot_base64,
+            "timestamp": datetime.now().isoformat(),
+            "metadata": {
                 "location": {"latitude": request.latitude, "longitude": request.longitude},
                 "data_period": {"start": request.start_date, "end": request.end_date},
-                "historical_data_points": len(historical_df),
-                "features_available": list(historical_df.columns),
-                "forecast_horizon": 24
+                "historical_data_points": history_hours,
+                "features_available": list(forecast_target_names),
+                "forecast_horizon": 24,
+                "station": station_name
             }
-        )
+        }
         
-        return response
+        return payload, forecast_results
         
     except Exception as e:
         print(f"Forecast error: {e}")
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Forecast error: {str(e)}")
 
-def predict_with_loaded_model(model, scalers, target_names, new_data):
-    """Make predictions using loaded model"""
-    device = next(model.parameters()).device
+# Batched forecasting endpoint (one PatchTST + one autoencoder pass for all locations)
+@app.post("/forecast/batch", response_model=BatchForecastResponse, responses=BINARY_RESPONSES)
+async def make_batch_forecast(request: BatchForecastRequest, http_request: Request):
+    """Negotiates the same representations as /forecast; the octet-stream array is
+    (locations, 24, features) with NaN rows for locations that failed"""
+    if len(request.locations) > max_batch_locations:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {max_batch_locations} locations per batch. Got {len(request.locations)}."
+        )
+    
+    try:
+        # Fetch all locations concurrently, bounded so we don't hammer the archive API
+        fetch_limit = asyncio.Semaphore(batch_fetch_concurrency)
+        
+        async def fetch_window(location):
+            async with fetch_limit:
+                return await load_forecast_window(
+                    location.latitude,
+                    location.longitude,
+                    location.start_date,
+                    location.end_date
+                )
+        
+        with stage(STAGE_SECONDS, "batch_fetch"):
+            fetched = await asyncio.gather(
+                *(fetch_window(location) for location in request.locations),
+                return_exceptions=True
+            )
+        
+        results = []
+        windows = []
+        station_ids = []
+        ok_indices = []
+        for idx, (location, outcome) in enumerate(zip(request.locations, fetched)):
+            metadata = {
+                "location": {"latitude": location.latitude, "longitude": location.longitude},
+                "data_period": {"start": location.start_date, "end": location.end_date},
+                "forecast_horizon": 24
+            }
+            if isinstance(outcome, BaseException):
+                detail = outcome.detail if isinstance(outcome, HTTPException) else str(outcome)
+                results.append(batch_item(metadata, error=str(detail)))
+                continue
+            
+            historical_data, history_hours = outcome
+            station_id, metadata["station"] = station_for(location.latitude, location.longitude)
+            metadata["historical_data_points"] = history_hours
+            metadata["features_available"] = list(forecast_target_names)
+            results.append(batch_item(metadata))
+            windows.append(historical_data)
+            station_ids.append(station_id)
+            ok_indices.append(idx)
+        
+        if windows:
+            # (N, 128, num_features) -> (N, 24, num_features) in a single forward pass
+            with stage(STAGE_SECONDS, "batch_predict"):
+                forecast_results = await run_blocking(
+                    inference_executor, predict_with_loaded_model,
+                    forecast_model, forecast_scaler, forecast_target_names, np.stack(windows),
+                    np.array(station_ids, dtype=np.int64)
+                )
+            with stage(STAGE_SECONDS, "batch_anomaly"):
+                anomaly_results = await run_blocking(
+                    inference_executor, detect_anomalies_batch_with_autoencoder, autoencoder_model, forecast_results
+                )
+            
+            for idx, window, forecast, anomalies in zip(ok_indices, windows, forecast_results, anomaly_results):
+                item = results[idx]
+                item["forecast_id"] = remember_forecast(window, forecast, anomalies)
+                item["forecast"] = feature_columns(forecast)
+                item["anomaly_detection"] = anomalies
+                item["reconstruction_error"] = anomalies['latest_reconstruction_error']
+        
+        # One float32 block for every location, NaN where it failed
+        forecast_block = np.full((len(results), 24, len(forecast_target_names)), np.nan, dtype=np.float32)
+        if windows:
+            forecast_block[ok_indices] = forecast_results
+        
+        payload = {
+            "results": results,
+            "timestamp": datetime.now().isoformat(),
+            "metadata": {
+                "requested_locations": len(request.locations),
+                "forecasted_locations": len(windows),
+                "failed_locations": len(request.locations) - len(windows)
+            }
+        }
+        frame_header = dict(payload, results=[
+            {key: value for key, value in item.items() if key != "forecast"} for item in results
+        ])
+        
+        representations = Representations(payload, forecast_block, frame_header, forecast_target_names)
+        return representations.response(http_request.headers)
+        
+    except Exception as e:
+        print(f"Batch forecast error: {e}")
+        print(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"Batch forecast error: {str(e)}")
+
+async def build_grid_snapshot():
+    """Forecast and score every SNAPSHOT_GRID point in batches (one scheduled run)
+
+    Windows come through load_forecast_window, so after the first run each
+    point only fetches the hours added since the previous one.
+    """
+    latitudes, longitudes = load_grid_points(snapshot_grid)
+    now = datetime.now()
+    start_date = (now - timedelta(days=snapshot_history_days)).strftime("%Y-%m-%d")
+    end_date = now.strftime("%Y-%m-%d")
+    
+    fetch_limit = asyncio.Semaphore(batch_fetch_concurrency)
+    
+    async def fetch_window(latitude, longitude):
+        async with fetch_limit:
+            return await load_forecast_window(latitude, longitude, start_date, end_date)
+    
+    with stage(STAGE_SECONDS, "snapshot_fetch"):
+        fetched = await asyncio.gather(
+            *(fetch_window(float(latitude), float(longitude)) for latitude, longitude in zip(latitudes, longitudes)),
+            return_exceptions=True
+        )
+    valid = np.array([not isinstance(outcome, BaseException) for outcome in fetched])
+    if not valid.any():
+        raise RuntimeError(f"No grid point could be fetched: {fetched[0]}")
+    
+    num_points = len(latitudes)
+    forecast = np.full((num_points, 24, len(forecast_target_names)), np.nan, dtype=np.float32)
+    reconstruction_error = np.full(num_points, np.nan, dtype=np.float32)
+    has_anomaly = np.zeros(num_points, dtype=bool)
+    
+    ok_indices = np.flatnonzero(valid)
+    for batch_start in range(0, len(ok_indices), snapshot_batch_size):
+        indices = ok_indices[batch_start:batch_start + snapshot_batch_size]
+        windows = np.stack([fetched[i][0] for i in indices])
+        station_ids = np.array([station_for(latitudes[i], longitudes[i])[0] for i in indices], dtype=np.int64)
+        
+        with stage(STAGE_SECONDS, "snapshot_predict"):
+            forecast[indices] = await run_blocking(
+                inference_executor, predict_with_loaded_model,
+                forecast_model, forecast_scaler, forecast_target_names, windows, station_ids
+            )
+        with stage(STAGE_SECONDS, "snapshot_anomaly"):
+            anomalies = await run_blocking(
+                inference_executor, detect_anomalies_batch_with_autoencoder, autoencoder_model, forecast[indices]
+            )
+        reconstruction_error[indices] = [anomaly['latest_reconstruction_error'] for anomaly in anomalies]
+        has_anomaly[indices] = [anomaly['has_anomaly'] for anomaly in anomalies]
+    
+    return GridSnapshot(
+        latitudes, longitudes, forecast, reconstruction_error, has_anomaly, valid,
+        forecast_target_names, autoencoder_model.threshold - threshold_bias, time.time(), start_date, end_date
+    )
+
+def current_snapshot():
+    snapshot = snapshot_scheduler.snapshot if snapshot_scheduler is not None else None
+    if snapshot is None:
+        detail = "Grid snapshots are disabled (set SNAPSHOT_GRID)" if not snapshot_grid else "No grid snapshot built yet"
+        raise HTTPException(status_code=503, detail=detail)
+    return snapshot
+
+def snapshot_info(snapshot):
+    return {
+        "created_at": datetime.fromtimestamp(snapshot.created_at).isoformat(),
+        "data_period": {"start": snapshot.start_date, "end": snapshot.end_date},
+        "points": len(snapshot),
+        "forecast_horizon": 24
+    }
+
+# Precomputed outlook for the nearest grid point, or interpolated from the closest few
+@app.get("/snapshot", responses=BINARY_RESPONSES)
+async def get_snapshot(http_request: Request, lat: float, lon: float, max_distance_km: Optional[float] = None,
+                       interpolate: bool = False, neighbours: int = 4):
+    snapshot = current_snapshot()
+    
+    index, distance_km = snapshot.nearest(lat, lon)
+    if max_distance_km is not None and distance_km > max_distance_km:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Nearest grid point is {distance_km:.1f} km away (max_distance_km={max_distance_km})"
+        )
+    
+    if interpolate:
+        if not 1 <= neighbours <= 16:
+            raise HTTPException(status_code=400, detail="neighbours must be between 1 and 16")
+        forecast, reconstruction_error, indices, weights = snapshot.interpolate(lat, lon, k=neighbours)
+        grid_points = [
+            {
+                "latitude": float(snapshot.latitudes[i]),
+                "longitude": float(snapshot.longitudes[i]),
+                "weight": round(float(weight), 6)
+            }
+            for i, weight in zip(indices, weights)
+        ]
+        # Flag the interpolated point if any contributing grid point is anomalous
+        has_anomaly = bool(snapshot.has_anomaly[indices].any())
+    else:
+        forecast = snapshot.forecast[index]
+        reconstruction_error = float(snapshot.reconstruction_error[index])
+        grid_points = None
+        has_anomaly = bool(snapshot.has_anomaly[index])
+    
+    payload = {
+        "grid_point": {
+            "latitude": float(snapshot.latitudes[index]),
+            "longitude": float(snapshot.longitudes[index]),
+            "distance_km": round(distance_km, 3)
+        },
+        "forecast": {feature_name: forecast[:, i] for i, feature_name in enumerate(snapshot.target_names)},
+        "anomaly_detection": {
+            "has_anomaly": has_anomaly,
+            "latest_reconstruction_error": reconstruction_error,
+            "anomaly_threshold": snapshot.anomaly_threshold
+        },
+        "snapshot": snapshot_info(snapshot)
+    }
+    if grid_points is not None:
+        payload["interpolation"] = {"method": "inverse_distance", "power": 2.0, "grid_points": grid_points}
+    frame_header = {key: value for key, value in payload.items() if key != "forecast"}
+    return Representations(payload, forecast, frame_header, snapshot.target_names).response(http_request.headers)
+
+# Every precomputed grid point inside a lat/lon box (lon_min > lon_max crosses the antimeridian)
+@app.get("/snapshot/bbox", responses=BINARY_RESPONSES)
+async def get_snapshot_bbox(http_request: Request, lat_min: float, lat_max: float, lon_min: float, lon_max: float):
+    snapshot = current_snapshot()
+    if lat_min > lat_max:
+        raise HTTPException(status_code=400, detail="lat_min must not exceed lat_max")
+    
+    indices = snapshot.within_bbox(lat_min, lat_max, lon_min, lon_max)
+    if len(indices) > max_batch_locations:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {max_batch_locations} grid points per box. Got {len(indices)}; narrow the box."
+        )
+    
+    forecast = snapshot.forecast[indices]
+    points = [
+        {
+            "latitude": float(snapshot.latitudes[i]),
+            "longitude": float(snapshot.longitudes[i]),
+            "has_anomaly": bool(snapshot.has_anomaly[i]),
+            "latest_reconstruction_error": float(snapshot.reconstruction_error[i])
+        }
+        for i in indices
+    ]
+    payload = {
+        "points": [
+            dict(point, forecast={
+                feature_name: forecast[n, :, j] for j, feature_name in enumerate(snapshot.target_names)
+            })
+            for n, point in enumerate(points)
+        ],
+        "anomaly_threshold": snapshot.anomaly_threshold,
+        "snapshot": snapshot_info(snapshot)
+    }
+    frame_header = dict(payload, points=points)
+    return Representations(payload, forecast, frame_header, snapshot.target_names).response(http_request.headers)
+
+def predict_with_loaded_model(model, scaler, target_names, new_data, station_ids=None):
+    """Make predictions using loaded model
+
+    new_data is either one window (hours, features) or a stack of windows
+    (batch, hours, features); the output has the matching (24, features) or
+    (batch, 24, features) shape. station_ids (one per window, or a single
+    int) select the station stats and embedding of a shared model.
+    """
+    device = getattr(model, 'device', None) or next(model.parameters()).device
     model.eval()
     
-    # Normalize new data using saved scalers
-    normalized_data = np.zeros_like(new_data)
-    for i, feature_name in enumerate(target_names):
-        feature_data = new_data[:, i].reshape(-1, 1)
-        normalized_data[:, i] = scalers[feature_name].transform(feature_data).flatten()
+    single_window = new_data.ndim == 2
+    if single_window:
+        new_data = new_data[np.newaxis]
+    if not getattr(model, 'num_stations', 0):
+        station_ids = None
+    elif station_ids is not None:
+        station_ids = np.broadcast_to(np.asarray(station_ids, dtype=np.int64), (len(new_data),))
     
-    # Create sequence (last 128 hours)
-    sequence = normalized_data[-128:]
-    sequence_tensor = torch.FloatTensor(sequence).unsqueeze(0).to(device)
+    # Normalize the last 128 hours of every window in one broadcast op
+    sequence = scaler.transform(new_data[:, -128:].astype(np.float32, copy=False), station_ids)
+    sequence_tensor = torch.from_numpy(np.ascontiguousarray(sequence)).to(device)
     
     # Predict
     with torch.no_grad():
-        prediction = model(sequence_tensor)
-        prediction = prediction.squeeze(0).cpu().numpy()
+        if station_ids is None:
+            prediction = model(sequence_tensor)
+        else:
+            prediction = model(sequence_tensor, torch.from_numpy(np.ascontiguousarray(station_ids)).to(device))
+        prediction = prediction.cpu().numpy()
     
     # Denormalize predictions
-    denorm_predictions = np.zeros_like(prediction)
-    for i, feature_name in enumerate(target_names):
-        feature_pred = prediction[:, i].reshape(-1, 1)
-        denorm_predictions[:, i] = scalers[feature_name].inverse_transform(feature_pred).flatten()
-    
+    denorm_predictions = scaler.inverse_transform(prediction, station_ids)
     
+    if single_window:
+        return denorm_predictions[0]
     return denorm_predictions
 
+def summarize_reconstruction_errors(autoencoder, mse):
+    """Turn per-window reconstruction errors into the anomaly_detection payload"""
+    # Identify anomalies
+    anomalies = mse > autoencoder.threshold-threshold_bias
+    
+    # Get the latest error if available
+    latest_error = float(mse[-1]) if len(mse) > 0 else 0.0
+    
+    return {
+        "has_anomaly": bool(anomalies[-1]) if len(anomalies) > 0 else False,
+        "latest_reconstruction_error": latest_error,
+        "anomaly_threshold": float(autoencoder.threshold-threshold_bias),
+        "total_anomalies": int(np.sum(anomalies)),
+        "anomaly_indices": np.where(anomalies)[0].tolist(),
+        "reconstruction_errors": mse.tolist()[-24:]  # Last 24 errors
+    }
+
+def anomaly_detection_error(e):
+    """Fallback anomaly_detection payload when the autoencoder fails"""
+    return {
+        "has_anomaly": False,
+        "latest_reconstruction_error": 0.0,
+        "anomaly_threshold": 0.0,
+        "total_anomalies": 0,
+        "anomaly_indices": [],
+        "reconstruction_errors": [],
+        "error": str(e)
+    }
+
 def detect_anomalies_with_autoencoder(autoencoder, data):
     """Detect anomalies using autoencoder"""
     try:
         # Prepare data for autoencoder
-        _, _, sequences = autoencoder.prepare_data(data)
+        sequences = autoencoder.prepare_sequences(data)
         
         # Get reconstructions
         reconstructions = autoencoder.model.predict(sequences)
@@ -428,84 +1373,134 @@ def detect_anomalies_with_autoencoder(autoencoder, data):
         # Calculate reconstruction error
         mse = np.mean(np.square(sequences - reconstructions), axis=(1, 2))
         
-        # Identify anomalies
-        anomalies = mse > autoencoder.threshold-threshold_bias
+        return summarize_reconstruction_errors(autoencoder, mse)
         
-        # Get the latest error if available
-        latest_error = float(mse[-1]) if len(mse) > 0 else 0.0
+    except Exception as e:
+        print(f"Anomaly detection error: {e}")
+        print(traceback.format_exc())
+        return anomaly_detection_error(e)
+
+def detect_anomalies_batch_with_autoencoder(autoencoder, batch_data):
+    """Detect anomalies for a stack of series with a single autoencoder predict call"""
+    try:
+        # Windows of every series, remembering where each series' windows end
+        per_series = [autoencoder.prepare_sequences(data) for data in batch_data]
+        boundaries = np.cumsum([len(sequences) for sequences in per_series])[:-1]
+        sequences = np.concatenate(per_series)
         
-        return {
-            "has_anomaly": bool(anomalies[-1]) if len(anomalies) > 0 else False,
-            "latest_reconstruction_error": latest_error,
-            "anomaly_threshold": float(autoencoder.threshold-threshold_bias),
-            "total_anomalies": int(np.sum(anomalies)),
-            "anomaly_indices": np.where(anomalies)[0].tolist(),
-            "reconstruction_errors": mse.tolist()[-24:]  # Last 24 errors
-        }
+        # Get reconstructions
+        reconstructions = autoencoder.model.predict(sequences)
+        
+        # Calculate reconstruction error
+        mse = np.mean(np.square(sequences - reconstructions), axis=(1, 2))
+        
+        return [summarize_reconstruction_errors(autoencoder, series_mse)
+                for series_mse in np.split(mse, boundaries)]
         
     except Exception as e:
         print(f"Anomaly detection error: {e}")
         print(traceback.format_exc())
-        return {
-            "has_anomaly": False,
-            "latest_reconstruction_error": 0.0,
-            "anomaly_threshold": 0.0,
-            "total_anomalies": 0,
-            "anomaly_indices": [],
-            "reconstruction_errors": [],
-            "error": str(e)
-        }
+        return [anomaly_detection_error(e) for _ in batch_data]
+
+def remember_forecast(historical_data, forecast, anomaly_results):
+    """Keep a forecast's plot inputs under a new id (oldest entries are dropped)"""
+    forecast_id = uuid.uuid4().hex
+    forecast_store[forecast_id] = (historical_data[-48:], forecast, anomaly_results)
+    while len(forecast_store) > forecast_store_size:
+        forecast_store.popitem(last=False)
+    return forecast_id
 
-def generate_comprehensive_plot(historical_data, forecast, target_names, anomaly_results):
-    """Generate comprehensive plot with historical data, forecast, and anomalies"""
-    plt.figure(figsize=(16, 12))
+async def get_forecast_plot_png(forecast_id):
+    """Rendered PNG for a stored forecast, from the plot cache when possible"""
+    png = plot_cache.get(forecast_id)
+    if png is not None:
+        plot_cache.move_to_end(forecast_id)
+        return png
     
-    # Plot key features
-    key_features = ['temperature_2m', 'wind_speed_10m', 'surface_pressure', 'relative_humidity_2m']
-    colors = ['red', 'blue', 'green', 'orange']
+    entry = forecast_store.get(forecast_id)
+    if entry is None:
+        return None
     
-    for i, feature_name in enumerate(target_names):
-        if feature_name in key_features:
-            feature_idx = target_names.index(feature_name)
-            
-            # Historical data (last 48 hours)
-            historical_hours = range(-48, 0)
-            historical_to_plot = historical_data[-48:, feature_idx]
-            
-            # Forecast (next 24 hours)
-            forecast_hours = range(0, 24)
-            forecast_to_plot = forecast[:, feature_idx]
-            
-            plt.plot(historical_hours, historical_to_plot, 
-                    color=colors[key_features.index(feature_name)], 
-                    linestyle='-', linewidth=2, label=f'Historical {feature_name}')
-            
-            plt.plot(forecast_hours, forecast_to_plot, 
-                    color=colors[key_features.index(feature_name)], 
-                    linestyle='--', linewidth=2, label=f'Forecast {feature_name}')
-    
-    # Add anomaly indicators
-    if anomaly_results['has_anomaly']:
-        plt.axvline(x=-1, color='red', linestyle=':', linewidth=3, alpha=0.7, 
-                   label=f'Anomaly detected (error: {anomaly_results["latest_reconstruction_error"]:.3f})')
-    
-    plt.axvline(x=0, color='black', linestyle='-', linewidth=2, alpha=0.7, label='Now')
-    plt.xlabel('Hours (0 = current time)')
-    plt.ylabel('Values')
-    plt.title('Weather Forecast with Anomaly Detection\n'
-             f'Anomaly Threshold: {anomaly_results["anomaly_threshold"]:.3f} | '
-             f'Current Error: {anomaly_results["latest_reconstruction_error"]:.3f}')
-    plt.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
-    plt.grid(True, alpha=0.3)
-    
-    # Convert plot to base64
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png', dpi=100, bbox_inches='tight')
-    buf.seek(0)
-    plot_base64 = base64.b64encode(buf.getvalue()).decode('utf-8')
-    plt.close()
-    
-    return plot_base64
+    historical_data, forecast, anomaly_results = entry
+    with stage(STAGE_SECONDS, "plot"):
+        png = await run_blocking(
+            plot_executor, render_comprehensive_plot_png,
+            historical_data, forecast, forecast_target_names, anomaly_results
+        )
+    plot_cache[forecast_id] = png
+    while len(plot_cache) > plot_cache_size:
+        plot_cache.popitem(last=False)
+    return png
+
+# One Agg figure is reused for every render (cleared in between)
+_plot_figure = None
+_plot_lock = threading.Lock()
+
+def render_comprehensive_plot_png(historical_data, forecast, target_names, anomaly_results):
+    """Render the historical/forecast/anomaly plot to PNG bytes"""
+    global _plot_figure
+    
+    with _plot_lock:
+        if _plot_figure is None:
+            # matplotlib is only needed for plots, so it is imported on the first render
+            from matplotlib.figure import Figure
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            _plot_figure = Figure(figsize=(16, 12))
+            FigureCanvasAgg(_plot_figure)
+        fig = _plot_figure
+        fig.clear()
+        ax = fig.add_subplot()
+        
+        # Plot key features
+        key_features = ['temperature_2m', 'wind_speed_10m', 'surface_pressure', 'relative_humidity_2m']
+        colors = ['red', 'blue', 'green', 'orange']
+        
+        for i, feature_name in enumerate(target_names):
+            if feature_name in key_features:
+                feature_idx = target_names.index(feature_name)
+                
+                # Historical data (last 48 hours)
+                historical_hours = range(-48, 0)
+                historical_to_plot = historical_data[-48:, feature_idx]
+                
+                # Forecast (next 24 hours)
+                forecast_hours = range(0, 24)
+                forecast_to_plot = forecast[:, feature_idx]
+                
+                ax.plot(historical_hours, historical_to_plot, 
+                        color=colors[key_features.index(feature_name)], 
+                        linestyle='-', linewidth=2, label=f'Historical {feature_name}')
+                
+                ax.plot(forecast_hours, forecast_to_plot, 
+                        color=colors[key_features.index(feature_name)], 
+                        linestyle='--', linewidth=2, label=f'Forecast {feature_name}')
+        
+        # Add anomaly indicators
+        if anomaly_results['has_anomaly']:
+            ax.axvline(x=-1, color='red', linestyle=':', linewidth=3, alpha=0.7, 
+                       label=f'Anomaly detected (error: {anomaly_results["latest_reconstruction_error"]:.3f})')
+        
+        ax.axvline(x=0, color='black', linestyle='-', linewidth=2, alpha=0.7, label='Now')
+        ax.set_xlabel('Hours (0 = current time)')
+        ax.set_ylabel('Values')
+        ax.set_title('Weather Forecast with Anomaly Detection\n'
+                     f'Anomaly Threshold: {anomaly_results["anomaly_threshold"]:.3f} | '
+                     f'Current Error: {anomaly_results["latest_reconstruction_error"]:.3f}')
+        ax.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
+        ax.grid(True, alpha=0.3)
+        
+        buf = io.BytesIO()
+        fig.savefig(buf, format='png', dpi=100, bbox_inches='tight')
+    
+    return buf.getvalue()
+
+# On-demand plot endpoint
+@app.get("/forecast/{forecast_id}/plot")
+async def get_forecast_plot(forecast_id: str):
+    png = await get_forecast_plot_png(forecast_id)
+    if png is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired forecast id: {forecast_id}")
+    return Response(content=png, media_type="image/png")
 
 # Health check endpoint
 @app.get("/health")
@@ -523,10 +1518,31 @@ async def model_info():
     return {
         "forecast_features": forecast_target_names if forecast_target_names else [],
         "forecast_horizon": 24,
+        "forecast_stations": forecast_stations.names if forecast_stations is not None else None,
         "autoencoder_time_steps": autoencoder_model.time_steps if autoencoder_model else None,
         "autoencoder_threshold": autoencoder_model.threshold-threshold_bias if autoencoder_model else None
     }
 
+# Micro-batching metrics endpoint
+@app.get("/batcher-stats")
+async def batcher_stats():
+    return forecast_batcher.stats()
+
+# Prometheus scrape endpoint
+@app.get("/metrics")
+async def prometheus_metrics():
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
+# Archive tile cache metrics endpoint
+@app.get("/cache-stats")
+async def cache_stats():
+    return {
+        "archive_tiles": tile_cache.stats() if tile_cache is not None else {"enabled": False},
+        "location_windows": window_store.stats() if window_store is not None else {"enabled": False},
+        "forecast_results": forecast_result_cache.stats() if forecast_result_cache is not None else {"enabled": False},
+        "grid_snapshot": snapshot_scheduler.stats() if snapshot_scheduler is not None else {"enabled": False}
+    }
+
 # Example request endpoint
 @app.get("/example-request")
 async def example_request():
@@ -0,0 +1,178 @@
+import gzip
+import hashlib
+import json
+import struct
+
+import msgpack
+import numpy as np
+from fastapi.responses import Response
+from pydantic_core import to_json
+
+try:
+    import brotli
+except ImportError:  # optional; without it only gzip is offered
+    brotli = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+OCTET_STREAM = "application/octet-stream"
+MEDIA_TYPES = {JSON: JSON, MSGPACK: MSGPACK, "application/x-msgpack": MSGPACK, OCTET_STREAM: OCTET_STREAM}
+
+# Float frames start with this, then a little-endian uint32 header length
+FRAME_MAGIC = b"WXF1"
+# Smaller JSON bodies are sent uncompressed (the codec overhead isn't worth it)
+MIN_COMPRESS_BYTES = 1024
+
+
+def _parse_header_values(value):
+    """[(token, q)] from an Accept / Accept-Encoding header, in header order"""
+    parsed = []
+    for part in (value or "").split(","):
+        token, *params = (piece.strip() for piece in part.split(";"))
+        if not token:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, number = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(number)
+                except ValueError:
+                    q = 0.0
+        parsed.append((token.lower(), q))
+    return parsed
+
+
+def choose_media_type(accept):
+    """Best supported media type for an Accept header; JSON when nothing more specific is asked for"""
+    best, best_q = JSON, 0.0
+    for token, q in _parse_header_values(accept):
+        media_type = MEDIA_TYPES.get(token)
+        if media_type is not None and q > best_q:
+            best, best_q = media_type, q
+    return best
+
+
+def choose_content_coding(accept_encoding):
+    """"br", "gzip" or None for an Accept-Encoding header (brotli wins ties when installed)"""
+    accepted = dict(_parse_header_values(accept_encoding))
+    wildcard = accepted.get("*", 0.0)
+    candidates = [(accepted.get("gzip", wildcard), 0, "gzip")]
+    if brotli is not None:
+        candidates.append((accepted.get("br", wildcard), 1, "br"))
+    q, _, coding = max(candidates)
+    return coding if q > 0 else None
+
+
+def _json_fallback(value):
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def encode_json(payload):
+    """Compact JSON through pydantic-core (same output as the response models gave; NaN becomes null)"""
+    return to_json(payload, fallback=_json_fallback, inf_nan_mode="null")
+
+
+def _msgpack_default(value):
+    # Arrays go out as raw little-endian float32 bytes (np.frombuffer(data, "<f4") on the client)
+    if isinstance(value, np.ndarray):
+        return np.ascontiguousarray(value, dtype="<f4").tobytes()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not MessagePack serializable")
+
+
+def encode_msgpack(payload):
+    return msgpack.packb(payload, default=_msgpack_default)
+
+
+def encode_frame(header, array, features):
+    """FRAME_MAGIC, uint32 header length, JSON header, then the array as little-endian float32
+
+    The header gets an "array" entry with the dtype, shape and the feature
+    names along the last axis. It is padded with spaces to a multiple of
+    4 bytes so the floats start aligned.
+    """
+    array = np.ascontiguousarray(array, dtype="<f4")
+    header = dict(header, array={"dtype": "<f4", "shape": list(array.shape), "features": list(features)})
+    header_bytes = encode_json(header)
+    header_bytes += b" " * (-(len(FRAME_MAGIC) + 4 + len(header_bytes)) % 4)
+    return FRAME_MAGIC + struct.pack("<I", len(header_bytes)) + header_bytes + array.tobytes()
+
+
+def decode_frame(body):
+    """(header, array) back from encode_frame output"""
+    if body[:4] != FRAME_MAGIC:
+        raise ValueError("Not a float frame")
+    (header_length,) = struct.unpack_from("<I", body, 4)
+    header = json.loads(body[8:8 + header_length])
+    array = np.frombuffer(body, dtype="<f4", offset=8 + header_length)
+    return header, array.reshape(header["array"]["shape"])
+
+
+def compress(body, coding):
+    # Fast settings: bodies are compressed per response, and batch bodies run to megabytes
+    if coding == "br":
+        return brotli.compress(body, quality=4)
+    if coding == "gzip":
+        return gzip.compress(body, compresslevel=1)
+    return body
+
+
+def etag_matches(if_none_match, etag):
+    """If-None-Match check (weak comparison, as RFC 9110 asks for)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+class Representations:
+    """The encoded bodies of one response payload, each built the first time it is asked for
+
+    payload holds numpy arrays where the JSON has float lists; they are only
+    converted by the JSON encoder. The octet-stream form is frame_header plus
+    array (the same values stacked into one float32 array whose last axis
+    follows features). Every representation gets its own strong ETag.
+    """
+
+    def __init__(self, payload, array, frame_header, features):
+        self.payload = payload
+        self.array = array
+        self.frame_header = frame_header
+        self.features = features
+        self._bodies = {}  # (media type, content coding) -> (body, etag, content coding)
+
+    def get(self, media_type, coding=None):
+        key = (media_type, coding)
+        if key not in self._bodies:
+            if media_type == MSGPACK:
+                body = encode_msgpack(self.payload)
+            elif media_type == OCTET_STREAM:
+                body = encode_frame(self.frame_header, self.array, self.features)
+            else:
+                body = encode_json(self.payload)
+            etag = hashlib.sha256(body).hexdigest()[:32]
+            if coding is not None and len(body) >= MIN_COMPRESS_BYTES:
+                body = compress(body, coding)
+                etag = f"{etag}-{coding}"
+            else:
+                coding = None
+            self._bodies[key] = (body, f'"{etag}"', coding)
+        return self._bodies[key]
+
+    def response(self, request_headers, headers=None):
+        """Response in the representation the request negotiates, or 304 when its ETag still matches"""
+        media_type = choose_media_type(request_headers.get("accept"))
+        coding = choose_content_coding(request_headers.get("accept-encoding")) if media_type == JSON else None
+        body, etag, coding = self.get(media_type, coding)
+
+        headers = dict(headers or {}, ETag=etag, Vary="Accept, Accept-Encoding")
+        if coding is not None:
+            headers["Content-Encoding"] = coding
+        if etag_matches(request_headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type=media_type, headers=headers)
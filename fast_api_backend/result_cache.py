@@ -0,0 +1,96 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+
+class ResultCache:
+    """TTL + LRU cache of computed results that also coalesces concurrent misses
+
+    Entries expire ttl_s seconds after they were computed and the least
+    recently used ones are dropped beyond max_entries. While a key is being
+    computed, later callers for the same key await that computation instead of
+    starting their own. The computation runs as its own task, so a caller that
+    goes away does not cancel it for the others. Failures are not cached.
+    """
+
+    def __init__(self, max_entries=1000, ttl_s=600.0):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._in_flight = {}  # key -> task computing it
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """(value, seconds left to live), or None when missing or expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        remaining = expires_at - time.monotonic()
+        if remaining <= 0:
+            del self._entries[key]
+            self.expired += 1
+            return None
+        self._entries.move_to_end(key)
+        return value, remaining
+
+    def put(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl_s, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_compute(self, key, compute):
+        """(value, seconds left to live, outcome) where outcome is "hit", "miss" or "coalesced"
+
+        compute is an async callable taking no arguments.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached[0], cached[1], "hit"
+
+        task = self._in_flight.get(key)
+        if task is None:
+            self.misses += 1
+            outcome = "miss"
+            task = asyncio.create_task(self._compute(key, compute))
+            self._in_flight[key] = task
+        else:
+            self.coalesced += 1
+            outcome = "coalesced"
+        value = await asyncio.shield(task)
+        return value, self.ttl_s, outcome
+
+    async def _compute(self, key, compute):
+        try:
+            value = await compute()
+            self.put(key, value)
+            return value
+        finally:
+            del self._in_flight[key]
+
+    def stats(self):
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_s": self.ttl_s,
+            "in_flight": len(self._in_flight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            "expired": self.expired,
+            "evictions": self.evictions
+        }
@@ -0,0 +1,67 @@
+import numpy as np
+from scipy.spatial import cKDTree
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def unit_vectors(latitudes, longitudes):
+    """(n, 3) points on the unit sphere, where straight-line distance ranks like great-circle distance"""
+    lat = np.radians(latitudes)
+    lon = np.radians(longitudes)
+    return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def chord_to_km(chord):
+    """Great-circle distance in km for a chord length on the unit sphere"""
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.minimum(np.asarray(chord) / 2.0, 1.0))
+
+
+class SpatialIndex:
+    """Nearest-neighbour and bounding-box lookups over a fixed set of lat/lon points
+
+    Nearest queries use a KD-tree over 3D unit-sphere coordinates, so they
+    are exact great-circle neighbours with no trouble at the poles or the
+    antimeridian. Bounding boxes use the points sorted by latitude: a binary
+    search for the latitude band, then a longitude filter on that band only.
+    """
+
+    def __init__(self, latitudes, longitudes):
+        self.latitudes = np.asarray(latitudes, dtype=np.float64)
+        self.longitudes = np.asarray(longitudes, dtype=np.float64)
+        self._tree = cKDTree(unit_vectors(self.latitudes, self.longitudes))
+        self._by_latitude = np.argsort(self.latitudes, kind="stable")
+        self._sorted_latitudes = self.latitudes[self._by_latitude]
+
+    def __len__(self):
+        return len(self.latitudes)
+
+    def nearest(self, latitude, longitude, k=1):
+        """(indices, distances_km) of the k closest points, nearest first"""
+        k = min(k, len(self))
+        chords, indices = self._tree.query(unit_vectors(latitude, longitude), k=k)
+        return np.atleast_1d(indices), chord_to_km(np.atleast_1d(chords))
+
+    def within_bbox(self, lat_min, lat_max, lon_min, lon_max):
+        """Indices of points inside the box; lon_min > lon_max means the box crosses the antimeridian"""
+        start = np.searchsorted(self._sorted_latitudes, lat_min, side="left")
+        stop = np.searchsorted(self._sorted_latitudes, lat_max, side="right")
+        candidates = self._by_latitude[start:stop]
+
+        longitudes = self.longitudes[candidates]
+        if lon_min <= lon_max:
+            inside = (longitudes >= lon_min) & (longitudes <= lon_max)
+        else:
+            inside = (longitudes >= lon_min) | (longitudes <= lon_max)
+        return np.sort(candidates[inside])
+
+    def idw_weights(self, latitude, longitude, k=4, power=2.0):
+        """(indices, weights) for inverse-distance interpolation from the k nearest points
+
+        Weights are 1 / distance**power, normalized to sum to one. A query
+        that lands on a point (within a metre) takes that point's values.
+        """
+        indices, distances_km = self.nearest(latitude, longitude, k)
+        if distances_km[0] < 1e-3:
+            return indices[:1], np.ones(1)
+        weights = 1.0 / distances_km ** power
+        return indices, weights / weights.sum()
@@ -0,0 +1,172 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+
+class ArchiveTileCache:
+    """Persistent cache of Open-Meteo archive hours, one tile per rounded lat/lon
+
+    Rows are stored per (cell, hour) in SQLite. Past archive hours never
+    change, so a request only needs the days that are not cached yet. Hours
+    with missing values (the archive lags real time by a few days) are not
+    stored and get fetched again on the next request. Whole cells are
+    evicted least-recently-used once the cache holds more than max_rows hours.
+    """
+
+    def __init__(self, path, variables, precision=2, max_rows=2_000_000):
+        self.path = path
+        self.variables = list(variables)
+        self.precision = precision
+        self.max_rows = max_rows
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        columns = ", ".join(f'"{variable}" REAL' for variable in self.variables)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cells ("
+            "cell TEXT PRIMARY KEY, latitude REAL, longitude REAL, last_access REAL, n_rows INTEGER)"
+        )
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS hours (cell TEXT, ts TEXT, {columns}, "
+            "PRIMARY KEY (cell, ts)) WITHOUT ROWID"
+        )
+        self._conn.commit()
+
+        # Counters (hours served from disk vs fetched upstream)
+        self.hit_hours = 0
+        self.miss_hours = 0
+        self.full_hits = 0
+        self.partial_hits = 0
+        self.full_misses = 0
+        self.upstream_calls = 0
+        self.evicted_cells = 0
+
+    def cell_of(self, latitude, longitude):
+        """Round a coordinate to its tile; the tile centre is what gets fetched"""
+        return round(latitude, self.precision), round(longitude, self.precision)
+
+    def _cell_key(self, latitude, longitude):
+        return f"{latitude:.{self.precision}f},{longitude:.{self.precision}f}"
+
+    def load(self, latitude, longitude, start_date, end_date):
+        """Cached hourly rows for a cell between two dates (inclusive) as a time-indexed DataFrame"""
+        cell = self._cell_key(latitude, longitude)
+        end_exclusive = (datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+        columns = ", ".join(f'"{variable}"' for variable in self.variables)
+
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT ts, {columns} FROM hours WHERE cell = ? AND ts >= ? AND ts < ? ORDER BY ts",
+                (cell, start_date, end_exclusive)
+            ).fetchall()
+            self._conn.execute("UPDATE cells SET last_access = ? WHERE cell = ?", (time.time(), cell))
+            self._conn.commit()
+
+        df = pd.DataFrame(rows, columns=["time"] + self.variables)
+        df["time"] = pd.to_datetime(df["time"])
+        return df.set_index("time")
+
+    @staticmethod
+    def missing_ranges(cached_df, start_date, end_date):
+        """Contiguous (start_date, end_date) runs of days that are not fully cached"""
+        hours_per_day = cached_df.index.normalize().value_counts() if len(cached_df) else {}
+        day = datetime.strptime(start_date, "%Y-%m-%d")
+        last_day = datetime.strptime(end_date, "%Y-%m-%d")
+
+        ranges = []
+        run_start = None
+        while day <= last_day:
+            # 23 covers the short day of a DST switch in the location's timezone
+            complete = hours_per_day.get(pd.Timestamp(day), 0) >= 23
+            if not complete and run_start is None:
+                run_start = day
+            if complete and run_start is not None:
+                ranges.append((run_start, day - timedelta(days=1)))
+                run_start = None
+            day += timedelta(days=1)
+        if run_start is not None:
+            ranges.append((run_start, last_day))
+
+        return [(start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")) for start, end in ranges]
+
+    def store(self, latitude, longitude, df):
+        """Persist complete hourly rows of a freshly fetched DataFrame"""
+        complete = df[self.variables].dropna()
+        if len(complete) == 0:
+            return
+
+        cell = self._cell_key(latitude, longitude)
+        timestamps = complete.index.strftime("%Y-%m-%dT%H:%M")
+        rows = [(cell, ts, *values) for ts, values in zip(timestamps, complete.itertuples(index=False, name=None))]
+        columns = ", ".join(f'"{variable}"' for variable in self.variables)
+        placeholders = ", ".join("?" for _ in range(len(self.variables) + 2))
+
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO hours (cell, ts, {columns}) VALUES ({placeholders})", rows
+            )
+            n_rows = self._conn.execute("SELECT COUNT(*) FROM hours WHERE cell = ?", (cell,)).fetchone()[0]
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cells (cell, latitude, longitude, last_access, n_rows) VALUES (?, ?, ?, ?, ?)",
+                (cell, latitude, longitude, time.time(), n_rows)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop least recently used cells until the cache fits in max_rows hours"""
+        total = self._conn.execute("SELECT COALESCE(SUM(n_rows), 0) FROM cells").fetchone()[0]
+        if total <= self.max_rows:
+            return
+
+        for cell, n_rows in self._conn.execute(
+                "SELECT cell, n_rows FROM cells ORDER BY last_access").fetchall():
+            if total <= self.max_rows:
+                break
+            self._conn.execute("DELETE FROM hours WHERE cell = ?", (cell,))
+            self._conn.execute("DELETE FROM cells WHERE cell = ?", (cell,))
+            total -= n_rows
+            self.evicted_cells += 1
+
+    def record(self, cached_hours, fetched_hours, upstream_calls):
+        """Update hit/miss counters after a request has been assembled"""
+        self.hit_hours += cached_hours
+        self.miss_hours += fetched_hours
+        self.upstream_calls += upstream_calls
+        if upstream_calls == 0:
+            self.full_hits += 1
+        elif cached_hours > 0:
+            self.partial_hits += 1
+        else:
+            self.full_misses += 1
+
+    def stats(self):
+        with self._lock:
+            cells, rows = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(n_rows), 0) FROM cells").fetchone()
+        served = self.hit_hours + self.miss_hours
+        return {
+            "path": self.path,
+            "precision": self.precision,
+            "cells": cells,
+            "rows": rows,
+            "max_rows": self.max_rows,
+            "hit_hours": self.hit_hours,
+            "miss_hours": self.miss_hours,
+            "hour_hit_ratio": self.hit_hours / served if served else 0.0,
+            "full_hits": self.full_hits,
+            "partial_hits": self.partial_hits,
+            "full_misses": self.full_misses,
+            "upstream_calls": self.upstream_calls,
+            "evicted_cells": self.evicted_cells
+        }
@@ -0,0 +1,124 @@
+from collections import OrderedDict
+
+import numpy as np
+
+ONE_HOUR = np.timedelta64(1, 'h')
+
+
+def forward_fill(values, previous_row):
+    """Forward-fill NaNs down each column, starting from an already filled previous row"""
+    stacked = np.vstack([previous_row[np.newaxis], values])
+    valid = ~np.isnan(stacked)
+    source_rows = np.where(valid, np.arange(len(stacked))[:, np.newaxis], 0)
+    np.maximum.accumulate(source_rows, axis=0, out=source_rows)
+    return stacked[source_rows, np.arange(stacked.shape[1])][1:]
+
+
+class LocationWindow:
+    """Preallocated ring buffer with the latest hourly feature rows of one location
+
+    Only rows up to the last fully observed hour are committed. Later hours
+    (still null in the archive) are handed back as provisional rows and get
+    recomputed from real values on a later refresh.
+    """
+
+    def __init__(self, feature_names, capacity=192):
+        self.feature_names = list(feature_names)
+        self.capacity = capacity
+        self.values = np.zeros((capacity, len(self.feature_names)), dtype=np.float32)
+        self.size = 0
+        self.head = 0  # slot the next committed row goes into
+        self.last_time = None
+
+        self._pressure_idx = self.feature_names.index('surface_pressure')
+
+    def seed(self, times, features, last_complete_time):
+        """Reset the buffer from a fully processed (hours, features) array"""
+        committed = times <= last_complete_time
+        self.size = 0
+        self.head = 0
+        self.last_time = None
+        self._commit(times[committed], features[committed])
+
+    def _commit(self, times, features):
+        if len(times) == 0:
+            return
+        features = features[-self.capacity:]
+        slots = (self.head + np.arange(len(features))) % self.capacity
+        self.values[slots] = features
+        self.head = int((slots[-1] + 1) % self.capacity)
+        self.size = min(self.capacity, self.size + len(features))
+        self.last_time = times[-1]
+
+    def latest(self, n):
+        """Last n committed rows in chronological order"""
+        n = min(n, self.size)
+        slots = (self.head - n + np.arange(n)) % self.capacity
+        return self.values[slots]
+
+    def extend(self, times, raw_columns):
+        """Append new hours and derive their features from the buffered history
+
+        raw_columns maps archive variable names to arrays aligned with times
+        (which must continue the buffer hour by hour). Returns the
+        provisional (uncommitted) feature rows after the last complete hour.
+        """
+        raw = np.column_stack([raw_columns[name] for name in ('surface_pressure', 'wind_speed_10m', 'wind_speed_100m')])
+        complete = ~np.isnan(np.column_stack(list(raw_columns.values()))).any(axis=1)
+
+        features = np.empty((len(times), len(self.feature_names)), dtype=np.float32)
+        for i, name in enumerate(self.feature_names):
+            if name == 'pressure_tendency':
+                # 3-hour pressure change, reaching back into the committed rows
+                history = self.latest(3)[:, self._pressure_idx]
+                pressure = np.concatenate([history, raw[:, 0]])
+                features[:, i] = pressure[3:] - pressure[:-3] if len(history) == 3 else np.nan
+            elif name == 'wind_shear':
+                features[:, i] = raw[:, 2] - raw[:, 1]
+            else:
+                features[:, i] = raw_columns[name]
+
+        features = forward_fill(features, self.latest(1)[0])
+
+        n_complete = int(np.max(np.nonzero(complete)[0]) + 1) if complete.any() else 0
+        self._commit(times[:n_complete], features[:n_complete])
+        return features[n_complete:]
+
+
+class WindowStore:
+    """Per-location LocationWindow objects, least recently used dropped beyond max_locations"""
+
+    def __init__(self, feature_names, capacity=192, precision=2, max_locations=10000):
+        self.feature_names = list(feature_names)
+        self.capacity = capacity
+        self.precision = precision
+        self.max_locations = max_locations
+        self._windows = OrderedDict()
+
+        self.incremental_refreshes = 0
+        self.full_rebuilds = 0
+
+    def key(self, latitude, longitude):
+        return round(latitude, self.precision), round(longitude, self.precision)
+
+    def get(self, key):
+        window = self._windows.get(key)
+        if window is not None:
+            self._windows.move_to_end(key)
+        return window
+
+    def create(self, key):
+        window = LocationWindow(self.feature_names, self.capacity)
+        self._windows[key] = window
+        self._windows.move_to_end(key)
+        while len(self._windows) > self.max_locations:
+            self._windows.popitem(last=False)
+        return window
+
+    def stats(self):
+        return {
+            "locations": len(self._windows),
+            "capacity_hours": self.capacity,
+            "incremental_refreshes": self.incremental_refreshes,
+            "full_rebuilds": self.full_rebuilds
+        }
@@ -0,0 +1,184 @@
+"""Convert the Keras LSTM weather autoencoder to PyTorch
+
+    python autoencoder_converter.py --model ./cust_train1/weather_autoencoder --data weather_store --station sundarban
+
+reads {model}_model.h5 with h5py (no TensorFlow needed), copies the weights
+into the same architecture written in PyTorch and saves {model}_torch.pth,
+which offline.py serves instead of the .h5 file. With TensorFlow installed
+it then checks reconstruction MSE parity against the Keras model on the
+training windows (the station's last 9000 hours in the weather store written
+by dataoader.py, as in autoencoder_trainer.py).
+"""
+import argparse
+
+import h5py
+import numpy as np
+import torch
+from torch import nn
+
+
+class KerasStyleLSTM(nn.Module):
+    """LSTM layer with Keras semantics: gates i, f, c, o and a configurable cell activation
+
+    torch.nn.LSTM hard-codes tanh, while the autoencoder was trained with
+    activation='relu', so the cell is written out explicitly.
+    """
+
+    def __init__(self, input_size, units, return_sequences=True, activation=torch.relu):
+        super().__init__()
+        self.units = units
+        self.return_sequences = return_sequences
+        self.activation = activation
+        self.kernel = nn.Parameter(torch.zeros(input_size, 4 * units))
+        self.recurrent_kernel = nn.Parameter(torch.zeros(units, 4 * units))
+        self.bias = nn.Parameter(torch.zeros(4 * units))
+
+    def forward(self, x):
+        # x shape: (batch_size, time_steps, input_size)
+        batch_size, time_steps, _ = x.shape
+
+        # Input projection for every time step at once
+        projected = x @ self.kernel + self.bias
+        h = x.new_zeros(batch_size, self.units)
+        c = x.new_zeros(batch_size, self.units)
+
+        outputs = []
+        for t in range(time_steps):
+            z = projected[:, t] + h @ self.recurrent_kernel
+            i, f, g, o = z.chunk(4, dim=1)
+            c = torch.sigmoid(f) * c + torch.sigmoid(i) * self.activation(g)
+            h = torch.sigmoid(o) * self.activation(c)
+            if self.return_sequences:
+                outputs.append(h)
+
+        return torch.stack(outputs, dim=1) if self.return_sequences else h
+
+
+class LSTMAutoencoder(nn.Module):
+    """PyTorch copy of WeatherAutoencoder._build_model"""
+
+    def __init__(self, time_steps=24, features=12, latent_dim=8):
+        super().__init__()
+        self.time_steps = time_steps
+
+        # Encoder
+        self.encoder_lstm1 = KerasStyleLSTM(features, 32, return_sequences=True)
+        self.encoder_lstm2 = KerasStyleLSTM(32, 16, return_sequences=False)
+        self.latent = nn.Linear(16, latent_dim)
+
+        # Decoder
+        self.decoder_lstm1 = KerasStyleLSTM(latent_dim, 16, return_sequences=True)
+        self.decoder_lstm2 = KerasStyleLSTM(16, 32, return_sequences=True)
+        self.output_layer = nn.Linear(32, features)
+
+    def forward(self, x):
+        encoded = torch.relu(self.latent(self.encoder_lstm2(self.encoder_lstm1(x))))
+        repeated = encoded.unsqueeze(1).expand(-1, self.time_steps, -1)
+        return self.output_layer(self.decoder_lstm2(self.decoder_lstm1(repeated)))
+
+
+def read_keras_h5_weights(filepath):
+    """Weight arrays of every layer that has weights, in model order"""
+    layers = []
+    with h5py.File(filepath, "r") as f:
+        model_weights = f["model_weights"]
+        for layer_name in model_weights.attrs["layer_names"]:
+            group = model_weights[layer_name]
+            weight_names = group.attrs["weight_names"]
+            if len(weight_names):
+                layers.append([np.asarray(group[name]) for name in weight_names])
+    return layers
+
+
+def convert_autoencoder(filepath="./cust_train1/weather_autoencoder"):
+    """Build the PyTorch autoencoder from {filepath}_model.h5 and save {filepath}_torch.pth"""
+    config_data = np.load(f"{filepath}_config.npz")
+    time_steps = int(config_data['time_steps'])
+    features = int(config_data['features'])
+    latent_dim = int(config_data['latent_dim'])
+
+    model = LSTMAutoencoder(time_steps, features, latent_dim)
+    encoder_lstm1, encoder_lstm2, latent, decoder_lstm1, decoder_lstm2, output_layer = \
+        read_keras_h5_weights(f"{filepath}_model.h5")
+
+    with torch.no_grad():
+        for module, (kernel, recurrent_kernel, bias) in [
+            (model.encoder_lstm1, encoder_lstm1), (model.encoder_lstm2, encoder_lstm2),
+            (model.decoder_lstm1, decoder_lstm1), (model.decoder_lstm2, decoder_lstm2),
+        ]:
+            module.kernel.copy_(torch.from_numpy(kernel))
+            module.recurrent_kernel.copy_(torch.from_numpy(recurrent_kernel))
+            module.bias.copy_(torch.from_numpy(bias))
+
+        # Keras Dense kernels are (in, out); nn.Linear stores (out, in)
+        for module, (kernel, bias) in [(model.latent, latent), (model.output_layer, output_layer)]:
+            module.weight.copy_(torch.from_numpy(kernel.T))
+            module.bias.copy_(torch.from_numpy(bias))
+
+    # Plain tensors and ints only, so serving can load it with weights_only=True
+    torch.save({
+        'model_state_dict': model.state_dict(),
+        'time_steps': time_steps,
+        'features': features,
+        'latent_dim': latent_dim,
+        'model_type': 'LSTMAutoencoder'
+    }, f"{filepath}_torch.pth")
+    print(f"✅ PyTorch autoencoder saved to {filepath}_torch.pth")
+
+    return model.eval()
+
+
+def check_autoencoder_parity(model, filepath, data_path, station=None, recent_hours=9000, rtol=1e-3):
+    """Compare reconstruction MSE of the PyTorch and Keras models on the training windows"""
+    from tensorflow.keras.models import load_model
+    from numpy.lib.stride_tricks import sliding_window_view
+    from patch_forecast_trainer import WindPressureDataset
+
+    keras_model = load_model(f"{filepath}_model.h5", compile=False)
+    scaler_data = np.load(f"{filepath}_scaler.npz")
+
+    data = WindPressureDataset(data_path, station=station).data[-recent_hours:]
+    scaled = ((data - scaler_data['mean']) / scaler_data['scale']).astype(np.float32)
+    windows = np.ascontiguousarray(sliding_window_view(scaled, model.time_steps, axis=0).transpose(0, 2, 1))
+
+    keras_reconstructions = keras_model.predict(windows, batch_size=1024, verbose=0)
+    with torch.no_grad():
+        torch_reconstructions = model(torch.from_numpy(windows)).numpy()
+
+    keras_mse = np.mean(np.square(windows - keras_reconstructions), axis=(1, 2))
+    torch_mse = np.mean(np.square(windows - torch_reconstructions), axis=(1, 2))
+
+    # ReLU cells are unbounded, so a few windows amplify float32 rounding differences;
+    # judge parity on the mean error and the 99th percentile window
+    relative_error = np.abs(torch_mse - keras_mse) / np.maximum(keras_mse, 1e-8)
+    mean_relative_error = abs(torch_mse.mean() - keras_mse.mean()) / keras_mse.mean()
+    p99_relative_error = float(np.percentile(relative_error, 99))
+    threshold = float(np.load(f"{filepath}_config.npz")['threshold'])
+    flag_agreement = np.mean((torch_mse > threshold) == (keras_mse > threshold))
+
+    print(f"Windows compared: {len(windows)}")
+    print(f"Mean reconstruction MSE  keras={keras_mse.mean():.6f}  torch={torch_mse.mean():.6f}")
+    print(f"Per-window MSE relative error: p99={p99_relative_error:.2e} max={relative_error.max():.2e}")
+    print(f"Anomaly flags agreeing at threshold {threshold:.4f}: {flag_agreement:.4%}")
+    if mean_relative_error > rtol or p99_relative_error > rtol:
+        raise AssertionError(
+            f"PyTorch reconstruction MSE differs from Keras (mean {mean_relative_error:.2e}, "
+            f"p99 {p99_relative_error:.2e}, rtol {rtol:.0e})"
+        )
+
+    return keras_mse, torch_mse
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="./cust_train1/weather_autoencoder", help="autoencoder file prefix")
+    parser.add_argument("--data", "--csv", default="weather_store",
+                        help="weather store directory (or a training CSV) for the parity check")
+    parser.add_argument("--station", default="sundarban", help="station to read from the weather store")
+    parser.add_argument("--skip-parity", action="store_true")
+    args = parser.parse_args()
+
+    torch_model = convert_autoencoder(args.model)
+    if not args.skip_parity:
+        print("\n🔍 Reconstruction parity against the Keras model")
+        check_autoencoder_parity(torch_model, args.model, args.data, args.station)
@@ -1,19 +1,19 @@
 
 import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
 import numpy as np
 import torch
 from torch import nn
 from torch.utils.data import Dataset, DataLoader
 import matplotlib.pyplot as plt
 from sklearn.preprocessing import StandardScaler
+from weather_store import load_weather_frame
 class WindPressureDataset(Dataset):
-    def __init__(self, csv_path, seq_len=128, pred_len=24):
+    def __init__(self, csv_path, seq_len=128, pred_len=24,
+                 station=None, start_date=None, end_date=None):
         """
         Dataset for wind speed and pressure forecasting
         """
-        # Load data
-        df = pd.read_csv(csv_path, parse_dates=['date'])
-
         # Select only wind speed and pressure features
         target_features = [
  'surface_pressure',
@@ -29,6 +29,8 @@ class WindPressureDataset(Dataset):
  'cloud_cover',
  'wind_direction_10m'
 ]
+        # Load only these columns (and the requested time range) from a CSV or weather store
+        df = load_weather_frame(csv_path, target_features, station, start_date, end_date)
         self.df = df[['date'] + target_features].copy()
         self.target_names = target_features
 
@@ -135,8 +137,8 @@ class WeatherAutoencoder:
 
         return autoencoder
 
-    def prepare_data(self, data, train_ratio=0.8, max_samples=None):
-        """Prepare time series data for training with optional sampling"""
+    def prepare_sequences(self, data, max_samples=None):
+        """Normalize data and return its sliding windows as a strided view (no copy)"""
         # Normalize data
         scaled_data = self.scaler.fit_transform(data)
 
@@ -145,14 +147,14 @@ class WeatherAutoencoder:
             indices = np.random.choice(len(scaled_data), max_samples, replace=False)
             scaled_data = scaled_data[indices]
 
-        # Create sequences
-        sequences = []
-        for i in range(len(scaled_data) - self.time_steps + 1):
-            sequences.append(scaled_data[i:i + self.time_steps])
+        # (windows, time_steps, features) view over scaled_data
+        return sliding_window_view(scaled_data, self.time_steps, axis=0).transpose(0, 2, 1)
 
-        sequences = np.array(sequences)
+    def prepare_data(self, data, train_ratio=0.8, max_samples=None):
+        """Prepare time series data for training with optional sampling"""
+        sequences = self.prepare_sequences(data, max_samples)
 
-        # Split into train/test
+        # Split into train/test (views as well)
         train_size = int(len(sequences) * train_ratio)
         X_train = sequences[:train_size]
         X_test = sequences[train_size:]
@@ -180,7 +182,7 @@ class WeatherAutoencoder:
     def detect_anomalies(self, data, threshold_std=2.0):
         """Detect anomalies based on reconstruction error"""
         # Prepare data
-        sequences = self.prepare_data(data)[2]
+        sequences = self.prepare_sequences(data)
 
         # Get reconstructions
         reconstructions = self.model.predict(sequences)
@@ -226,7 +228,7 @@ class WeatherAutoencoder:
           plt.tight_layout()
           plt.show()
 # Load full dataset for PatchTST
-full_dataset = WindPressureDataset("openmetro_weather_2022.csv", seq_len=128, pred_len=24)
+full_dataset = WindPressureDataset("weather_store", seq_len=128, pred_len=24, station="sundarban")
 
 # # Train PatchTST on full data (2-3 years recommended)
 # print("Training PatchTST on full dataset...")
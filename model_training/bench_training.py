@@ -0,0 +1,43 @@
+"""Compare forecaster training throughput (epochs/hour) across loader and precision settings
+
+    python bench_training.py --data weather_store --station sundarban --workers 0,4 --precision fp32,bf16
+
+Every combination of --workers, --precision and --threads trains a fresh
+model for a fixed number of batches on the same dataset. The timing is
+extrapolated to one epoch over the training windows. Pick the fastest row
+and pass the same settings to train_wind_pressure_forecaster.
+"""
+import argparse
+import itertools
+import json
+
+import torch
+
+from patch_forecast_trainer import WindPressureDataset, benchmark_training_configs
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default="weather_store", help="weather store directory or training CSV")
+    parser.add_argument("--station", default=None)
+    parser.add_argument("--cache-path", default=None, help="memory-map the normalized series from here")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--workers", default="0,2,4", help="comma-separated DataLoader worker counts")
+    parser.add_argument("--precision", default="fp32,bf16", help="comma-separated: fp32, bf16")
+    parser.add_argument("--threads", default=str(torch.get_num_threads()), help="comma-separated torch thread counts")
+    parser.add_argument("--steps", type=int, default=100, help="timed batches per configuration")
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    dataset = WindPressureDataset(args.data, cache_path=args.cache_path, station=args.station)
+    configs = [
+        {"num_workers": int(workers), "precision": precision, "num_threads": int(threads)}
+        for workers, precision, threads in itertools.product(
+            args.workers.split(","), args.precision.split(","), args.threads.split(",")
+        )
+    ]
+
+    print(f"\n⏱️ {len(dataset.train_indices)} training windows, batch size {args.batch_size}")
+    results = benchmark_training_configs(dataset, configs, batch_size=args.batch_size, steps=args.steps)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,236 @@
+"""Bulk download of multi-year hourly history for many stations into the weather store
+
+    python bulk_download.py --station sundarban:20.97:89.51 --start 1995-01-01 --chunk year
+    python bulk_download.py --stations stations.csv --workers 8
+    python bulk_download.py --grid 21.5,22.5,88.0,89.5,0.25 --start 2000-01-01 --chunk month
+
+Each station's range is split into calendar year or month chunks. The
+chunks are fetched concurrently by a bounded pool, with retries and
+exponential backoff. Every chunk is written straight to weather_store.py
+Parquet files. Finished chunks are recorded in a manifest under the store
+root, so an interrupted run picks up where it stopped. Chunks that still
+contain missing hours (the archive lags real time by a few days) are
+stored but not marked done, and they are fetched again on the next run.
+
+stations.csv has columns station,latitude,longitude. To test offline, run
+the stand-in archive from fast_api_backend/bench_concurrency.py and point
+--base-url at it:
+
+    python ../fast_api_backend/bench_concurrency.py stub-archive --port 9100 --latency-ms 50
+    python bulk_download.py --base-url http://127.0.0.1:9100/v1/archive --grid 21,21.5,89,89.5,0.25
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import requests
+
+from weather_store import write_station_history, save_station_coordinates
+
+ARCHIVE_URL = "https://archive-api.open-meteo.com/v1/archive"
+
+HOURLY_VARIABLES = [
+    "temperature_2m", "relative_humidity_2m", "dew_point_2m",
+    "surface_pressure", "precipitation", "rain", "snowfall",
+    "cloud_cover", "wind_speed_10m", "wind_speed_100m",
+    "wind_direction_10m", "wind_gusts_10m",
+]
+
+# Responses worth retrying; other 4xx mean the request itself is wrong
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+def parse_station(spec):
+    """'name:lat:lon' -> (name, lat, lon)"""
+    name, latitude, longitude = spec.split(":")
+    return name, float(latitude), float(longitude)
+
+
+def load_stations(path):
+    """Stations from a CSV with station,latitude,longitude columns"""
+    df = pd.read_csv(path)
+    return list(zip(df['station'].astype(str), df['latitude'].astype(float), df['longitude'].astype(float)))
+
+
+def grid_stations(spec):
+    """Regular lat/lon grid from 'lat_min,lat_max,lon_min,lon_max,step'"""
+    lat_min, lat_max, lon_min, lon_max, step = (float(value) for value in spec.split(","))
+    latitudes = np.arange(lat_min, lat_max + step / 2, step)
+    longitudes = np.arange(lon_min, lon_max + step / 2, step)
+    return [(f"g{latitude:.2f}_{longitude:.2f}", round(latitude, 4), round(longitude, 4))
+            for latitude in latitudes for longitude in longitudes]
+
+
+def date_chunks(start_date, end_date, chunk="year"):
+    """Calendar year or month (start, end) date pairs covering [start_date, end_date]"""
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    end = datetime.strptime(end_date, "%Y-%m-%d")
+
+    chunks = []
+    chunk_start = start
+    while chunk_start <= end:
+        if chunk == "month":
+            next_start = (chunk_start.replace(day=1) + timedelta(days=32)).replace(day=1)
+        else:
+            next_start = chunk_start.replace(year=chunk_start.year + 1, month=1, day=1)
+        chunk_end = min(next_start - timedelta(days=1), end)
+        chunks.append((chunk_start.strftime("%Y-%m-%d"), chunk_end.strftime("%Y-%m-%d")))
+        chunk_start = next_start
+    return chunks
+
+
+class Manifest:
+    """JSON record of finished chunks, rewritten atomically after each one"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.done = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.done = json.load(f)
+
+    @staticmethod
+    def key(station, start, end):
+        return f"{station}|{start}|{end}"
+
+    def is_done(self, station, start, end):
+        return self.key(station, start, end) in self.done
+
+    def mark_done(self, station, start, end, rows):
+        with self._lock:
+            self.done[self.key(station, start, end)] = {"rows": rows, "finished": datetime.now().isoformat()}
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.done, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+
+def fetch_chunk(session, base_url, latitude, longitude, start, end, retries=5, backoff_s=2.0, timeout_s=120.0):
+    """Hourly archive rows for one chunk with derived features, retried with exponential backoff
+
+    One extra day before the chunk is requested so the 3-hour pressure
+    tendency is defined from the first hour; it is trimmed off again.
+    """
+    lead_in_start = (datetime.strptime(start, "%Y-%m-%d") - timedelta(days=1)).strftime("%Y-%m-%d")
+    params = {
+        "latitude": latitude,
+        "longitude": longitude,
+        "start_date": lead_in_start,
+        "end_date": end,
+        "hourly": HOURLY_VARIABLES,
+        "timezone": "auto"
+    }
+
+    for attempt in range(retries + 1):
+        try:
+            response = session.get(base_url, params=params, timeout=timeout_s)
+            if response.status_code not in RETRY_STATUS:
+                response.raise_for_status()
+                break
+            error = requests.HTTPError(f"{response.status_code} from archive", response=response)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            error = e
+        if attempt == retries:
+            raise error
+        # Exponential backoff with jitter so parallel workers don't retry in lockstep
+        time.sleep(backoff_s * (2 ** attempt) * (0.5 + random.random()))
+
+    df = pd.DataFrame(response.json()['hourly'])
+    df['time'] = pd.to_datetime(df['time'])
+    df.set_index('time', inplace=True)
+
+    # Derived features
+    df['pressure_tendency'] = df['surface_pressure'].diff(3)   # 3-hour pressure change
+    df['wind_shear'] = df['wind_speed_100m'] - df['wind_speed_10m']
+
+    return df[df.index >= pd.Timestamp(start)]
+
+
+def download_chunk(session, args, manifest, station, latitude, longitude, start, end):
+    df = fetch_chunk(session, args.base_url, latitude, longitude, start, end,
+                     retries=args.retries, backoff_s=args.backoff)
+    write_station_history(df, args.root, station, part=f"part-{start}", verbose=False)
+
+    complete = len(df) > 0 and not df[HOURLY_VARIABLES].isna().any(axis=None)
+    if complete:
+        manifest.mark_done(station, start, end, len(df))
+    return len(df), complete
+
+
+def run(args, stations):
+    os.makedirs(args.root, exist_ok=True)
+    manifest = Manifest(os.path.join(args.root, "_bulk_manifest.json"))
+    save_station_coordinates(args.root, {station: (latitude, longitude) for station, latitude, longitude in stations})
+
+    chunks = [
+        (station, latitude, longitude, start, end)
+        for station, latitude, longitude in stations
+        for start, end in date_chunks(args.start, args.end, args.chunk)
+    ]
+    pending = [chunk for chunk in chunks if not manifest.is_done(chunk[0], chunk[3], chunk[4])]
+    print(f"🛰️ {len(stations)} stations, {len(chunks)} chunks, {len(chunks) - len(pending)} already done")
+
+    # One session per worker thread keeps its connection alive across chunks
+    local = threading.local()
+
+    def worker(chunk):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        return download_chunk(local.session, args, manifest, *chunk)
+
+    started = time.perf_counter()
+    rows = 0
+    failed = []
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(worker, chunk): chunk for chunk in pending}
+        for i, future in enumerate(as_completed(futures), start=1):
+            station, _, _, start, end = futures[future]
+            try:
+                chunk_rows, complete = future.result()
+                rows += chunk_rows
+                status = "✅" if complete else "⏳ incomplete, will refetch"
+            except Exception as e:
+                failed.append(futures[future])
+                status = f"❌ {e}"
+            print(f"[{i}/{len(pending)}] {station} {start}..{end} {status}")
+
+    elapsed = time.perf_counter() - started
+    print(f"\n💾 {rows} hourly rows in {elapsed:.1f} s, {len(failed)} chunks failed")
+    if failed:
+        print("Re-run the same command to retry the failed chunks")
+    return failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--station", action="append", default=[], help="name:lat:lon (repeatable)")
+    parser.add_argument("--stations", help="CSV with station,latitude,longitude columns")
+    parser.add_argument("--grid", help="lat_min,lat_max,lon_min,lon_max,step")
+    parser.add_argument("--start", default=(datetime.now() - timedelta(days=365 * 7)).strftime("%Y-%m-%d"))
+    parser.add_argument("--end", default=(datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d"))
+    parser.add_argument("--chunk", choices=["year", "month"], default="year")
+    parser.add_argument("--root", default="weather_store")
+    parser.add_argument("--workers", type=int, default=4, help="concurrent archive requests")
+    parser.add_argument("--retries", type=int, default=5)
+    parser.add_argument("--backoff", type=float, default=2.0, help="first retry delay in seconds")
+    parser.add_argument("--base-url", default=ARCHIVE_URL)
+    args = parser.parse_args()
+
+    stations = [parse_station(spec) for spec in args.station]
+    if args.stations:
+        stations += load_stations(args.stations)
+    if args.grid:
+        stations += grid_stations(args.grid)
+    if not stations:
+        stations = [("sundarban", 20.97, 89.51)]
+
+    failed = run(args, stations)
+    raise SystemExit(1 if failed else 0)
@@ -1,7 +1,8 @@
 import requests
 import pandas as pd
 from datetime import datetime, timedelta
-def fetch_historical_weather_data(latitude, longitude, start_date, end_date,save_path):
+from weather_store import write_station_history, save_station_coordinates
+def fetch_historical_weather_data(latitude, longitude, start_date, end_date, store_root, station):
     """
     Fetch historical weather data from Open-Meteo API.
     """
@@ -36,8 +37,8 @@ def fetch_historical_weather_data(latitude, longitude, start_date, end_date,save
         df['wind_shear'] = df['wind_speed_100m'] - df['wind_speed_10m']
 
         print(f"✅ Fetched {len(df)} hourly records with features: {list(df.columns)}")
-        df.to_csv(save_path)
-        print(f"💾 Data saved to {save_path}")
+        write_station_history(df, store_root, station)
+        save_station_coordinates(store_root, {station: (latitude, longitude)})
         return df
 
     except Exception as e:
@@ -45,10 +46,6 @@ def fetch_historical_weather_data(latitude, longitude, start_date, end_date,save
         return None
 end_date = (datetime.now()-timedelta(days=1)).strftime("%Y-%m-%d")
 start_date = (datetime.now() - timedelta(days=365*7)).strftime("%Y-%m-%d")
-df = fetch_historical_weather_data(20.97,89.51, start_date, end_date, save_path="openmetro_weather_2022.csv")
+df = fetch_historical_weather_data(20.97,89.51, start_date, end_date, store_root="weather_store", station="sundarban")
 if df is not None:
-    df = df.reset_index()                     # time index → column
-    df = df.rename(columns={"time": "date"}) # rename to 'date' for PatchTST
-    df.to_csv("openmetro_weather_2022.csv", index=False)
-    print("💾 CSV converted to PatchTST format with 'date' column")
-    print(df.head())
\ No newline at end of file
+    print(df.head())
@@ -0,0 +1,148 @@
+"""Batched evaluation of the PatchTST forecaster
+
+    python evaluation.py --checkpoint ./cust_train1/sundarban.pth --data weather_store --station sundarban
+
+Runs the validation split (or every window with --all) through the model in
+large batches and denormalizes with one broadcast op. MAE, RMSE and bias
+are accumulated per lead hour and feature in a single pass. A compact table
+is printed, and --report writes the same numbers as JSON.
+"""
+import argparse
+import json
+
+import numpy as np
+import torch
+from torch.utils.data import DataLoader, Subset
+
+REPORT_LEAD_HOURS = (1, 6, 12, 24)
+
+
+def normalization_stats(dataset):
+    """(mean, scale) used to normalize the dataset: (features,) or (stations, features) for a shared model"""
+    if getattr(dataset, 'num_stations', 0):
+        return dataset.station_mean, dataset.station_scale
+    mean = np.array([dataset.scalers[name].mean_[0] for name in dataset.target_names], dtype=np.float32)
+    scale = np.array([dataset.scalers[name].scale_[0] for name in dataset.target_names], dtype=np.float32)
+    return mean, scale
+
+
+def denormalize(values, mean, scale, station_ids=None):
+    """Undo normalization of (windows, hours, features) values in one broadcast op"""
+    if mean.ndim == 2:
+        # Shared model: each window uses its own station's row
+        return values * scale[station_ids][:, np.newaxis] + mean[station_ids][:, np.newaxis]
+    return values * scale + mean
+
+
+def iterate_predictions(model, dataset, indices, batch_size=1024, precision="fp32"):
+    """Yield (predictions, targets, station_ids) per batch; predictions and targets normalized NumPy arrays"""
+    device = next(model.parameters()).device
+    model.eval()
+    loader = DataLoader(Subset(dataset, indices), batch_size=batch_size, shuffle=False)
+
+    with torch.no_grad():
+        for batch in loader:
+            station_ids = batch[2] if len(batch) > 2 else None
+            with torch.autocast(device_type=device.type, dtype=torch.bfloat16, enabled=precision == "bf16"):
+                predictions = model(batch[0].to(device),
+                                    station_ids.to(device) if station_ids is not None else None)
+            yield (predictions.float().cpu().numpy(), batch[1].numpy(),
+                   station_ids.numpy() if station_ids is not None else None)
+
+
+def evaluate_forecaster(model, dataset, indices=None, batch_size=1024, precision="fp32"):
+    """Per lead hour x feature MAE / RMSE / bias in original units over a set of windows
+
+    indices defaults to the validation split. Errors are summed batch by
+    batch, so memory does not grow with the number of windows.
+    """
+    if indices is None:
+        indices = dataset.val_indices
+    mean, scale = normalization_stats(dataset)
+
+    abs_sum = sq_sum = err_sum = 0.0
+    count = 0
+    for predictions, targets, station_ids in iterate_predictions(model, dataset, indices, batch_size, precision):
+        # Normalized error times the scale is the error in original units (the mean cancels)
+        error = (predictions - targets) * (scale[station_ids][:, np.newaxis] if scale.ndim == 2 else scale)
+        error = error.astype(np.float64)
+        abs_sum = abs_sum + np.abs(error).sum(axis=0)
+        sq_sum = sq_sum + np.square(error).sum(axis=0)
+        err_sum = err_sum + error.sum(axis=0)
+        count += len(error)
+
+    return {
+        "target_names": list(dataset.target_names),
+        "windows": count,
+        "mae": abs_sum / count,            # (pred_len, features)
+        "rmse": np.sqrt(sq_sum / count),
+        "bias": err_sum / count
+    }
+
+
+def summarize(metrics, lead_hours=REPORT_LEAD_HOURS):
+    """Compact per-feature summary: averages over all leads plus MAE at a few lead hours"""
+    lead_hours = [hour for hour in lead_hours if hour <= len(metrics["mae"])]
+    return {
+        name: {
+            "mae": float(metrics["mae"][:, i].mean()),
+            "rmse": float(np.sqrt(np.square(metrics["rmse"][:, i]).mean())),
+            "bias": float(metrics["bias"][:, i].mean()),
+            "mae_by_lead": {f"+{hour}h": float(metrics["mae"][hour - 1, i]) for hour in lead_hours}
+        }
+        for i, name in enumerate(metrics["target_names"])
+    }
+
+
+def format_report(metrics, lead_hours=REPORT_LEAD_HOURS):
+    summary = summarize(metrics, lead_hours)
+    leads = next(iter(summary.values()))["mae_by_lead"].keys() if summary else []
+    lines = [
+        f"📊 Evaluation over {metrics['windows']} windows (original units)",
+        f"{'feature':22s} {'MAE':>8s} {'RMSE':>8s} {'bias':>8s}  " + " ".join(f"{'MAE' + lead:>9s}" for lead in leads),
+    ]
+    for name, row in summary.items():
+        lines.append(f"{name:22s} {row['mae']:8.3f} {row['rmse']:8.3f} {row['bias']:8.3f}  "
+                     + " ".join(f"{value:9.3f}" for value in row["mae_by_lead"].values()))
+    return "\n".join(lines)
+
+
+def write_report(metrics, path, lead_hours=REPORT_LEAD_HOURS):
+    """JSON report: per-feature summary plus the full (lead hour, feature) tables"""
+    report = {
+        "windows": metrics["windows"],
+        "summary": summarize(metrics, lead_hours),
+        "by_lead_hour": {key: np.round(metrics[key], 5).tolist() for key in ("mae", "rmse", "bias")},
+        "target_names": metrics["target_names"]
+    }
+    with open(path, "w") as f:
+        json.dump(report, f, indent=1)
+    print(f"💾 Evaluation report saved to {path}")
+
+
+if __name__ == "__main__":
+    from export_forecast_model import load_checkpoint_model
+    from patch_forecast_trainer import WindPressureDataset, MultiStationWindPressureDataset
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checkpoint", default="./cust_train1/sundarban.pth")
+    parser.add_argument("--data", default="weather_store", help="weather store directory or training CSV")
+    parser.add_argument("--station", default=None)
+    parser.add_argument("--all", action="store_true", help="evaluate every window, not just the validation split")
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--report", help="write the report as JSON")
+    args = parser.parse_args()
+
+    import time
+    model = load_checkpoint_model(args.checkpoint)
+    stations = torch.load(args.checkpoint, map_location='cpu', weights_only=False).get('station_names')
+    if stations:
+        dataset = MultiStationWindPressureDataset(args.data, stations)
+    else:
+        dataset = WindPressureDataset(args.data, station=args.station)
+
+    started = time.perf_counter()
+    metrics = evaluate_forecaster(model, dataset, np.arange(len(dataset)) if args.all else None, args.batch_size)
+    print(f"\n{format_report(metrics)}\n⏱️ {time.perf_counter() - started:.2f} s")
+    if args.report:
+        write_report(metrics, args.report)
@@ -0,0 +1,58 @@
+"""Export a saved PatchTST checkpoint to TorchScript / ONNX, check parity and benchmark
+
+    python export_forecast_model.py --checkpoint ./cust_train1/sundarban.pth --output ./cust_train1/sundarban
+
+writes ./cust_train1/sundarban.ts and ./cust_train1/sundarban.onnx, fails if
+either output drifts from the eager model, then prints latency at batch sizes
+1/32/256. Serve them with FORECAST_RUNTIME=torchscript|onnx in offline.py.
+"""
+import argparse
+
+import torch
+
+from patch_forecast_trainer import (
+    WindPressurePatchTST,
+    export_forecast_model,
+    check_export_parity,
+    benchmark_forecast_runtimes,
+)
+
+
+def load_checkpoint_model(filepath):
+    """Rebuild the eager model from a save_forecast_model_simple checkpoint"""
+    checkpoint = torch.load(filepath, map_location='cpu', weights_only=False)
+    model = WindPressurePatchTST(
+        num_features=len(checkpoint['target_names']),
+        seq_len=128,
+        pred_len=24,
+        patch_len=16,
+        stride=8,
+        d_model=64,
+        n_layers=2,
+        n_heads=4,
+        dropout=0.1,
+        num_stations=checkpoint.get('num_stations', 0)
+    )
+    model.load_state_dict(checkpoint['model_state_dict'])
+    return model.eval()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checkpoint", default="./cust_train1/sundarban.pth")
+    parser.add_argument("--output", default="./cust_train1/sundarban", help="output path prefix")
+    parser.add_argument("--formats", default="torchscript,onnx")
+    parser.add_argument("--batch-sizes", default="1,32,256")
+    parser.add_argument("--skip-benchmark", action="store_true")
+    args = parser.parse_args()
+
+    batch_sizes = tuple(int(size) for size in args.batch_sizes.split(","))
+    model = load_checkpoint_model(args.checkpoint)
+    paths = export_forecast_model(model, args.output, formats=tuple(args.formats.split(",")))
+
+    print("\n🔍 Parity against the eager model")
+    check_export_parity(model, paths, batch_sizes=batch_sizes)
+
+    if not args.skip_benchmark:
+        print("\n⏱️ Latency per forward pass (median)")
+        benchmark_forecast_runtimes(model, paths, batch_sizes=batch_sizes)
@@ -1,22 +1,33 @@
-import pandas as pd
+import os
+
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import torch
+import torch.distributed as dist
 from torch import nn
-from torch.utils.data import Dataset, DataLoader
+from torch.nn.parallel import DistributedDataParallel
+from torch.utils.data import Dataset, DataLoader, Subset
+from torch.utils.data.distributed import DistributedSampler
 import matplotlib.pyplot as plt
 from sklearn.preprocessing import StandardScaler
+from weather_store import load_weather_frame, list_stations, load_station_coordinates
+from evaluation import normalization_stats, denormalize, iterate_predictions, evaluate_forecaster, format_report, write_report
 
 # ----------------------
 # 1. Wind Speed & Pressure Dataset
 # ----------------------
 class WindPressureDataset(Dataset):
-    def __init__(self, csv_path, seq_len=128, pred_len=24):
+    def __init__(self, csv_path, seq_len=128, pred_len=24, cache_path=None,
+                 station=None, start_date=None, end_date=None):
         """
         Dataset for wind speed and pressure forecasting
-        """
-        # Load data
-        df = pd.read_csv(csv_path, parse_dates=['date'])
 
+        The normalized series is stored once (memory-mapped from cache_path
+        when given) and windows are sliced from it on the fly, so memory
+        grows with the number of hours rather than hours x window length.
+        csv_path may also be a weather_store.py directory; station and the
+        start/end dates then pick the slice of history to load.
+        """
         # Select only wind speed and pressure features
         target_features = [
  'surface_pressure',
@@ -32,6 +43,8 @@ class WindPressureDataset(Dataset):
  'cloud_cover',
  'wind_direction_10m'
 ]
+        # Load only these columns (and the requested time range) from a CSV or weather store
+        df = load_weather_frame(csv_path, target_features, station, start_date, end_date)
         self.df = df[['date'] + target_features].copy()
         self.target_names = target_features
 
@@ -64,22 +77,27 @@ class WindPressureDataset(Dataset):
         self.total_length = seq_len + pred_len
         self.num_features = len(target_features)
 
-        # Create sequences
-        self.sequences = []
-        self.targets = []
-
-        for i in range(len(self.data_normalized) - self.total_length + 1):
-            seq = self.data_normalized[i:i+seq_len]  # Input sequence
-            target = self.data_normalized[i+seq_len:i+seq_len+pred_len]  # Target sequence
-            self.sequences.append(seq)
-            self.targets.append(target)
-
-        # Convert to numpy arrays
-        self.sequences = np.array(self.sequences)
-        self.targets = np.array(self.targets)
-
-        # Train/validation split (80/20)
-        split_idx = int(len(self.sequences) * 0.8)
+        # Keep the normalized series on disk and map it back in (pages load on demand).
+        # An identical existing file is reused as is, so several training processes can share it.
+        if cache_path:
+            if not (os.path.exists(cache_path) and
+                    np.array_equal(np.load(cache_path, mmap_mode='r'), self.data_normalized)):
+                np.save(cache_path, self.data_normalized)
+            self.data_normalized = np.load(cache_path, mmap_mode='r')
+
+        # Input and target windows as strided views over the series (no copies)
+        num_windows = max(len(self.data_normalized) - self.total_length + 1, 0)
+        self.sequences = sliding_window_view(
+            self.data_normalized[:num_windows + seq_len - 1], seq_len, axis=0
+        ).transpose(0, 2, 1)
+        self.targets = sliding_window_view(
+            self.data_normalized[seq_len:], pred_len, axis=0
+        ).transpose(0, 2, 1)
+
+        # Train/validation split (80/20) by window index
+        split_idx = int(num_windows * 0.8)
+        self.train_indices = np.arange(split_idx)
+        self.val_indices = np.arange(split_idx, num_windows)
         self.train_sequences = self.sequences[:split_idx]
         self.train_targets = self.targets[:split_idx]
         self.val_sequences = self.sequences[split_idx:]
@@ -99,22 +117,83 @@ class WindPressureDataset(Dataset):
         return len(self.sequences)
 
     def __getitem__(self, idx):
-        return self.sequences[idx], self.targets[idx]
+        # Copy just this window out of the shared series
+        return np.array(self.sequences[idx]), np.array(self.targets[idx])
 
     def denormalize(self, data, feature_idx):
         """Convert normalized data back to original scale for specific feature"""
         feature_name = self.target_names[feature_idx]
         return self.scalers[feature_name].inverse_transform(data.reshape(-1, 1)).flatten()
 
+class MultiStationWindPressureDataset(Dataset):
+    """Windows from many stations of a weather store for one shared model
+
+    Every station is normalized with its own stats and keeps its own 80/20
+    split in time. Items are (sequence, target, station_id).
+    """
+    def __init__(self, store_root, stations=None, seq_len=128, pred_len=24, cache_dir=None,
+                 start_date=None, end_date=None):
+        self.station_names = list(stations) if stations else list_stations(store_root)
+        coordinates = load_station_coordinates(store_root)
+        self.station_coords = np.array(
+            [coordinates.get(name, [np.nan, np.nan]) for name in self.station_names], dtype=np.float64
+        )
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        self.datasets = []
+        for name in self.station_names:
+            print(f"\n📍 Station {name}")
+            cache_path = os.path.join(cache_dir, f"{name}.npy") if cache_dir else None
+            self.datasets.append(WindPressureDataset(
+                store_root, seq_len, pred_len, cache_path=cache_path,
+                station=name, start_date=start_date, end_date=end_date
+            ))
+
+        self.target_names = self.datasets[0].target_names
+        self.num_features = len(self.target_names)
+        self.num_stations = len(self.station_names)
+        self.seq_len = seq_len
+        self.pred_len = pred_len
+
+        # Per-station normalization stats as (stations, features) arrays
+        self.station_mean = np.array([[dataset.scalers[name].mean_[0] for name in self.target_names]
+                                      for dataset in self.datasets], dtype=np.float32)
+        self.station_scale = np.array([[dataset.scalers[name].scale_[0] for name in self.target_names]
+                                       for dataset in self.datasets], dtype=np.float32)
+
+        # Global window index -> (station, window index within that station)
+        self.offsets = np.concatenate([[0], np.cumsum([len(dataset) for dataset in self.datasets])])
+        self.train_indices = np.concatenate([dataset.train_indices + offset
+                                             for dataset, offset in zip(self.datasets, self.offsets)])
+        self.val_indices = np.concatenate([dataset.val_indices + offset
+                                           for dataset, offset in zip(self.datasets, self.offsets)])
+
+        print(f"\nCreated {len(self)} sequences across {self.num_stations} stations")
+        print(f"Train: {len(self.train_indices)}, Validation: {len(self.val_indices)}")
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def __getitem__(self, idx):
+        station = int(np.searchsorted(self.offsets, idx, side='right') - 1)
+        sequence, target = self.datasets[station][idx - self.offsets[station]]
+        return sequence, target, station
+
+    def denormalize(self, data, feature_idx, station=0):
+        """Convert normalized data back to original scale for one station's feature"""
+        return self.datasets[station].denormalize(data, feature_idx)
+
 # ----------------------
 # 2. PatchTST for Wind & Pressure
 # ----------------------
 class WindPressurePatchTST(nn.Module):
     def __init__(self, num_features=12, seq_len=128, pred_len=24, patch_len=16, stride=8,
-                 d_model=64, n_layers=2, n_heads=4, dropout=0.1):
+                 d_model=64, n_layers=2, n_heads=4, dropout=0.1, num_stations=0):
         super().__init__()
 
         self.num_features = num_features
+        self.num_stations = num_stations
         self.seq_len = seq_len
         self.pred_len = pred_len
         self.patch_len = patch_len
@@ -129,6 +208,9 @@ class WindPressurePatchTST(nn.Module):
         # Positional encoding
         self.pos_embed = nn.Parameter(torch.randn(1, self.num_patches, d_model))
 
+        # Learned location embedding for a model shared across stations (0 = single-site model)
+        self.station_embed = nn.Embedding(num_stations, d_model) if num_stations else None
+
         # Transformer encoder
         encoder_layer = nn.TransformerEncoderLayer(
             d_model=d_model,
@@ -149,22 +231,18 @@ class WindPressurePatchTST(nn.Module):
 
         self.dropout = nn.Dropout(dropout)
 
-    def forward(self, x):
-        # x shape: (batch_size, seq_len, num_features)
-        batch_size = x.size(0)
-
-        # Create patches
-        patches = []
-        for i in range(0, self.seq_len - self.patch_len + 1, self.stride):
-            patch = x[:, i:i+self.patch_len, :]  # (batch_size, patch_len, num_features)
-            patch = patch.reshape(batch_size, -1)  # (batch_size, patch_len * num_features)
-            patches.append(patch)
+    def forward(self, x, station_ids=None):
+        # x shape: (batch_size, seq_len, num_features); station_ids: (batch_size,) int64
 
-        patches = torch.stack(patches, dim=1)  # (batch_size, num_patches, patch_len * num_features)
+        # Create patches as strided views: (batch_size, num_patches, num_features, patch_len)
+        patches = x.unfold(1, self.patch_len, self.stride)
+        patches = patches.transpose(2, 3).flatten(2)  # (batch_size, num_patches, patch_len * num_features)
 
         # Embed patches
         x_emb = self.patch_embed(patches)  # (batch_size, num_patches, d_model)
         x_emb = x_emb + self.pos_embed
+        if self.station_embed is not None and station_ids is not None:
+            x_emb = x_emb + self.station_embed(station_ids).unsqueeze(1)
 
         # Transformer encoding
         x_emb = self.dropout(x_emb)
@@ -175,24 +253,150 @@ class WindPressurePatchTST(nn.Module):
 
         # Forecasting
         forecast = self.forecast_head(global_rep)  # (batch_size, pred_len * num_features)
-        forecast = forecast.view(batch_size, self.pred_len, self.num_features)  # (batch_size, pred_len, num_features)
+        forecast = forecast.view(-1, self.pred_len, self.num_features)  # (batch_size, pred_len, num_features)
 
         return forecast
 
 # ----------------------
 # 3. Training Function
 # ----------------------
-def train_wind_pressure_forecaster(csv_path, seq_len=128, pred_len=24,
-                                   batch_size=32, epochs=100, learning_rate=0.001):
+def _single_thread_worker(worker_id):
+    """DataLoader workers only slice windows; keep them off the intra-op thread pool"""
+    torch.set_num_threads(1)
+
+def make_train_loader(dataset, indices, batch_size=32, num_workers=0, pin_memory=None, shuffle=True,
+                      world_size=1, rank=0):
+    """DataLoader over a subset of window indices with optional worker processes
+
+    With world_size > 1 every rank gets its own shard through a
+    DistributedSampler (call loader.sampler.set_epoch each epoch).
+    """
+    if pin_memory is None:
+        pin_memory = torch.cuda.is_available()
+    subset = Subset(dataset, indices)
+    sampler = DistributedSampler(subset, num_replicas=world_size, rank=rank, shuffle=shuffle) if world_size > 1 else None
+    return DataLoader(
+        subset, batch_size=batch_size, shuffle=shuffle and sampler is None, sampler=sampler,
+        num_workers=num_workers, pin_memory=pin_memory,
+        persistent_workers=num_workers > 0,
+        worker_init_fn=_single_thread_worker if num_workers > 0 else None
+    )
 
-    # Load dataset
-    dataset = WindPressureDataset(csv_path, seq_len, pred_len)
+def make_eval_loader(dataset, indices, batch_size=32, num_workers=0, pin_memory=None, world_size=1, rank=0):
+    """Unshuffled DataLoader over a subset of window indices for evaluation
+
+    With world_size > 1 every rank takes every world_size-th window. Unlike
+    DistributedSampler this never pads shards with repeated windows, so sums
+    and counts all-reduced across ranks cover each window exactly once.
+    """
+    if pin_memory is None:
+        pin_memory = torch.cuda.is_available()
+    subset = Subset(dataset, np.asarray(indices)[rank::world_size])
+    return DataLoader(
+        subset, batch_size=batch_size, shuffle=False,
+        num_workers=num_workers, pin_memory=pin_memory,
+        persistent_workers=num_workers > 0,
+        worker_init_fn=_single_thread_worker if num_workers > 0 else None
+    )
 
-    # Create data loaders
-    train_loader = DataLoader(dataset, batch_size=batch_size, shuffle=True)
+def train_steps(model, loader, optimizer, criterion, device, precision="fp32", max_steps=None):
+    """One pass over loader (or its first max_steps batches); returns (mean loss, steps)
 
-    # Initialize model
-    model = WindPressurePatchTST(
+    The loss is accumulated on-device and read back once at the end instead
+    of calling .item() (a sync) every step. precision="bf16" runs the
+    forward pass under bfloat16 autocast (CPU or CUDA), loss in fp32.
+    """
+    model.train()
+    total_loss = torch.zeros((), device=device)
+    steps = 0
+
+    for batch in loader:
+        batch_seq = batch[0].to(device, non_blocking=True)
+        batch_target = batch[1].to(device, non_blocking=True)
+        station_ids = batch[2].to(device, non_blocking=True) if len(batch) > 2 else None
+
+        optimizer.zero_grad(set_to_none=True)
+        with torch.autocast(device_type=device.type, dtype=torch.bfloat16, enabled=precision == "bf16"):
+            predictions = model(batch_seq, station_ids)
+
+        loss = criterion(predictions.float(), batch_target)
+        loss.backward()
+
+        torch.nn.utils.clip_grad_norm_(model.parameters(), max_norm=1.0)
+        optimizer.step()
+
+        total_loss += loss.detach()
+        steps += 1
+        if max_steps is not None and steps >= max_steps:
+            break
+
+    return (total_loss / max(steps, 1)).item(), steps
+
+def feature_scales(dataset):
+    """Per-feature std used for normalization: (features,) or (stations, features) for a shared model"""
+    return normalization_stats(dataset)[1]
+
+def validate(model, loader, device, scales, precision="fp32", world_size=1):
+    """Validation MSE (normalized, what the loss optimizes) plus per-feature MAE/RMSE in original units
+
+    Errors are summed per feature on-device in one vectorized op per batch
+    and all-reduced across ranks, so every rank sees the same numbers.
+    """
+    model.eval()
+    scales = torch.as_tensor(scales, device=device)
+    num_features = scales.shape[-1]
+    sums = torch.zeros(3, num_features, dtype=torch.float64, device=device)  # sq. err (normalized), |err|, sq. err
+    count = torch.zeros((), dtype=torch.float64, device=device)
+
+    with torch.no_grad():
+        for batch in loader:
+            batch_seq = batch[0].to(device, non_blocking=True)
+            batch_target = batch[1].to(device, non_blocking=True)
+            station_ids = batch[2].to(device, non_blocking=True) if len(batch) > 2 else None
+
+            with torch.autocast(device_type=device.type, dtype=torch.bfloat16, enabled=precision == "bf16"):
+                predictions = model(batch_seq, station_ids)
+            error = predictions.float() - batch_target
+
+            # (batch, 1, features) scales for a shared model, (features,) otherwise
+            scale = scales[station_ids].unsqueeze(1) if scales.dim() == 2 else scales
+            scaled_error = error * scale
+            sums[0] += error.square().sum(dim=(0, 1))
+            sums[1] += scaled_error.abs().sum(dim=(0, 1))
+            sums[2] += scaled_error.square().sum(dim=(0, 1))
+            count += error.shape[0] * error.shape[1]
+
+    if world_size > 1:
+        dist.all_reduce(sums)
+        dist.all_reduce(count)
+
+    means = (sums / count.clamp(min=1)).cpu().numpy()
+    return {
+        "loss": float(means[0].mean()),
+        "mae": means[1],
+        "rmse": np.sqrt(means[2])
+    }
+
+def distributed_context():
+    """(rank, world_size); joins a gloo process group when launched by torchrun"""
+    if not dist.is_available():
+        return 0, 1
+    if not dist.is_initialized() and int(os.environ.get("WORLD_SIZE", 1)) > 1:
+        dist.init_process_group("gloo")
+    if dist.is_initialized():
+        return dist.get_rank(), dist.get_world_size()
+    return 0, 1
+
+def average_across_ranks(value, world_size):
+    """Mean of a Python float over all ranks (identity when not distributed)"""
+    if world_size == 1:
+        return value
+    tensor = torch.tensor([value], dtype=torch.float64)
+    dist.all_reduce(tensor)
+    return tensor.item() / world_size
+
+def build_forecaster(dataset, seq_len=128, pred_len=24):
+    return WindPressurePatchTST(
         num_features=dataset.num_features,
         seq_len=seq_len,
         pred_len=pred_len,
@@ -200,12 +404,69 @@ def train_wind_pressure_forecaster(csv_path, seq_len=128, pred_len=24,
         stride=8,
         d_model=64,
         n_layers=2,
-        n_heads=4
+        n_heads=4,
+        num_stations=getattr(dataset, 'num_stations', 0)
     )
 
-    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-    print(f"Using device: {device}")
+def train_wind_pressure_forecaster(csv_path, seq_len=128, pred_len=24,
+                                   batch_size=32, epochs=100, learning_rate=0.001, cache_path=None,
+                                   station=None, stations=None,
+                                   num_workers=0, pin_memory=None, precision="fp32", num_threads=None,
+                                   checkpoint_path=None, early_stopping_patience=10, min_delta=0.0):
+    """Train the forecaster; runs data-parallel when started under torchrun or train_distributed
+
+    Every epoch is validated on the held-out windows. The LR is scheduled on
+    validation loss, training stops after early_stopping_patience epochs
+    without an improvement of min_delta, and each new best model is saved to
+    checkpoint_path (by rank 0). The returned model has the best weights.
+
+    Each rank trains on its own shard of the training windows, gradients
+    are averaged by DistributedDataParallel (gloo), and the losses fed to
+    ReduceLROnPlateau and early stopping are averaged over ranks so every
+    rank keeps the same learning rate and stops at the same epoch.
+
+    Returns (model, dataset, train_losses, val_history).
+    """
+    rank, world_size = distributed_context()
+    is_main = rank == 0
+
+    # Intra-op threads for the forward/backward pass (defaults to torch's choice)
+    if num_threads:
+        torch.set_num_threads(num_threads)
+
+    # Load dataset (a list of stations trains one shared model with a station embedding;
+    # cache_path is then a directory for the per-station series).
+    # Rank 0 goes first so it alone writes the memory-mapped cache.
+    if world_size > 1 and not is_main:
+        dist.barrier()
+    if stations:
+        dataset = MultiStationWindPressureDataset(csv_path, stations, seq_len, pred_len, cache_dir=cache_path)
+    else:
+        dataset = WindPressureDataset(csv_path, seq_len, pred_len, cache_path=cache_path, station=station)
+    if world_size > 1 and is_main:
+        dist.barrier()
+
+    # Create data loaders (training windows only, one shard per rank)
+    train_loader = make_train_loader(dataset, dataset.train_indices, batch_size, num_workers, pin_memory,
+                                     world_size=world_size, rank=rank)
+    val_loader = make_eval_loader(dataset, dataset.val_indices, batch_size, num_workers, pin_memory,
+                                  world_size=world_size, rank=rank)
+    scales = feature_scales(dataset)
+
+    # Initialize model
+    model = build_forecaster(dataset, seq_len, pred_len)
+
+    if torch.cuda.is_available():
+        device = torch.device('cuda', int(os.environ.get("LOCAL_RANK", 0)) if world_size > 1 else 0)
+    else:
+        device = torch.device('cpu')
+    if is_main:
+        print(f"Using device: {device} ({precision}, {torch.get_num_threads()} threads, "
+              f"{num_workers} loader workers, {world_size} processes)")
     model.to(device)
+    train_model = model
+    if world_size > 1:
+        train_model = DistributedDataParallel(model, device_ids=[device.index] if device.type == 'cuda' else None)
 
     # Loss and optimizer
     criterion = nn.MSELoss()
@@ -214,97 +475,145 @@ def train_wind_pressure_forecaster(csv_path, seq_len=128, pred_len=24,
 
     # Training loop
     train_losses = []
-
-    print("Training wind speed and pressure forecaster...")
+    val_history = []
+    best_val_loss = float('inf')
+    best_metrics = None
+    best_state = None
+    epochs_without_improvement = 0
+
+    if is_main:
+        print("Training wind speed and pressure forecaster...")
     for epoch in range(epochs):
-        model.train()
-        total_loss = 0
-
-        for batch_seq, batch_target in train_loader:
-            batch_seq = batch_seq.to(device)
-            batch_target = batch_target.to(device)
-
-            optimizer.zero_grad()
-            predictions = model(batch_seq)
-
-            loss = criterion(predictions, batch_target)
-            loss.backward()
-
-            torch.nn.utils.clip_grad_norm_(model.parameters(), max_norm=1.0)
-            optimizer.step()
-
-            total_loss += loss.item()
-
-        avg_loss = total_loss / len(train_loader)
+        if world_size > 1:
+            train_loader.sampler.set_epoch(epoch)
+        avg_loss, _ = train_steps(train_model, train_loader, optimizer, criterion, device, precision)
+        avg_loss = average_across_ranks(avg_loss, world_size)
         train_losses.append(avg_loss)
-        scheduler.step(avg_loss)
 
-        if (epoch + 1) % 5 == 0:
-            print(f'Epoch {epoch+1}/{epochs}, Loss: {avg_loss:.6f}')
-
-    return model, dataset, train_losses
+        # Validation (the DDP wrapper isn't needed without a backward pass)
+        metrics = validate(model, val_loader, device, scales, precision, world_size)
+        val_history.append(metrics)
+        scheduler.step(metrics["loss"])
+
+        improved = metrics["loss"] < best_val_loss - min_delta
+        if improved:
+            best_val_loss = metrics["loss"]
+            best_metrics = metrics
+            best_state = {name: value.detach().clone() for name, value in model.state_dict().items()}
+            epochs_without_improvement = 0
+            if checkpoint_path and is_main:
+                save_forecast_model_simple(model, dataset, checkpoint_path)
+        else:
+            epochs_without_improvement += 1
+
+        if is_main and (improved or (epoch + 1) % 5 == 0):
+            print(f'Epoch {epoch+1}/{epochs}, Loss: {avg_loss:.6f}, Val loss: {metrics["loss"]:.6f}'
+                  f'{" (best)" if improved else ""}')
+
+        if epochs_without_improvement >= early_stopping_patience:
+            if is_main:
+                print(f"⏹️ Early stopping after epoch {epoch+1}: no improvement for {early_stopping_patience} epochs")
+            break
+
+    # Hand back the best weights rather than the last ones
+    if best_state is not None:
+        model.load_state_dict(best_state)
+
+    if is_main and best_metrics is not None:
+        print(f"\nBest validation loss: {best_metrics['loss']:.6f}")
+        for i, name in enumerate(dataset.target_names):
+            print(f"  {name:22s} MAE {best_metrics['mae'][i]:8.3f}  RMSE {best_metrics['rmse'][i]:8.3f}")
+
+    return model, dataset, train_losses, val_history
+
+def _distributed_worker(rank, world_size, port, kwargs):
+    os.environ.update(MASTER_ADDR="127.0.0.1", MASTER_PORT=str(port),
+                      RANK=str(rank), LOCAL_RANK=str(rank), WORLD_SIZE=str(world_size))
+    dist.init_process_group("gloo", rank=rank, world_size=world_size)
+    try:
+        train_wind_pressure_forecaster(**kwargs)
+    finally:
+        dist.destroy_process_group()
+
+def train_distributed(world_size, port=29500, **kwargs):
+    """Run train_wind_pressure_forecaster in world_size local processes (gloo DDP)
+
+    For testing data-parallel training on one box; across machines launch
+    this module with torchrun instead. Pass checkpoint_path to keep the
+    result (written by rank 0).
+    """
+    torch.multiprocessing.spawn(_distributed_worker, args=(world_size, port, kwargs), nprocs=world_size, join=True)
+
+def benchmark_training_configs(dataset, configs, batch_size=32, steps=100, warmup_steps=10):
+    """Training throughput (epochs/hour) of loader/precision/thread configurations on one dataset
+
+    configs are dicts with any of num_workers, pin_memory, precision and
+    num_threads. Each one trains a fresh model for warmup_steps + steps
+    batches; the timed steps are extrapolated to a full training epoch.
+    """
+    import time
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    default_threads = torch.get_num_threads()
+    results = []
+
+    for config in configs:
+        torch.set_num_threads(config.get('num_threads') or default_threads)
+        loader = make_train_loader(dataset, dataset.train_indices, batch_size,
+                                   config.get('num_workers', 0), config.get('pin_memory'))
+        model = build_forecaster(dataset, dataset.seq_len, dataset.pred_len).to(device)
+        optimizer = torch.optim.Adam(model.parameters(), lr=0.001)
+        criterion = nn.MSELoss()
+        precision = config.get('precision', 'fp32')
+
+        train_steps(model, loader, optimizer, criterion, device, precision, max_steps=warmup_steps)
+        start = time.perf_counter()
+        _, timed_steps = train_steps(model, loader, optimizer, criterion, device, precision, max_steps=steps)
+        seconds_per_step = (time.perf_counter() - start) / timed_steps
+
+        epoch_seconds = seconds_per_step * len(loader)
+        result = dict(config, seconds_per_epoch=epoch_seconds, epochs_per_hour=3600.0 / epoch_seconds)
+        results.append(result)
+        print(f"{str(config):70s} {epoch_seconds:8.1f} s/epoch  {result['epochs_per_hour']:6.1f} epochs/hour")
+
+    torch.set_num_threads(default_threads)
+    return results
 
 # ----------------------
 # 4. Prediction Functions
 # ----------------------
 def predict_wind_pressure(model, dataset, num_predictions=3):
-    """Make wind speed and pressure predictions"""
-    device = next(model.parameters()).device
-    model.eval()
-
-    predictions = []
-    actuals = []
-
-    with torch.no_grad():
-        for i in range(min(num_predictions, len(dataset.val_sequences))):
-            # Get sequence and target
-            sequence = torch.FloatTensor(dataset.val_sequences[i]).unsqueeze(0).to(device)
-            actual = dataset.val_targets[i]
-
-            # Predict
-            pred = model(sequence)
-            pred = pred.squeeze(0).cpu().numpy()
-
-            # Store predictions and actuals
-            predictions.append(pred)
-            actuals.append(actual)
-
-            # Denormalize for display
-            wind_pred_denorm = dataset.denormalize(pred[:, 0], 0)  # surface pressure
-            pressure_pred_denorm = dataset.denormalize(pred[:, 1], 1)  # Pressure tendency
-            wind_10_pred_denorm = dataset.denormalize(pred[:, 2], 2)  # wind_speed_10
-            wind_100_pred_denorm = dataset.denormalize(pred[:, 3], 3)  # wind_speed_100
-            wind_gust_pred_denorm = dataset.denormalize(pred[:, 4], 4)  # wind_gust
-
-            wind_actual_denorm = dataset.denormalize(actual[:, 0], 0)
-            pressure_actual_denorm = dataset.denormalize(actual[:, 1], 1)
-            wind_10_actual_denorm = dataset.denormalize(actual[:, 1], 1)
-            wind_100_actual_denorm = dataset.denormalize(actual[:, 1], 1)
-            wind_gust_actual_denorm = dataset.denormalize(actual[:, 1], 1)
-
-            print(f"\n🔮 Prediction {i+1}:")
-            print(f"Wind Speed: {wind_pred_denorm[-1]:.1f} m/s (actual: {wind_actual_denorm[-1]:.1f} m/s)")
-            print(f"Pressure: {pressure_pred_denorm[-1]:.1f} hPa (actual: {pressure_actual_denorm[-1]:.1f} hPa)")
-            print(f"Wind MAE: {np.mean(np.abs(wind_pred_denorm - wind_actual_denorm)):.2f} m/s")
-            print(f"Pressure MAE: {np.mean(np.abs(pressure_pred_denorm - pressure_actual_denorm)):.2f} hPa")
+    """Forecast the first validation windows in one batch; returns (predictions, actuals) in original units"""
+    indices = dataset.val_indices[:num_predictions]
+    mean, scale = normalization_stats(dataset)
+    predictions, actuals, station_ids = next(iterate_predictions(model, dataset, indices, batch_size=len(indices)))
+
+    # Denormalize every window, hour and feature at once
+    predictions = denormalize(predictions, mean, scale, station_ids)
+    actuals = denormalize(actuals, mean, scale, station_ids)
+
+    wind = dataset.target_names.index('wind_speed_10m')
+    pressure = dataset.target_names.index('surface_pressure')
+    wind_mae, pressure_mae = np.abs(predictions - actuals)[:, :, [wind, pressure]].mean(axis=1).T
+    for i in range(len(predictions)):
+        print(f"\n🔮 Prediction {i+1}:")
+        print(f"Wind Speed: {predictions[i, -1, wind]:.1f} m/s (actual: {actuals[i, -1, wind]:.1f} m/s)")
+        print(f"Pressure: {predictions[i, -1, pressure]:.1f} hPa (actual: {actuals[i, -1, pressure]:.1f} hPa)")
+        print(f"Wind MAE: {wind_mae[i]:.2f} m/s")
+        print(f"Pressure MAE: {pressure_mae[i]:.2f} hPa")
 
     return predictions, actuals
 
 def plot_predictions(predictions, actuals, dataset, prediction_idx=0):
-    """Plot predictions vs actuals for all 12 target features"""
+    """Plot predictions vs actuals (original units) for all 12 target features"""
     pred = predictions[prediction_idx]
     actual = actuals[prediction_idx]
     hours = range(len(pred))
 
-    # Denormalize all features for plotting
-    denorm_predictions = []
-    denorm_actuals = []
-
-    for i in range(len(dataset.target_names)):
-        pred_denorm = dataset.denormalize(pred[:, i], i)
-        actual_denorm = dataset.denormalize(actual[:, i], i)
-        denorm_predictions.append(pred_denorm)
-        denorm_actuals.append(actual_denorm)
+    # Per-feature statistics over the forecast hours in one go
+    error = pred - actual
+    mae = np.abs(error).mean(axis=0)
+    rmse = np.sqrt(np.square(error).mean(axis=0))
+    bias = error.mean(axis=0)  # Forecast bias
 
     # Create subplots - 4 rows x 3 columns for 12 features
     fig, axes = plt.subplots(4, 3, figsize=(18, 16))
@@ -333,12 +642,10 @@ def plot_predictions(predictions, actuals, dataset, prediction_idx=0):
     # Plot each feature
     for i, feature_name in enumerate(dataset.target_names):
         ax = axes[i]
-        pred_data = denorm_predictions[i]
-        actual_data = denorm_actuals[i]
 
-        ax.plot(hours, pred_data, color=colors[i], linestyle='-',
+        ax.plot(hours, pred[:, i], color=colors[i], linestyle='-',
                 label='Predicted', linewidth=2, alpha=0.8)
-        ax.plot(hours, actual_data, color=colors[i], linestyle='--',
+        ax.plot(hours, actual[:, i], color=colors[i], linestyle='--',
                 label='Actual', linewidth=2, alpha=0.8)
 
         ax.set_title(f'{feature_name.replace("_", " ").title()}', fontsize=12, fontweight='bold')
@@ -347,12 +654,8 @@ def plot_predictions(predictions, actuals, dataset, prediction_idx=0):
         ax.legend(fontsize=9)
         ax.grid(True, alpha=0.3)
 
-        # Calculate and display statistics in the plot
-        mae = np.mean(np.abs(pred_data - actual_data))
-        rmse = np.sqrt(np.mean((pred_data - actual_data)**2))
-
         # Add text box with statistics
-        textstr = f'MAE: {mae:.2f}\nRMSE: {rmse:.2f}'
+        textstr = f'MAE: {mae[i]:.2f}\nRMSE: {rmse[i]:.2f}'
         props = dict(boxstyle='round', facecolor='wheat', alpha=0.8)
         ax.text(0.05, 0.95, textstr, transform=ax.transAxes, fontsize=9,
                 verticalalignment='top', bbox=props)
@@ -371,28 +674,16 @@ def plot_predictions(predictions, actuals, dataset, prediction_idx=0):
     print("=" * 60)
 
     for i, feature_name in enumerate(dataset.target_names):
-        pred_data = denorm_predictions[i]
-        actual_data = denorm_actuals[i]
-
-        mae = np.mean(np.abs(pred_data - actual_data))
-        rmse = np.sqrt(np.mean((pred_data - actual_data)**2))
-        bias = np.mean(pred_data - actual_data)  # Forecast bias
-
-        print(f"{feature_name:20s}: MAE={mae:6.2f} {units.get(feature_name, '')}, "
-              f"RMSE={rmse:6.2f}, Bias={bias:6.2f}")
+        print(f"{feature_name:20s}: MAE={mae[i]:6.2f} {units.get(feature_name, '')}, "
+              f"RMSE={rmse[i]:6.2f}, Bias={bias[i]:6.2f}")
 
     # Overall statistics
     print("=" * 60)
-    overall_mae = np.mean([np.mean(np.abs(denorm_predictions[i] - denorm_actuals[i]))
-                          for i in range(len(dataset.target_names))])
-    overall_rmse = np.mean([np.sqrt(np.mean((denorm_predictions[i] - denorm_actuals[i])**2))
-                           for i in range(len(dataset.target_names))])
-
-    print(f"{'OVERALL':20s}: MAE={overall_mae:6.2f}, RMSE={overall_rmse:6.2f}")
+    print(f"{'OVERALL':20s}: MAE={mae.mean():6.2f}, RMSE={rmse.mean():6.2f}")
 
 # Alternative: Simplified version for specific feature groups
 def plot_feature_groups(predictions, actuals, dataset, prediction_idx=0):
-    """Plot features grouped by category"""
+    """Plot features grouped by category (predictions and actuals in original units)"""
     pred = predictions[prediction_idx]
     actual = actuals[prediction_idx]
     hours = range(len(pred))
@@ -422,11 +713,9 @@ def plot_feature_groups(predictions, actuals, dataset, prediction_idx=0):
         for feature_name in features:
             if feature_name in dataset.target_names:
                 feature_idx = dataset.target_names.index(feature_name)
-                pred_data = dataset.denormalize(pred[:, feature_idx], feature_idx)
-                actual_data = dataset.denormalize(actual[:, feature_idx], feature_idx)
 
-                ax.plot(hours, pred_data, '-', label=f'Pred {feature_name}', linewidth=1.5)
-                ax.plot(hours, actual_data, '--', label=f'Actual {feature_name}', linewidth=1.5, alpha=0.7)
+                ax.plot(hours, pred[:, feature_idx], '-', label=f'Pred {feature_name}', linewidth=1.5)
+                ax.plot(hours, actual[:, feature_idx], '--', label=f'Actual {feature_name}', linewidth=1.5, alpha=0.7)
 
         ax.set_title(group_name, fontsize=12, fontweight='bold')
         ax.set_xlabel('Hours Ahead')
@@ -441,10 +730,13 @@ def plot_feature_groups(predictions, actuals, dataset, prediction_idx=0):
 # plot_predictions(predictions, actuals, dataset, prediction_idx=0)
 # plot_feature_groups(predictions, actuals, dataset, prediction_idx=0)
 
-def plot_training_loss(train_losses):
-    """Plot training loss"""
+def plot_training_loss(train_losses, val_history=None):
+    """Plot training (and validation) loss"""
     plt.figure(figsize=(10, 5))
-    plt.plot(train_losses, 'b-', linewidth=2)
+    plt.plot(train_losses, 'b-', linewidth=2, label='Train')
+    if val_history:
+        plt.plot([metrics["loss"] for metrics in val_history], 'r-', linewidth=2, label='Validation')
+        plt.legend()
     plt.title('Training Loss', fontsize=16)
     plt.xlabel('Epoch', fontsize=12)
     plt.ylabel('MSE Loss', fontsize=12)
@@ -453,26 +745,165 @@ def plot_training_loss(train_losses):
     plt.show()
 
 # ----------------------
-# 5. Main Execution
+# 5. Saving & Export
+# ----------------------
+def save_forecast_model_simple(model, dataset, filepath="wind_pressure_forecaster.pth"):
+    """Simpler save function without trying to extract model config"""
+    save_dict = {
+        'model_state_dict': model.state_dict(),
+        'target_names': dataset.target_names,
+        'model_type': 'WindPressurePatchTST'  # Identifier for loading
+    }
+    if getattr(dataset, 'num_stations', 0):
+        # Shared model: per-station (stations, features) stats and where each station is
+        save_dict.update({
+            'num_stations': dataset.num_stations,
+            'station_names': dataset.station_names,
+            'station_coords': dataset.station_coords,
+            'station_mean': dataset.station_mean,
+            'station_scale': dataset.station_scale
+        })
+    else:
+        save_dict['dataset_scalers'] = {name: {
+            'mean_': scaler.mean_,
+            'scale_': scaler.scale_,
+            'var_': scaler.var_,
+            'n_samples_seen_': scaler.n_samples_seen_
+        } for name, scaler in dataset.scalers.items()}
+    torch.save(save_dict, filepath)
+    print(f"✅ Forecast model saved to {filepath}")
+
+def export_forecast_model(model, filepath_prefix="wind_pressure_forecaster", formats=("torchscript", "onnx")):
+    """Export the forecaster for serving without the eager Python forward
+
+    Writes {prefix}.ts (TorchScript) and/or {prefix}.onnx (dynamic batch axis),
+    both traced on CPU in eval mode.
+    """
+    model = model.to('cpu').eval()
+    example = (torch.randn(2, model.seq_len, model.num_features),)
+    input_names = ["history"]
+    if model.num_stations:
+        example += (torch.zeros(2, dtype=torch.long),)
+        input_names.append("station_ids")
+    paths = {}
+
+    if "torchscript" in formats:
+        with torch.no_grad():
+            traced = torch.jit.trace(model, example)
+        paths["torchscript"] = f"{filepath_prefix}.ts"
+        traced.save(paths["torchscript"])
+        print(f"✅ TorchScript model saved to {paths['torchscript']}")
+
+    if "onnx" in formats:
+        paths["onnx"] = f"{filepath_prefix}.onnx"
+        torch.onnx.export(
+            model, example, paths["onnx"],
+            input_names=input_names, output_names=["forecast"],
+            dynamic_axes={**{name: {0: "batch"} for name in input_names}, "forecast": {0: "batch"}},
+            dynamo=False
+        )
+        print(f"✅ ONNX model saved to {paths['onnx']}")
+
+    return paths
+
+def load_exported_forecast_runtime(path):
+    """Callable (batch, seq_len, features) float32 array [, (batch,) int64 station ids] -> (batch, pred_len, features) array"""
+    if path.endswith(".onnx"):
+        import onnxruntime as ort
+        session = ort.InferenceSession(path, providers=["CPUExecutionProvider"])
+        input_names = [model_input.name for model_input in session.get_inputs()]
+        return lambda *inputs: session.run(None, dict(zip(input_names, inputs)))[0]
+
+    scripted = torch.jit.load(path, map_location='cpu').eval()
+
+    def run_scripted(*inputs):
+        with torch.no_grad():
+            return scripted(*(torch.from_numpy(value) for value in inputs)).numpy()
+    return run_scripted
+
+def example_station_ids(model, batch_size):
+    """Random station ids for a shared model, nothing for a single-site model"""
+    if not model.num_stations:
+        return ()
+    return (np.random.randint(0, model.num_stations, size=batch_size).astype(np.int64),)
+
+def check_export_parity(model, paths, batch_sizes=(1, 32, 256), atol=1e-4):
+    """Compare exported runtimes with the eager model on random inputs; raises on mismatch"""
+    model = model.to('cpu').eval()
+    max_errors = {}
+
+    for name, path in paths.items():
+        runtime = load_exported_forecast_runtime(path)
+        max_error = 0.0
+        for batch_size in batch_sizes:
+            x = torch.randn(batch_size, model.seq_len, model.num_features)
+            station_ids = example_station_ids(model, batch_size)
+            with torch.no_grad():
+                expected = model(x, *(torch.from_numpy(ids) for ids in station_ids)).numpy()
+            max_error = max(max_error, float(np.abs(runtime(x.numpy(), *station_ids) - expected).max()))
+        max_errors[name] = max_error
+        print(f"{name:12s}: max |exported - eager| = {max_error:.2e}")
+        if max_error > atol:
+            raise AssertionError(f"{name} export differs from eager model by {max_error:.2e} (atol {atol:.0e})")
+
+    return max_errors
+
+def benchmark_forecast_runtimes(model, paths, batch_sizes=(1, 32, 256), repeats=20):
+    """Median latency (ms) per forward pass for eager and exported runtimes at each batch size"""
+    import time
+    model = model.to('cpu').eval()
+
+    def run_eager(*inputs):
+        with torch.no_grad():
+            return model(*(torch.from_numpy(value) for value in inputs)).numpy()
+
+    runtimes = {"eager": run_eager}
+    runtimes.update({name: load_exported_forecast_runtime(path) for name, path in paths.items()})
+
+    results = {}
+    for batch_size in batch_sizes:
+        inputs = (np.random.randn(batch_size, model.seq_len, model.num_features).astype(np.float32),
+                  *example_station_ids(model, batch_size))
+        for name, runtime in runtimes.items():
+            runtime(*inputs)  # warm-up
+            timings = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                runtime(*inputs)
+                timings.append((time.perf_counter() - start) * 1000.0)
+            results[(name, batch_size)] = float(np.median(timings))
+            print(f"batch={batch_size:4d}  {name:12s}: {results[(name, batch_size)]:8.2f} ms")
+
+    return results
+
+# ----------------------
+# 6. Main Execution
 # ----------------------
 if __name__ == "__main__":
+    # Also runs data-parallel: torchrun --nproc_per_node 4 patch_forecast_trainer.py
     print("🌪️ Wind Speed & Pressure Forecaster using PatchTST")
     print("=" * 60)
 
-    # Train the model
-    model, dataset, train_losses = train_wind_pressure_forecaster(
-        csv_path="openmetro_weather_2022.csv",
+    # Train the model; the best validation checkpoint is saved (rank 0 only)
+    model, dataset, train_losses, val_history = train_wind_pressure_forecaster(
+        csv_path="weather_store",
+        station="sundarban",
         seq_len=128,
         pred_len=24,
         batch_size=32,
         epochs=100,
-        learning_rate=0.001
+        learning_rate=0.001,
+        checkpoint_path="./cust_train1/sundarban.pth"
     )
-     # Save forecasting model
 
+    rank, _ = distributed_context()
+    if dist.is_available() and dist.is_initialized():
+        dist.destroy_process_group()
+    if rank != 0:
+        raise SystemExit(0)
 
     # Plot training loss
-    plot_training_loss(train_losses)
+    plot_training_loss(train_losses, val_history)
 
     # Make predictions
     print("\n" + "=" * 60)
@@ -482,23 +913,12 @@ if __name__ == "__main__":
     # Plot results
     plot_predictions(predictions, actuals, dataset, prediction_idx=0)
 
+    # Whole validation split, per lead hour and feature
+    metrics = evaluate_forecaster(model, dataset)
+    print("\n" + format_report(metrics))
+    write_report(metrics, "./cust_train1/sundarban_eval.json")
+
     print("\n" + "=" * 60)
     print("✅ Wind Speed & Pressure Forecasting Completed!")
     print(f"Trained on {len(dataset.train_sequences)} sequences")
     print(f"Features: {dataset.target_names}")
-def save_forecast_model_simple(model, dataset, filepath="wind_pressure_forecaster.pth"):
-    """Simpler save function without trying to extract model config"""
-    save_dict = {
-        'model_state_dict': model.state_dict(),
-        'dataset_scalers': {name: {
-            'mean_': scaler.mean_,
-            'scale_': scaler.scale_,
-            'var_': scaler.var_,
-            'n_samples_seen_': scaler.n_samples_seen_
-        } for name, scaler in dataset.scalers.items()},
-        'target_names': dataset.target_names,
-        'model_type': 'WindPressurePatchTST'  # Identifier for loading
-    }
-    torch.save(save_dict, filepath)
-    print(f"✅ Forecast model saved to {filepath}")
-save_forecast_model_simple(model, dataset, "./cust_train1/sundarban.pth")
\ No newline at end of file
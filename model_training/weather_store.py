@@ -0,0 +1,133 @@
+"""Columnar store for fetched hourly weather history
+
+    <root>/station=<name>/year=<yyyy>/<part>.parquet
+
+One float32 Parquet file per station and year with a 'date' timestamp
+column. Readers only decode the columns and years they ask for, which is
+much faster than re-parsing the CSV on every training run. Station
+coordinates are kept in <root>/_stations.json. Convert an existing CSV with
+
+    python weather_store.py --csv openmetro_weather_2022.csv --root weather_store --station sundarban
+"""
+import argparse
+import json
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+
+def write_station_history(df, root, station, part="part-0", verbose=True):
+    """Write a 'date'-column (or time-indexed) DataFrame as one Parquet file per year
+
+    Writers that add history piece by piece (bulk_download.py) pass their own
+    part name so chunks of the same year sit side by side.
+    """
+    if 'date' not in df.columns:
+        df = df.rename_axis('date').reset_index()
+    df = df.sort_values('date')
+
+    # Typed columns: timestamps plus float32 values
+    values = df.drop(columns=['date']).astype('float32')
+    table = pa.Table.from_pandas(
+        pd.concat([df[['date']], values], axis=1), preserve_index=False
+    )
+
+    paths = []
+    years = df['date'].dt.year.to_numpy()
+    for year in sorted(set(years)):
+        directory = os.path.join(root, f"station={station}", f"year={year}")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{part}.parquet")
+        pq.write_table(table.filter(pa.array(years == year)), path)
+        paths.append(path)
+
+    if verbose:
+        print(f"💾 {len(df)} hourly rows for {station} saved to {root} ({len(paths)} yearly files)")
+    return paths
+
+
+def read_station_history(root, station, columns=None, start_date=None, end_date=None):
+    """Load one station's history as a DataFrame with a 'date' column
+
+    Only the requested columns are decoded, and only the year partitions
+    overlapping [start_date, end_date] are opened.
+    """
+    dataset = ds.dataset(os.path.join(root, f"station={station}"), format="parquet", partitioning="hive")
+
+    condition = None
+    if start_date is not None:
+        start = pd.Timestamp(start_date)
+        condition = (ds.field('year') >= start.year) & (ds.field('date') >= start)
+    if end_date is not None:
+        # end_date is inclusive: a bare date covers that whole day
+        end = pd.Timestamp(end_date)
+        if end == end.normalize():
+            end += pd.Timedelta(hours=23)
+        end_condition = (ds.field('year') <= end.year) & (ds.field('date') <= end)
+        condition = end_condition if condition is None else condition & end_condition
+
+    table = dataset.to_table(columns=['date'] + list(columns) if columns else None, filter=condition)
+    df = table.to_pandas()
+    if 'year' in df.columns:
+        df = df.drop(columns=['year'])
+    # Parts may overlap (e.g. a re-download next to an older file); keep one row per hour
+    df = df.sort_values('date').drop_duplicates('date', keep='last')
+    return df.reset_index(drop=True)
+
+
+def list_stations(root):
+    """Station names that have data under root"""
+    return sorted(
+        name.split("=", 1)[1] for name in os.listdir(root) if name.startswith("station=")
+    )
+
+
+def save_station_coordinates(root, coordinates):
+    """Merge {station: (latitude, longitude)} into <root>/_stations.json"""
+    os.makedirs(root, exist_ok=True)
+    stored = load_station_coordinates(root)
+    stored.update({station: [float(latitude), float(longitude)] for station, (latitude, longitude) in coordinates.items()})
+    path = os.path.join(root, "_stations.json")
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(stored, f, indent=1, sort_keys=True)
+    os.replace(f"{path}.tmp", path)
+
+
+def load_station_coordinates(root):
+    """{station: [latitude, longitude]} recorded for the store (empty if none)"""
+    path = os.path.join(root, "_stations.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def load_weather_frame(path, columns, station=None, start_date=None, end_date=None):
+    """'date' plus columns from either a training CSV or a weather store directory"""
+    if os.path.isdir(path):
+        if station is None:
+            station = list_stations(path)[0]
+        return read_station_history(path, station, columns, start_date, end_date)
+
+    df = pd.read_csv(path, usecols=['date'] + list(columns), parse_dates=['date'])
+    if start_date is not None:
+        df = df[df['date'] >= pd.Timestamp(start_date)]
+    if end_date is not None:
+        df = df[df['date'] < pd.Timestamp(end_date) + pd.Timedelta(days=1)]
+    return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", required=True, help="CSV written by dataoader.py")
+    parser.add_argument("--root", default="weather_store")
+    parser.add_argument("--station", default="sundarban")
+    parser.add_argument("--latitude", type=float, default=20.97)
+    parser.add_argument("--longitude", type=float, default=89.51)
+    args = parser.parse_args()
+
+    write_station_history(pd.read_csv(args.csv, parse_dates=['date']), args.root, args.station)
+    save_station_coordinates(args.root, {args.station: (args.latitude, args.longitude)})